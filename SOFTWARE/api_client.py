@@ -1,15 +1,111 @@
 from typing import Optional
 from model_classes import User, Instrument, Reservation, Token
 from config import config
-import unidecode
 import aiohttp
 import asyncio
-from http_config import REQUEST_TIMEOUT
+import time
+from api_policy import (
+    CONTACT,
+    ENDPOINT_POLICIES,
+    EQUIPMENT,
+    FAILURE_STATUSES,
+    RECORDING_INFO,
+    RECORDING_START,
+    RECORDING_STOP,
+    TOKEN,
+    APIResponse,
+    CircuitBreaker,
+    CircuitOpenError,
+    retry_delay,
+)
+from metrics import counter, gauge, histogram
+from email.utils import parsedate_to_datetime
+from datetime import datetime
+
+
+API_LATENCY = histogram(
+    "bluebox_api_request_seconds", "Backend request latency per endpoint (per attempt)"
+)
+API_REQUESTS = counter(
+    "bluebox_api_requests", "Backend requests per endpoint and HTTP status or error"
+)
+API_CIRCUIT_OPEN = gauge("bluebox_api_circuit_open", "1 while the circuit breaker is open")
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """Parses an HTTP Date header, returns None if missing or malformed."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _error_field(body, key: str):
+    """Reads a field of an error body, which may not be a JSON object."""
+    return body.get(key) if isinstance(body, dict) else None
 
 
 class APIClient:
-    def __init__(self, session: aiohttp.ClientSession):
+    """
+    Backend API calls. Every request goes through its endpoint policy
+    (timeout, retries for idempotent GETs) and the shared circuit breaker,
+    which raises CircuitOpenError instead of waiting while the backend is down.
+    """
+
+    def __init__(
+        self, session: aiohttp.ClientSession, breaker: Optional[CircuitBreaker] = None
+    ):
         self.session = session
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        API_CIRCUIT_OPEN.set_function(lambda: float(self.breaker.is_open))
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs) -> APIResponse:
+        """
+        Sends a request under the endpoint's policy and reads the response.
+        Raises CircuitOpenError, aiohttp.ClientError or asyncio.TimeoutError.
+        """
+        policy = ENDPOINT_POLICIES[endpoint]
+        attempt = 0
+        while True:
+            try:
+                self.breaker.check()
+            except CircuitOpenError:
+                API_REQUESTS.inc(endpoint=endpoint, status="circuit_open")
+                raise
+            started = time.perf_counter()
+            try:
+                async with self.session.request(
+                    method, url, timeout=policy.timeout, **kwargs
+                ) as response:
+                    try:
+                        body = await response.json(content_type=None)
+                    except ValueError:
+                        body = None
+                    result = APIResponse(response.status, body, response.headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                API_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+                API_REQUESTS.inc(endpoint=endpoint, status=type(e).__name__)
+                self.breaker.record_failure()
+                if attempt >= policy.retries or self.breaker.is_open:
+                    raise
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                API_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+                API_REQUESTS.inc(endpoint=endpoint, status=str(result.status))
+                if result.status not in FAILURE_STATUSES:
+                    self.breaker.record_success()
+                    return result
+                self.breaker.record_failure()
+                if attempt >= policy.retries or self.breaker.is_open:
+                    return result
+
+            await asyncio.sleep(retry_delay(policy, attempt))
+            attempt += 1
+            print(f"[API] Retrying {endpoint} ({attempt}/{policy.retries})")
 
     # Fetch instrument data based on MAC address (and store IP info locally)
     async def fetch_instrument_data(self, mac: str, ip: str) -> Optional[Instrument]:
@@ -18,31 +114,31 @@ class APIClient:
 
         try:
             # Send POST request to fetch instrument info using MAC
-            async with self.session.post(
-                url, json={"mac_address": mac}, timeout=REQUEST_TIMEOUT
-            ) as response:
-                if response.status != 200:
-                    print(f"Response status {response.status}")
-                    error_content = await response.json()
-                    print(f"Error content {error_content}")
-                    error_message = error_content.get("message")
-                    print(f"Message: {error_message}")
-                    return None
-
-                response_json = await response.json()
-
-                if not response_json:
-                    return None
-
-                # Parse and return Instrument object
-                instrument = Instrument(
-                    id=response_json[0]["equipmentid"],
-                    name=response_json[0]["alias"],
-                    mac_address=mac,
-                    ip=ip,
-                )
-                print("Instrument data: Fetched.")
-                return instrument
+            response = await self._request(
+                EQUIPMENT, "POST", url, json={"mac_address": mac}
+            )
+            if response.status != 200:
+                print(f"Response status {response.status}")
+                error_content = response.body
+                print(f"Error content {error_content}")
+                error_message = _error_field(error_content, "message")
+                print(f"Message: {error_message}")
+                return None
+
+            response_json = response.body
+
+            if not response_json:
+                return None
+
+            # Parse and return Instrument object
+            instrument = Instrument(
+                id=response_json[0]["equipmentid"],
+                name=response_json[0]["alias"],
+                mac_address=mac,
+                ip=ip,
+            )
+            print("Instrument data: Fetched.")
+            return instrument
 
         except (aiohttp.ClientError, asyncio.TimeoutError):
             print("Error in fetch instrument")
@@ -55,29 +151,28 @@ class APIClient:
 
         try:
             print("Token API call")
-            async with self.session.post(
-                url, json={"apiKey": api_key}, timeout=REQUEST_TIMEOUT
-            ) as response:
-                if response.status != 200:
-                    print(f"Response status {response.status}")
-                    error_content = await response.json()
-                    print(f"Error content {error_content}")
-                    error_message = error_content.get("message")
-                    print(f"Message: {error_message}")
-                    return None
-
-                response_json = await response.json()
-
-                if not response_json:
-                    print("Empty response from api")
-                    return None
-
-                # Create and return Token object
-                token = Token(
-                    string=response_json["accessToken"],
-                    expiration=response_json["expiresAt"],
-                )
-                return token
+            response = await self._request(TOKEN, "POST", url, json={"apiKey": api_key})
+            if response.status != 200:
+                print(f"Response status {response.status}")
+                error_content = response.body
+                print(f"Error content {error_content}")
+                error_message = _error_field(error_content, "message")
+                print(f"Message: {error_message}")
+                return None
+
+            response_json = response.body
+
+            if not response_json:
+                print("Empty response from api")
+                return None
+
+            # Create and return Token object
+            token = Token(
+                string=response_json["accessToken"],
+                expiration=response_json["expiresAt"],
+                server_date=_parse_http_date(response.headers.get("Date")),
+            )
+            return token
 
         except (aiohttp.ClientError, asyncio.TimeoutError):
             print("Error in fetch_token")
@@ -85,47 +180,56 @@ class APIClient:
 
     # Fetch user data based on RFID card ID
     async def fetch_user_data(self, card_id) -> Optional[User]:
+        user, _ = await self.lookup_user(card_id)
+        return user
+
+    # Same as fetch_user_data, but also tells whether "no user" is a definitive answer
+    async def lookup_user(self, card_id) -> tuple[Optional[User], bool]:
+        """
+        Returns (user, definitive). definitive is True when the backend answered
+        (user found, or card not registered) and False on errors and timeouts.
+        """
         print("User data: Fetching...")
         url = config.CONTACT_BY_RFID
 
         try:
             # POST request to fetch user info by RFID
-            async with self.session.post(
-                url, json={"rfid": card_id}, timeout=REQUEST_TIMEOUT
-            ) as response:
-                if response.status != 200:
-                    print(f"Response status {response.status}")
-                    error_content = await response.json()
-                    print(f"Error content {error_content}")
-                    error_message = error_content.get("message")
-                    print(f"Message: {error_message}")
-                    return None
-
-                response_json = await response.json()
-                # print(f"Response from user: {response_json}")
-
-                if not response_json:
-                    print("Empty response from api")
-                    return None
-
-                # Normalize name (e.g., remove diacritics)
-                name = response_json[0]["firstname"]
-                full_name = response_json[0]["full_name"]
-                name_non_dia = unidecode.unidecode(name)
-
-                # Create and return User object
-                user = User(
-                    id=response_json[0]["contactid"],
-                    name=name_non_dia,
-                    card_id=card_id,
-                    full_name=full_name,
-                )
+            response = await self._request(CONTACT, "POST", url, json={"rfid": card_id})
+            if response.status != 200:
+                print(f"Response status {response.status}")
+                error_content = response.body
+                print(f"Error content {error_content}")
+                error_message = _error_field(error_content, "message")
+                print(f"Message: {error_message}")
+                return None, response.status == 404
+
+            response_json = response.body
+            # print(f"Response from user: {response_json}")
+
+            if not response_json:
+                print("Empty response from api")
+                return None, True
+
+            # Normalize name (e.g., remove diacritics)
+            name = response_json[0]["firstname"]
+            full_name = response_json[0]["full_name"]
+            import unidecode  # Only needed once a card is tapped
+
+            name_non_dia = unidecode.unidecode(name)
+
+            # Create and return User object
+            user = User(
+                id=response_json[0]["contactid"],
+                name=name_non_dia,
+                card_id=card_id,
+                full_name=full_name,
+            )
             print("User data: Fetched.")
-            return user
+            return user, True
 
         except (aiohttp.ClientError, asyncio.TimeoutError):
             print("Error in fetch user")
-            return None
+            return None, False
 
     # Start or extend a reservation
     async def start_extend_reservation(
@@ -136,25 +240,24 @@ class APIClient:
         headers = {"Authorization": "Bearer " + token.string}
         url = config.RECORDING_START
         try:
-            async with self.session.post(
-                url=url, json=payload, headers=headers, timeout=REQUEST_TIMEOUT
-            ) as response:
-                if response.status != 200:
-                    error_content = await response.json()
-                    error_message = error_content.get("status")
-                    print(f"Message: {error_message}")
-                    return None
-                else:
-                    response_content = await response.json()
-
-                    session = Reservation(
-                        recording_id=response_content["recording"],
-                        reservation_id=response_content["reservation"],
-                        remaining_time=int(response_content["timetoend"]),
-                    )
-                    print("Recording START/EXTEND: Started/Extended.")
-                    print(f"Message: {response_content}")
-                    return session
+            response = await self._request(
+                RECORDING_START, "POST", url, json=payload, headers=headers
+            )
+            if response.status != 200:
+                error_message = _error_field(response.body, "status")
+                print(f"Message: {error_message}")
+                return None
+            else:
+                response_content = response.body
+
+                session = Reservation(
+                    recording_id=response_content["recording"],
+                    reservation_id=response_content["reservation"],
+                    remaining_time=int(response_content["timetoend"]),
+                )
+                print("Recording START/EXTEND: Started/Extended.")
+                print(f"Message: {response_content}")
+                return session
 
         except (aiohttp.ClientError, asyncio.TimeoutError):
             print("Error in start_recording")
@@ -167,21 +270,17 @@ class APIClient:
         headers = {"Authorization": "Bearer " + token.string}
         url = config.RECORDING_INFO.format(reservation_id=reservation.reservation_id)
         try:
-            async with self.session.get(
-                url=url, headers=headers, timeout=REQUEST_TIMEOUT
-            ) as response:
-                if response.status != 200:
-                    error_content = await response.json()
-                    error_message = error_content.get("status")
-                    print(
-                        f"Recording info status {error_content}, message: {error_message}"
-                    )
-                else:
-                    response_content = await response.json()
-                    # Update remaining time
-                    reservation.remaining_time = int(response_content["timetoend"])
-
-                    return reservation
+            response = await self._request(RECORDING_INFO, "GET", url, headers=headers)
+            if response.status != 200:
+                error_content = response.body
+                error_message = _error_field(error_content, "status")
+                print(f"Recording info status {error_content}, message: {error_message}")
+            else:
+                response_content = response.body
+                # Update remaining time (restarts the local countdown)
+                reservation.sync(int(response_content["timetoend"]))
+
+                return reservation
 
         except (aiohttp.ClientError, asyncio.TimeoutError):
             print("Error in fetch_recording_info")
@@ -200,16 +299,15 @@ class APIClient:
         url = config.RECORDING_STOP
 
         try:
-            async with self.session.post(
-                url=url, json=payload, headers=headers, timeout=REQUEST_TIMEOUT
-            ) as response:
-                if response.status != 200:
-                    error_content = await response.json()
-                    error_message = error_content.get("status")
-                    print(f"Message: {error_message}")
-                    return None
-                else:
-                    print("Recording STOP: Recording Stopped.")
+            response = await self._request(
+                RECORDING_STOP, "POST", url, json=payload, headers=headers
+            )
+            if response.status != 200:
+                error_message = _error_field(response.body, "status")
+                print(f"Message: {error_message}")
+                return None
+            else:
+                print("Recording STOP: Recording Stopped.")
 
         except (aiohttp.ClientError, asyncio.TimeoutError):
             print("Error in stop_recording")
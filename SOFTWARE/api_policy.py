@@ -0,0 +1,141 @@
+import random
+import time
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+import aiohttp
+
+# Endpoint names used by APIClient
+TOKEN = "token"
+EQUIPMENT = "equipment"
+CONTACT = "contact"
+RECORDING_START = "recording_start"
+RECORDING_INFO = "recording_info"
+RECORDING_STOP = "recording_stop"
+
+FAILURE_STATUSES = range(500, 600)  # Responses that count as backend failures
+FAILURE_THRESHOLD = 3  # Consecutive failures that open the breaker
+RESET_TIMEOUT = 30.0  # Seconds the breaker stays open before a trial request
+
+
+@dataclass(frozen=True)
+class EndpointPolicy:
+    """Timeout and retry budget of one endpoint."""
+
+    timeout: aiohttp.ClientTimeout
+    retries: int = 0  # Only for idempotent requests
+    retry_delay: float = 0.3  # Base delay (seconds), doubled per attempt, jittered
+    retry_max_delay: float = 2.0
+
+
+def _timeout(total: float, connect: float = 2) -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(total=total, connect=connect, sock_read=total)
+
+
+ENDPOINT_POLICIES = {
+    TOKEN: EndpointPolicy(_timeout(8, connect=3)),  # Background refresh
+    EQUIPMENT: EndpointPolicy(_timeout(8, connect=3)),  # Startup only
+    CONTACT: EndpointPolicy(_timeout(4)),  # User is waiting at the device
+    RECORDING_START: EndpointPolicy(_timeout(6)),  # POST, never retried
+    RECORDING_INFO: EndpointPolicy(_timeout(3), retries=2),  # Idempotent GET
+    RECORDING_STOP: EndpointPolicy(_timeout(6)),  # POST, never retried
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the backend is known to be down."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Backend unavailable, retry in {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Shared circuit breaker for the backend.
+    - closed: requests pass; FAILURE_THRESHOLD consecutive failures open it
+    - open: requests fail instantly with CircuitOpenError for RESET_TIMEOUT
+    - half-open: one trial request passes; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0  # Times the breaker opened, for diagnostics
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        """True while requests are being refused."""
+        return self.state == self.OPEN and self.retry_after() > 0
+
+    def retry_after(self) -> float:
+        """Seconds until the next trial request is allowed."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def check(self):
+        """Raises CircuitOpenError unless a request may be sent now."""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            retry_after = self.retry_after()
+            if retry_after > 0:
+                raise CircuitOpenError(retry_after)
+            self.state = self.HALF_OPEN
+            self._trial_running = False
+        if self._trial_running:
+            raise CircuitOpenError(1.0)  # Another request is probing the backend
+        self._trial_running = True
+
+    def record_success(self):
+        self.failures = 0
+        self._trial_running = False
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            print("[API] Backend reachable again, circuit closed")
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        """Ends a trial request that gave no verdict (e.g. cancelled)."""
+        self._trial_running = False
+
+    def _open(self):
+        was_open = self.state == self.OPEN
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        if not was_open:
+            self.opened += 1
+            print(f"[API] Backend failing, circuit open for {self.reset_timeout:.0f} s")
+
+
+def retry_delay(policy: EndpointPolicy, attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number attempt (0-based)."""
+    ceiling = min(policy.retry_delay * 2**attempt, policy.retry_max_delay)
+    return random.uniform(0, ceiling)
+
+
+@dataclass
+class APIResponse:
+    """Status, parsed JSON body (None if not JSON) and headers of a response."""
+
+    status: int
+    body: Optional[object]
+    headers: Mapping[str, str]
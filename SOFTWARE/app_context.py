@@ -1,4 +1,3 @@
-import asyncio
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING
 from model_classes import Instrument, Reservation, Token, User
@@ -6,10 +5,17 @@ from screen_manager import Screens
 from rfid_reader import RFIDReader
 from logger import Logger
 from api_client import APIClient
+from connectivity import ConnectivityService
+from user_cache import UserCache
 from gpiozero import Button
 
 if TYPE_CHECKING:
     from states.base_state import State
+    from token_handler import TokenManager
+    from bootstrap import Bootstrap
+    from netinfo import NetInfo
+    from events import EventBus
+    from button_service import ButtonService, HoldProgressRenderer
 
 
 @dataclass
@@ -33,6 +39,7 @@ class AppContext:
 
     state: "State" = None  # <- Forward reference string
     token: Token = None
+    token_manager: "TokenManager" = None
     instrument: Instrument = None
     user: User = None
     reservation: Reservation = None
@@ -42,9 +49,15 @@ class AppContext:
     screens: Screens = None
     rfid_reader: RFIDReader = None
     api: APIClient = None
+    user_cache: UserCache = None
     stop_btn: Button = None
     extend_btn: Button = None
+    buttons: "ButtonService" = None  # Press/long press/double press events of both buttons
+    hold_progress: "HoldProgressRenderer" = None  # Progress bar while a button is held
     network_status: bool = True  # True: Device is online, False: Device is offline
+    connectivity: ConnectivityService = None
+    netinfo: "NetInfo" = None  # Interface addresses and link state, with change events
+    events: "EventBus" = None  # Business events, fanned out to the log sinks
+    bootstrap: "Bootstrap" = None  # Startup steps, some finish in the background
     lock = None
     counter = 100
-    button_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
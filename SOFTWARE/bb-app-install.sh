@@ -13,6 +13,9 @@ PYTHON_BIN="${VENV_DIR}/bin/python"
 PIP_BIN="${VENV_DIR}/bin/pip"
 ENTRYPOINT="${SCRIPT_DIR}/bb-app-main.py"
 REQUIREMENTS_FILE="${SCRIPT_DIR}/requirements.txt"
+# BB_APP_BUNDLE=1: run a precompiled zipapp (bundle.py) instead of the sources
+BB_APP_BUNDLE="${BB_APP_BUNDLE:-0}"
+BUNDLE_FILE="${SCRIPT_DIR}/dist/bluebox.pyz"
 APT_PACKAGES=(
   python3
   python3-venv
@@ -93,6 +96,21 @@ python3 -c "import lgpio; print('System lgpio import OK')"
 "${PYTHON_BIN}" -c "from RPLCD.i2c import CharLCD; print('RPLCD CharLCD import OK')"
 PYTHONPATH=/usr/lib/python3/dist-packages "${PYTHON_BIN}" -c "import lgpio; print('Venv can import system lgpio via PYTHONPATH')"
 
+# Precompile the venv, so no module is compiled on the first start after an update
+"${PYTHON_BIN}" -m compileall -q "${VENV_DIR}/lib" || true
+
+EXEC_START="${PYTHON_BIN} ${ENTRYPOINT}"
+SERVICE_PYTHONPATH="/usr/lib/python3/dist-packages"
+if [[ "${BB_APP_BUNDLE}" == "1" ]]; then
+  echo "Building precompiled bundle ${BUNDLE_FILE}"
+  "${PYTHON_BIN}" "${SCRIPT_DIR}/bundle.py" --output "${BUNDLE_FILE}"
+  EXEC_START="${PYTHON_BIN} ${BUNDLE_FILE}"
+  # config/ is not in the bundle, it is imported from the app directory
+  SERVICE_PYTHONPATH="${SCRIPT_DIR}:${SERVICE_PYTHONPATH}"
+else
+  "${PYTHON_BIN}" "${SCRIPT_DIR}/bundle.py" --output "${BUNDLE_FILE}" --clean
+fi
+
 if sudo systemctl cat "${SERVICE_NAME}" 2>/dev/null | grep -q "GPIOZERO_PIN_FACTORY="; then
   echo "Warning: Existing ${SERVICE_NAME} has GPIOZERO_PIN_FACTORY override."
   echo "This deployment expects default gpiozero backend (rpigpio)." >&2
@@ -110,11 +128,11 @@ Type=simple
 User=${SERVICE_USER}
 Group=${SERVICE_GROUP}
 WorkingDirectory=${SCRIPT_DIR}
-ExecStart=${PYTHON_BIN} ${ENTRYPOINT}
+ExecStart=${EXEC_START}
 Restart=always
 RestartSec=5
 Environment=PYTHONUNBUFFERED=1
-Environment=PYTHONPATH=/usr/lib/python3/dist-packages
+Environment=PYTHONPATH=${SERVICE_PYTHONPATH}
 Environment=GPIOZERO_PIN_FACTORY=lgpio
 
 [Install]
@@ -1,80 +1,174 @@
 import asyncio
 import contextlib
+import importlib
 import signal
-import aiohttp
-from states.init_state import InitState
-from app_context import AppContext
-from screen_manager import Screens
+import time
+
+STARTED = time.monotonic()
+
+# Only what the first frame needs is imported up front; the rest (aiohttp,
+# gpiozero, the states, ...) is loaded while "Starting..." is on the LCD
 from lcd_display import LCDController
-from rfid_reader import RFIDReader
-from api_client import APIClient
-from gpiozero import Button
-from networking import network_monitor
-from http_config import REQUEST_TIMEOUT
+from screen_manager import Screens
+from executors import SYSTEM, run_in
+
+APP_MODULES = (
+    "aiohttp",
+    "gpiozero",
+    "app_context",
+    "api_client",
+    "button_service",
+    "connectivity",
+    "event_sinks",
+    "http_config",
+    "netinfo",
+    "networking",
+    "rfid_reader",
+    "state_machine",
+    "states.init_state",
+    "timer_service",
+    "token_handler",
+    "user_cache",
+)
+
+
+def _import_app():
+    """Runs in the system thread, so the event loop keeps driving the LCD."""
+    for name in APP_MODULES:
+        importlib.import_module(name)
 
 
 async def main():
-    stop_event = asyncio.Event()
     loop = asyncio.get_running_loop()
 
-    for sig in (signal.SIGINT, signal.SIGTERM):
-        with contextlib.suppress(NotImplementedError):
-            loop.add_signal_handler(sig, stop_event.set)
+    # LCD controller wrapped by screen manager; light it up before anything else
+    screens = Screens(LCDController())
+    first_frame = await screens.starting_screen()
+    await first_frame.shown.wait()
+    print(f"[Startup] First frame after {(time.monotonic() - STARTED) * 1000:.0f} ms")
+    await run_in(SYSTEM, _import_app)
+    print(f"[Startup] Application loaded after {(time.monotonic() - STARTED) * 1000:.0f} ms")
+
+    # Loaded by _import_app already, these only bind the names
+    import aiohttp
+    from gpiozero import Button
+    from app_context import AppContext
+    from api_client import APIClient
+    from button_service import ButtonService, HoldProgressRenderer
+    from connectivity import ConnectivityService
+    from events import EventBus
+    from executors import shutdown_executors, watchdog
+    from http_config import REQUEST_TIMEOUT
+    from metrics import MetricsExporter
+    from netinfo import NetInfo
+    from networking import address_monitor, network_monitor
+    from rfid_reader import RFIDReader
+    from state_machine import StateMachine
+    from states.init_state import InitState
+    from timer_service import wakeup_reporter
+    from token_handler import TokenManager
+    from user_cache import UserCache
 
     context = AppContext()  # Shared app context passed to all states
-    context.state = InitState()  # Start in InitState (loads config, token, etc.)
-    context.screens = Screens(
-        LCDController()
-    )  # LCD controller wrapped by screen manager
+    context.screens = screens
+    # Business events; InitState adds the sinks once the instrument is known
+    context.events = EventBus()
+    # Start in InitState (loads config, token, etc.)
+    machine = StateMachine(context, InitState())
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, machine.stop)
+    # kill -USR1 <pid> prints the recent state transitions
+    with contextlib.suppress(NotImplementedError):
+        loop.add_signal_handler(signal.SIGUSR1, machine.print_timeline)
 
     # Define GPIO buttons with pin numbers and debounce/hold times
     context.stop_btn = Button(21, hold_time=0.1, bounce_time=0.05)
     context.extend_btn = Button(13, hold_time=0.1, bounce_time=0.05)
+    # Gestures from press/release edges; the hold progress bar is drawn separately
+    context.buttons = ButtonService({"stop": context.stop_btn, "extend": context.extend_btn})
+    context.hold_progress = HoldProgressRenderer(context.buttons, context.screens)
     context.rfid_reader = RFIDReader()  # RFID input (hardware abstraction)
+    # Interface addresses/link state from netlink, with change events
+    context.netinfo = NetInfo()
+    # Shared online/offline detection, reacts to link changes at once
+    context.connectivity = ConnectivityService(netinfo=context.netinfo)
 
     # Global async lock for shared state (e.g. logging)
     context.lock = asyncio.Lock()
 
     network_task = None
+    address_task = None
+    # Local /metrics endpoint and/or Prometheus textfile
+    exporter = MetricsExporter()
+    await exporter.start()
+    # Reports calls stuck in the per-subsystem executors (RFID, LCD, Sheets, ...)
+    watchdog_task = asyncio.create_task(watchdog())
+    # Timer wakeups and process context switches per second (gauges, periodic log line)
+    wakeup_task = asyncio.create_task(wakeup_reporter())
     try:
         async with aiohttp.ClientSession(timeout=REQUEST_TIMEOUT) as session:
             context.api = APIClient(session=session)  # API handler (auth, user, reservation)
+            # In-memory token with background refresh
+            context.token_manager = TokenManager(context.api)
+            await context.token_manager.start()
+            # Card -> user lookups, cached across taps and restarts
+            context.user_cache = UserCache(context.api)
+            await context.user_cache.start()
+
+            context.buttons.start()
+            context.hold_progress.start()
+            await context.netinfo.start()
+            await context.connectivity.start()
+            # Keeps the instrument IP current (logged with every session)
+            address_task = asyncio.create_task(address_monitor(context))
 
             # Start network monitor as background task (e.g. to update UI or trigger OfflineState)
             network_task = asyncio.create_task(network_monitor(context.screens, context))
 
-            # Main control loop: executes and transitions between states
-            while not stop_event.is_set():
-                state_task = asyncio.create_task(context.state.run(context))
-                stop_task = asyncio.create_task(stop_event.wait())
-
-                done, pending = await asyncio.wait(
-                    [state_task, stop_task],
-                    return_when=asyncio.FIRST_COMPLETED,
-                )
-
-                for task in pending:
-                    task.cancel()
-                    with contextlib.suppress(asyncio.CancelledError):
-                        await task
-
-                if stop_task in done:
-                    state_task.cancel()
-                    with contextlib.suppress(asyncio.CancelledError):
-                        await state_task
-                    break
-
-                context.state = state_task.result()
+            # Main control loop: executes and transitions between states until stopped
+            await machine.run()
     finally:
-        if network_task is not None:
-            network_task.cancel()
-            with contextlib.suppress(asyncio.CancelledError):
-                await network_task
+        machine.print_timeline(last=20)
+        for task in (network_task, address_task):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        # Hand queued events to the sinks, then flush the log writes
+        await context.events.close()
+        # Flush queued log writes before the process exits (while the log sheet
+        # setup can still finish; unsent rows stay in the journal)
+        if context.logger is not None:
+            await context.logger.close()
+        # Stop startup steps still running in the background (e.g. log sheet setup)
+        if context.bootstrap is not None:
+            await context.bootstrap.close()
+        await context.connectivity.close()
+        await context.netinfo.close()
+        if context.token_manager is not None:
+            await context.token_manager.close()
+        if context.user_cache is not None:
+            await context.user_cache.close()
+
+        await context.hold_progress.close()
+        context.buttons.close()
+        await context.screens.scheduler.close()
 
         if context.stop_btn is not None:
             context.stop_btn.close()
         if context.extend_btn is not None:
             context.extend_btn.close()
+        context.rfid_reader.close()
+
+        await exporter.close()
+        for task in (watchdog_task, wakeup_task):
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        # Do not wait for threads stuck in blocking hardware calls (e.g. RFID read)
+        shutdown_executors()
 
 
 if __name__ == "__main__":
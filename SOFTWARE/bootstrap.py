@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from config import config
+from executors import DISK, run_in
+from metrics import counter, gauge, histogram
+from model_classes import Instrument
+
+BOOT_CACHE_FILE = getattr(
+    config, "BOOT_CACHE_FILE", Path("/home/bluebox/boot_cache.json")
+)
+
+RETRY_MIN_DELAY = 1.0  # Backoff bounds (seconds) for failed bootstrap steps
+RETRY_MAX_DELAY = 60.0
+
+STEP_SECONDS = histogram(
+    "bluebox_bootstrap_step_seconds", "Time from start to success of one bootstrap step"
+)
+STEP_FAILURES = counter("bluebox_bootstrap_step_failures", "Failed bootstrap step attempts")
+READY_SECONDS = gauge(
+    "bluebox_bootstrap_ready_seconds", "Time from InitState start to waiting for a card"
+)
+
+
+@dataclass
+class Step:
+    """
+    One bootstrap step.
+    run gets the results of the steps in `after` as keyword arguments;
+    returning None counts as a failure and the step is retried with backoff.
+    """
+
+    name: str
+    run: Callable[..., Awaitable]
+    after: tuple[str, ...] = ()
+    started: float = 0.0
+    attempts: int = 0
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class Bootstrap:
+    """
+    Runs startup steps as a dependency graph.
+    - Every step starts as soon as the steps it depends on have succeeded,
+      so independent steps (MAC, IP, connectivity, token, ...) run at the same time
+    - Failed steps are retried with full-jitter exponential backoff, never less
+      than hold_off() (e.g. until the circuit breaker lets requests through)
+    - Steps nobody waits for keep running in the background until close()
+    """
+
+    def __init__(self, hold_off: Optional[Callable[[], float]] = None):
+        self.steps: dict[str, Step] = {}
+        self.started = time.monotonic()
+        self._hold_off = hold_off
+
+    def add(self, name: str, run: Callable[..., Awaitable], after: tuple[str, ...] = ()):
+        for dependency in after:
+            if dependency not in self.steps:
+                raise ValueError(f"Bootstrap step {name} depends on unknown step {dependency}")
+        self.steps[name] = Step(name, run, tuple(after))
+
+    def start(self):
+        """Starts every step that is not running yet."""
+        for step in self.steps.values():
+            if step.task is None:
+                step.task = asyncio.create_task(self._run_step(step))
+
+    async def wait(self, *names: str) -> list:
+        """Results of the given steps, once they have all succeeded."""
+        self.start()
+        # Shield, so a cancelled caller leaves the steps running for close()
+        return await asyncio.shield(
+            asyncio.gather(*(self.steps[name].task for name in names))
+        )
+
+    def result(self, name: str):
+        """Result of a finished step, None while it is still running."""
+        task = self.steps[name].task
+        if task is None or not task.done() or task.cancelled() or task.exception():
+            return None
+        return task.result()
+
+    def pending(self) -> list[str]:
+        return [
+            name for name, step in self.steps.items() if step.task is None or not step.task.done()
+        ]
+
+    async def close(self):
+        """Cancels the steps that are still running."""
+        tasks = [step.task for step in self.steps.values() if step.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.pending():
+            print(f"[Bootstrap] Stopped with unfinished steps: {', '.join(self.pending())}")
+
+    async def _run_step(self, step: Step):
+        inputs = {}
+        for dependency in step.after:
+            inputs[dependency] = await self.steps[dependency].task
+        step.started = time.monotonic()
+        while True:
+            step.attempts += 1
+            try:
+                result = await step.run(**inputs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Bootstrap] {step.name} failed: {e}")
+                result = None
+            if result is not None:
+                elapsed = time.monotonic() - step.started
+                STEP_SECONDS.observe(elapsed, step=step.name)
+                print(
+                    f"[Bootstrap] {step.name} done in {elapsed:.3f} s "
+                    f"(attempt {step.attempts}, {time.monotonic() - self.started:.3f} s since boot)"
+                )
+                return result
+            STEP_FAILURES.inc(step=step.name)
+            delay = self._retry_delay(step.attempts)
+            print(f"[Bootstrap] {step.name} failed, retrying in {delay:.1f} s")
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, attempts: int) -> float:
+        ceiling = min(RETRY_MIN_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+        delay = random.uniform(RETRY_MIN_DELAY, ceiling)
+        if self._hold_off is not None:
+            delay = max(delay, self._hold_off())
+        return delay
+
+
+@dataclass
+class BootCache:
+    """What the last successful boot learned, so the next one need not wait for it."""
+
+    instrument: Optional[Instrument] = None
+    sheet_key: Optional[str] = None  # Spreadsheet ID of the log sheet
+    saved_at: float = 0.0  # Wall clock
+
+
+class WarmStartCache:
+    """
+    Instrument metadata and the log sheet key, persisted (atomically) after a boot.
+    A warm boot trusts them and revalidates in the background.
+    """
+
+    def __init__(self, path: Path = BOOT_CACHE_FILE):
+        self.path = Path(path)
+        self.data = BootCache()
+        self._save_lock = asyncio.Lock()
+
+    async def load(self) -> BootCache:
+        self.data = await run_in(DISK, self._read_file)
+        return self.data
+
+    def instrument_for(self, mac: Optional[str]) -> Optional[Instrument]:
+        """Cached instrument, if it was fetched for this MAC address."""
+        instrument = self.data.instrument
+        if instrument is None or not mac or instrument.mac_address != mac:
+            return None
+        return instrument
+
+    async def save(self, **changes):
+        """Updates fields of the cache (instrument=..., sheet_key=...) and writes it."""
+        for name, value in changes.items():
+            setattr(self.data, name, value)
+        self.data.saved_at = time.time()
+        data = asdict(self.data)
+        try:
+            async with self._save_lock:
+                await run_in(DISK, self._write_file, data)
+        except Exception as e:
+            print(f"[Bootstrap] Failed to save boot cache: {e}")
+
+    def _read_file(self) -> BootCache:
+        if not self.path.exists():
+            return BootCache()
+        try:
+            data = json.loads(self.path.read_text())
+            instrument = data.get("instrument")
+            return BootCache(
+                instrument=Instrument(**instrument) if instrument is not None else None,
+                sheet_key=data.get("sheet_key"),
+                saved_at=float(data.get("saved_at", 0.0)),
+            )
+        except Exception as e:
+            print(f"[Bootstrap] Error loading boot cache: {e}")
+            return BootCache()
+
+    def _write_file(self, data: dict):
+        # Write to a temp file and rename, so a power cut never leaves half a file
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            handle.write(json.dumps(data))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.path)
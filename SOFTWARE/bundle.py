@@ -0,0 +1,92 @@
+"""
+Builds dist/bluebox.pyz: the application as a zipapp of precompiled .pyc files.
+
+One uncompressed archive replaces the directory scans, source stats and
+(on a fresh or read-only install) compilation of every module at startup.
+The .pyc files only fit the interpreter that built them, so the bundle is
+built on the device by bb-app-install.sh (BB_APP_BUNDLE=1):
+
+    .venv/bin/python bundle.py
+    .venv/bin/python dist/bluebox.pyz
+
+config/ is not bundled; it is found through PYTHONPATH (the app directory).
+"""
+
+import argparse
+import os
+import py_compile
+import sys
+import tempfile
+import zipapp
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+BUNDLE_FILE = APP_DIR / "dist" / "bluebox.pyz"
+ENTRY_MODULE = "bb_app_main"  # bb-app-main.py, renamed to be importable
+PACKAGES = ("states",)
+EXCLUDE = {"bundle.py", "import_profile.py"}  # Build/profiling tools
+
+MAIN_STUB = f"""import runpy
+
+runpy.run_module({ENTRY_MODULE!r}, run_name="__main__", alter_sys=True)
+"""
+
+
+def sources() -> list[tuple[Path, str]]:
+    """(source file, module path inside the bundle) of every app module."""
+    files = [
+        (path, path.name)
+        for path in sorted(APP_DIR.glob("*.py"))
+        if path.name not in EXCLUDE and path.name != "bb-app-main.py"
+    ]
+    files.append((APP_DIR / "bb-app-main.py", f"{ENTRY_MODULE}.py"))
+    for package in PACKAGES:
+        for path in sorted((APP_DIR / package).glob("*.py")):
+            files.append((path, f"{package}/{path.name}"))
+    return files
+
+
+def build(target: Path = BUNDLE_FILE) -> Path:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="bluebox-bundle-") as staging:
+        staging = Path(staging)
+        for source, name in sources():
+            compiled = staging / Path(name).with_suffix(".pyc")
+            compiled.parent.mkdir(parents=True, exist_ok=True)
+            # Sourceless .pyc next to where the .py would be, never checked against a source
+            py_compile.compile(
+                str(source),
+                cfile=str(compiled),
+                dfile=name,
+                doraise=True,
+                invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+            )
+        (staging / "__main__.py").write_text(MAIN_STUB)
+
+        # Build next to the target and rename, so the service never sees half a bundle
+        tmp_target = target.with_name(target.name + ".tmp")
+        zipapp.create_archive(staging, tmp_target, compressed=False)
+        os.replace(tmp_target, target)
+    return target
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the precompiled zipapp bundle")
+    parser.add_argument("--output", type=Path, default=BUNDLE_FILE, help="Bundle file")
+    parser.add_argument("--clean", action="store_true", help="Remove the bundle instead")
+    args = parser.parse_args(argv)
+
+    if args.clean:
+        args.output.unlink(missing_ok=True)
+        print(f"[Bundle] Removed {args.output}")
+        return 0
+    target = build(args.output)
+    print(
+        f"[Bundle] Built {target} ({target.stat().st_size // 1024} KiB, "
+        f"Python {sys.version_info.major}.{sys.version_info.minor})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
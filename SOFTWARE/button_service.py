@@ -0,0 +1,227 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Optional
+
+from gpiozero import Button
+
+from metrics import counter
+
+if TYPE_CHECKING:
+    from screen_manager import Screens
+
+HOLD_DURATION = (
+    1.8  # seconds needed to hold a button to trigger extend or stop reservation
+)
+DOUBLE_PRESS_WINDOW = 0.4  # Seconds between two short presses that make a double press
+PROGRESS_FRAME = 0.1  # Seconds between progress bar frames while a button is held
+PROGRESS_STEPS = 18  # Characters of the progress bar (plus brackets = one LCD line)
+
+# Gestures delivered to subscribers
+SHORT_PRESS = "short_press"  # Released before HOLD_DURATION, no second press followed
+DOUBLE_PRESS = "double_press"  # Two short presses within DOUBLE_PRESS_WINDOW
+LONG_PRESS = "long_press"  # Held for HOLD_DURATION (sent while still held)
+
+GESTURES = counter("bluebox_button_gestures", "Recognized button gestures")
+
+
+@dataclass
+class ButtonEvent:
+    button: str  # Name given to ButtonService, e.g. "stop"
+    gesture: str
+    at: float  # time.monotonic() of the press (or second press)
+    duration: float  # Seconds the button was down (HOLD_DURATION for LONG_PRESS)
+
+
+@dataclass
+class _Press:
+    started: float  # time.monotonic() of the press edge
+    hold_timer: Optional[asyncio.TimerHandle] = None
+    long: bool = False
+
+
+class ButtonService:
+    """
+    Persistent, event-driven button engine.
+    - Bound once to gpiozero press/release edges (from gpiozero's thread)
+    - Hold timing runs on a loop timer from the monotonic press time, so a long
+      press fires exactly HOLD_DURATION after the press, whatever the LCD does
+    - Gestures (short, double, long press) go to subscriber queues
+    - Nothing runs while no button is pressed
+    """
+
+    def __init__(
+        self,
+        buttons: dict[str, Button],
+        hold_duration: float = HOLD_DURATION,
+        double_press_window: float = DOUBLE_PRESS_WINDOW,
+    ):
+        self.buttons = buttons
+        self.hold_duration = hold_duration
+        self.double_press_window = double_press_window
+        self.changed = asyncio.Event()  # Set on every press/release/long press
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: list[asyncio.Queue] = []
+        self._presses: dict[str, _Press] = {}
+        self._last_short: dict[str, float] = {}  # Release time of an unresolved short press
+        self._single_timers: dict[str, asyncio.TimerHandle] = {}
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        for name, button in self.buttons.items():
+            button.when_pressed = lambda name=name: self._edge(name, True)
+            button.when_released = lambda name=name: self._edge(name, False)
+
+    def close(self):
+        for button in self.buttons.values():
+            button.when_pressed = None
+            button.when_released = None
+        for press in self._presses.values():
+            if press.hold_timer is not None:
+                press.hold_timer.cancel()
+        for timer in self._single_timers.values():
+            timer.cancel()
+        self._presses.clear()
+        self._single_timers.clear()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Returns a queue receiving a ButtonEvent for every recognized gesture."""
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    @property
+    def holding(self) -> bool:
+        """True while a button is down and its long press has not fired yet."""
+        return any(not press.long for press in self._presses.values())
+
+    def progress(self, name: str) -> Optional[float]:
+        """Fraction (0..1) of HOLD_DURATION the button has been held, None if it is up."""
+        press = self._presses.get(name)
+        if press is None:
+            return None
+        return min((time.monotonic() - press.started) / self.hold_duration, 1.0)
+
+    def _edge(self, name: str, pressed: bool):
+        """gpiozero callback (its own thread); timestamps the edge and hands it to the loop."""
+        now = time.monotonic()
+        self._loop.call_soon_threadsafe(
+            self._on_press if pressed else self._on_release, name, now
+        )
+
+    def _on_press(self, name: str, now: float):
+        if name in self._presses:
+            return  # Bounce that slipped through
+        press = _Press(started=now)
+        # The loop clock is time.monotonic(), so the deadline is exact
+        press.hold_timer = self._loop.call_at(now + self.hold_duration, self._on_hold, name)
+        self._presses[name] = press
+        self.changed.set()
+
+    def _on_hold(self, name: str):
+        press = self._presses.get(name)
+        if press is None:
+            return
+        press.long = True
+        press.hold_timer = None
+        self._last_short.pop(name, None)
+        self._publish(ButtonEvent(name, LONG_PRESS, press.started, self.hold_duration))
+        self.changed.set()
+
+    def _on_release(self, name: str, now: float):
+        press = self._presses.pop(name, None)
+        if press is None:
+            return
+        self.changed.set()
+        if press.long:
+            return
+        press.hold_timer.cancel()
+        duration = now - press.started
+
+        previous = self._last_short.pop(name, None)
+        if previous is not None and press.started - previous <= self.double_press_window:
+            self._single_timers.pop(name).cancel()
+            self._publish(ButtonEvent(name, DOUBLE_PRESS, press.started, duration))
+            return
+        # A single press is only known once no second press follows
+        self._last_short[name] = now
+        self._single_timers[name] = self._loop.call_later(
+            self.double_press_window,
+            self._on_single,
+            ButtonEvent(name, SHORT_PRESS, press.started, duration),
+        )
+
+    def _on_single(self, event: ButtonEvent):
+        self._single_timers.pop(event.button, None)
+        self._last_short.pop(event.button, None)
+        self._publish(event)
+
+    def _publish(self, event: ButtonEvent):
+        GESTURES.inc(button=event.button, gesture=event.gesture)
+        print(f"[Buttons] {event.button}: {event.gesture} ({event.duration:.2f} s)")
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+
+class HoldProgressRenderer:
+    """
+    Draws the hold progress bar, independent of detection: the bar follows
+    the monotonic hold time at PROGRESS_FRAME, frames never delay the long press.
+    Only buttons with a label (set by the active state) get a bar; the task
+    sleeps on ButtonService.changed while nothing is held.
+    """
+
+    def __init__(self, service: ButtonService, screens: "Screens"):
+        self.service = service
+        self.screens = screens
+        self.labels: dict[str, str] = {}  # Button name -> first LCD line
+        self.enabled: Callable[[], bool] = lambda: True  # e.g. no bar while offline
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _held(self) -> Optional[tuple[str, float]]:
+        if not self.enabled():
+            return None
+        for name, label in self.labels.items():
+            progress = self.service.progress(name)
+            if progress is not None and progress < 1.0:
+                return label, progress
+        return None
+
+    async def _run(self):
+        showing = False
+        while True:
+            held = self._held()
+            if held is None:
+                if showing:
+                    self.screens.loading_screen_clear()
+                    showing = False
+                self.service.changed.clear()
+                await self.service.changed.wait()
+                continue
+            label, progress = held
+            done = min(int(progress * PROGRESS_STEPS) + 1, PROGRESS_STEPS)
+            bar = "[" + "#" * done + " " * (PROGRESS_STEPS - done) + "]"
+            await self.screens.loading_screen_step(label, bar)
+            showing = True
+            self.service.changed.clear()
+            try:
+                await asyncio.wait_for(self.service.changed.wait(), timeout=PROGRESS_FRAME)
+            except asyncio.TimeoutError:
+                pass
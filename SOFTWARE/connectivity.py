@@ -0,0 +1,269 @@
+import asyncio
+import random
+import struct
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from config import config
+from http_config import CONNECTIVITY_TIMEOUT
+from timer_service import get_timers
+
+if TYPE_CHECKING:
+    from netinfo import NetInfo
+
+
+# Raw TCP targets (IP literals, so no DNS lookup is needed for this probe)
+PROBE_TCP_TARGETS = [
+    ("1.1.1.1", 443),
+    ("8.8.8.8", 53),
+]
+
+# Public resolvers queried directly over UDP (bypasses the local DNS cache)
+PROBE_DNS_RESOLVERS = [
+    ("1.1.1.1", 53),
+    ("8.8.8.8", 53),
+]
+
+
+def _backend_origin() -> tuple[str, str, int]:
+    """Returns (origin url, host, port) of the backend from config."""
+    parts = urlsplit(config.FETCH_TOKEN)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.netloc}/", parts.hostname, port
+
+
+def _dns_query(host: str, query_id: int) -> bytes:
+    """Builds a minimal DNS query packet (A record, recursion desired)."""
+    header = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0)
+    qname = b"".join(
+        bytes([len(label)]) + label.encode("ascii")
+        for label in host.strip(".").split(".")
+    )
+    return header + qname + b"\x00" + struct.pack("!HH", 1, 1)
+
+
+class _DNSProbeProtocol(asyncio.DatagramProtocol):
+    def __init__(self, query_id: int, answered: asyncio.Future):
+        self.query_id = query_id
+        self.answered = answered
+
+    def datagram_received(self, data, addr):
+        # Any well-formed reply with our ID proves the resolver is reachable
+        if len(data) >= 2 and struct.unpack("!H", data[:2])[0] == self.query_id:
+            if not self.answered.done():
+                self.answered.set_result(True)
+
+    def error_received(self, exc):
+        if not self.answered.done():
+            self.answered.set_exception(exc)
+
+
+class ConnectivityService:
+    """
+    Long-lived connectivity monitor.
+    - Races cheap probes (TCP connect, HEAD to backend, DNS) in every round
+    - Reuses one HTTP connector, so HEAD probes ride a kept-alive connection
+    - Backs off adaptively while offline
+    - With NetInfo: goes offline the moment the link drops (no probe timeouts)
+      and probes right away when link or addresses come back
+    - Publishes online/offline changes to subscribers
+    """
+
+    def __init__(
+        self,
+        online_interval: float = 5.0,
+        offline_min_interval: float = 1.0,
+        offline_max_interval: float = 15.0,
+        failure_threshold: int = 3,
+        netinfo: Optional["NetInfo"] = None,
+    ):
+        self.online_interval = online_interval
+        self.offline_min_interval = offline_min_interval
+        self.offline_max_interval = offline_max_interval
+        self.failure_threshold = failure_threshold  # Failed rounds before offline
+
+        self.backend_url, self.backend_host, self.backend_port = _backend_origin()
+
+        self._online = asyncio.Event()
+        self._offline = asyncio.Event()
+        self._online.set()  # Assume online until proven otherwise
+        self._subscribers: list[asyncio.Queue] = []
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._consecutive_failures = 0
+        self._offline_interval = offline_min_interval
+        self.netinfo = netinfo
+        self._wake = asyncio.Event()  # Cuts the wait before the next probe round short
+        self._link_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_online(self) -> bool:
+        return self._online.is_set()
+
+    async def start(self):
+        """Opens the shared connector and starts the background probe loop."""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=2, keepalive_timeout=60, ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=CONNECTIVITY_TIMEOUT
+            )
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if self.netinfo is not None and self._link_task is None:
+            self._link_task = asyncio.create_task(self._watch_link())
+
+    async def close(self):
+        for task in (self._link_task, self._task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._link_task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """Returns a queue receiving True/False on every connectivity change."""
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    async def wait_online(self):
+        await self._online.wait()
+
+    async def wait_offline(self):
+        await self._offline.wait()
+
+    async def check(self) -> bool:
+        """Runs one probe round. Returns True as soon as any probe succeeds."""
+        if self.netinfo is not None and not self.netinfo.link_up:
+            return False  # No link or no address: nothing can answer
+        probes = [
+            asyncio.create_task(self._probe_tcp(host, port))
+            for host, port in PROBE_TCP_TARGETS
+        ]
+        probes.append(asyncio.create_task(self._probe_head()))
+        probes.append(asyncio.create_task(self._probe_dns()))
+
+        deadline = CONNECTIVITY_TIMEOUT.total
+        pending = set(probes)
+        try:
+            async with asyncio.timeout(deadline):
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        if not task.cancelled() and task.exception() is None:
+                            if task.result():
+                                return True
+        except TimeoutError:
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return False
+
+    async def _probe_tcp(self, host: str, port: int) -> bool:
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    async def _probe_head(self) -> bool:
+        if self._session is None:
+            return False
+        # Any HTTP answer (even 4xx) means the backend host is reachable
+        async with self._session.head(self.backend_url, allow_redirects=False):
+            return True
+
+    async def _probe_dns(self) -> bool:
+        loop = asyncio.get_running_loop()
+        query_id = random.randrange(0x10000)
+        packet = _dns_query(self.backend_host, query_id)
+        answered = loop.create_future()
+        transports = []
+        try:
+            for resolver in PROBE_DNS_RESOLVERS:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _DNSProbeProtocol(query_id, answered),
+                    remote_addr=resolver,
+                )
+                transports.append(transport)
+                transport.sendto(packet)
+            return await answered
+        finally:
+            for transport in transports:
+                transport.close()
+
+    def _set_online(self, online: bool):
+        if online == self.is_online:
+            return
+        if online:
+            self._offline.clear()
+            self._online.set()
+        else:
+            self._online.clear()
+            self._offline.set()
+        print(f"[Connectivity] Device is {'ONLINE' if online else 'OFFLINE'}")
+        for queue in self._subscribers:
+            queue.put_nowait(online)
+
+    def _next_interval(self) -> float:
+        if self.is_online:
+            # Recheck quickly after a failed round to confirm an outage fast
+            if self._consecutive_failures:
+                return self.offline_min_interval
+            return self.online_interval
+        interval = self._offline_interval
+        self._offline_interval = min(interval * 2, self.offline_max_interval)
+        return interval * random.uniform(0.9, 1.1)  # Jitter to avoid fleet sync
+
+    async def _run(self):
+        while True:
+            if await self.check():
+                self._consecutive_failures = 0
+                self._offline_interval = self.offline_min_interval
+                self._set_online(True)
+            else:
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= self.failure_threshold:
+                    self._set_online(False)
+
+            self._wake.clear()
+            try:
+                await get_timers().wait_for(self._wake.wait(), self._next_interval())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _watch_link(self):
+        changes = self.netinfo.subscribe()
+        try:
+            while True:
+                change = await changes.get()
+                if not change.current.link_up:
+                    # Link down is certain, do not wait for probes to time out
+                    self._consecutive_failures = self.failure_threshold
+                    self._set_online(False)
+                else:
+                    # Link back or new address (e.g. DHCP): probe now
+                    self._offline_interval = self.offline_min_interval
+                    self._wake.set()
+        finally:
+            self.netinfo.unsubscribe(changes)
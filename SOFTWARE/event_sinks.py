@@ -0,0 +1,224 @@
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from config import config
+from events import (
+    BoxStarted,
+    CardTapped,
+    ErrorOccurred,
+    Event,
+    SessionEnded,
+    SessionExtended,
+    SessionStarted,
+    Sink,
+    UnknownCard,
+    UserVerified,
+)
+from executors import DISK, SYSTEM, run_in
+from logger import get_column_index
+from session_store import SESSION_DB, RETENTION_DAYS, SessionStore
+
+if TYPE_CHECKING:
+    import aiohttp
+    from logger import Logger
+    from model_classes import Instrument
+
+EVENT_LOG_FILE = getattr(config, "EVENT_LOG_FILE", None)  # JSONL file, None disables
+EVENT_LOG_MAX_BYTES = getattr(config, "EVENT_LOG_MAX_BYTES", 5 * 1024 * 1024)
+EVENT_SYSLOG = getattr(config, "EVENT_SYSLOG", False)  # Also send events to syslog/journald
+EVENT_COLLECTOR_URL = getattr(config, "EVENT_COLLECTOR_URL", None)  # HTTP collector, None disables
+
+_COLUMN = {
+    name: get_column_index(name)
+    for name in (
+        "log_entry",
+        "ip",
+        "token",
+        "instrument",
+        "user_info",
+        "recording_start",
+        "recording_extended",
+        "recording_end",
+        "error",
+    )
+}
+
+
+class SheetsSink(Sink):
+    """
+    Events as rows of the Google Sheet log (one row per boot and per card tap).
+    Only translates to Logger operations: the Logger journals them and
+    batches the sheet calls itself.
+    """
+
+    name = "sheets"
+    linger = 0.0  # Logger.write_log only enqueues
+
+    def __init__(self, logger: "Logger"):
+        self.logger = logger
+
+    async def write(self, events: list[Event]):
+        for event in events:
+            for column, value, note in self._cells(event):
+                if column is None:
+                    await self.logger.insert_new_row(at=event.at)
+                else:
+                    await self.logger.write_log(_COLUMN[column], value, note)
+
+    @staticmethod
+    def _cells(event: Event) -> list[tuple[Optional[str], object, Optional[str]]]:
+        """(column, value, note) writes of an event; column None starts a new row."""
+        if isinstance(event, BoxStarted):
+            return [
+                (None, None, None),
+                ("log_entry", event.at, None),
+                ("ip", event.ip, None),
+                ("instrument", event.instrument, None),
+            ]
+        if isinstance(event, CardTapped):
+            return [(None, None, None), ("log_entry", event.at, None), ("ip", event.ip, None)]
+        if isinstance(event, (UserVerified, UnknownCard)):
+            cells = []
+            if event.token_expiration is not None:
+                cells.append(("token", event.token_expiration, None))
+            user_info = event.full_name if isinstance(event, UserVerified) else event.card_id
+            return cells + [("user_info", user_info, None)]
+        if isinstance(event, SessionStarted):
+            return [("recording_start", event.at, event.reservation_id)]
+        if isinstance(event, SessionExtended):
+            return [("recording_extended", event.at, event.reason)]
+        if isinstance(event, SessionEnded):
+            return [("recording_end", event.at, event.reason)]
+        if isinstance(event, ErrorOccurred):
+            return [("error", event.message, event.source)]
+        return []
+
+
+class JsonlSink(Sink):
+    """Events as JSON lines in a local file, rotated to <file>.1 at max_bytes."""
+
+    name = "jsonl"
+
+    def __init__(self, path: Path, max_bytes: int = EVENT_LOG_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+
+    async def write(self, events: list[Event]):
+        text = "".join(json.dumps(event.record, default=str) + "\n" for event in events)
+        await run_in(DISK, self._append, text)
+
+    def _append(self, text: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if self.path.stat().st_size + len(text) > self.max_bytes:
+                os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+        except FileNotFoundError:
+            pass
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(text)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+class SyslogSink(Sink):
+    """Events as syslog messages (journald picks them up), one line per event."""
+
+    name = "syslog"
+
+    def __init__(self, ident: str = "bluebox"):
+        import syslog  # Unix only
+
+        self._syslog = syslog
+        syslog.openlog(ident, 0, syslog.LOG_DAEMON)
+
+    async def write(self, events: list[Event]):
+        await run_in(SYSTEM, self._send, events)
+
+    def _send(self, events: list[Event]):
+        for event in events:
+            error = isinstance(event, ErrorOccurred)
+            priority = self._syslog.LOG_ERR if error else self._syslog.LOG_INFO
+            fields = " ".join(f"{key}={value}" for key, value in event.record.items())
+            self._syslog.syslog(priority, fields)
+
+    async def close(self):
+        self._syslog.closelog()
+
+
+class HttpSink(Sink):
+    """Events POSTed as a JSON array to a collector; failed batches are retried."""
+
+    name = "http"
+    max_batch = 100
+    linger = 5.0
+
+    def __init__(self, session: "aiohttp.ClientSession", url: str, instrument: "Instrument"):
+        self.session = session
+        self.url = url
+        self.source = {"instrument": instrument.name, "mac": instrument.mac_address}
+
+    async def write(self, events: list[Event]):
+        payload = {**self.source, "events": [event.record for event in events]}
+        async with self.session.post(
+            self.url,
+            data=json.dumps(payload, default=str),
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            response.raise_for_status()
+
+    def retryable(self, error: Exception) -> bool:
+        import aiohttp
+
+        if isinstance(error, aiohttp.ClientResponseError):
+            # The collector rejected the batch (4xx): sending it again will not help
+            return error.status >= 500 or error.status in (408, 429)
+        return super().retryable(error)
+
+
+class SessionStoreSink(Sink):
+    """
+    Events into the on-device SQLite session store (see session_store.py).
+    Runs in the DISK executor; old data is pruned about once a day.
+    """
+
+    name = "sessions"
+
+    def __init__(self, path: Path = SESSION_DB, retention_days: int = RETENTION_DAYS):
+        self.path = Path(path)
+        self.retention_days = retention_days
+        self.store: Optional[SessionStore] = None
+
+    async def write(self, events: list[Event]):
+        await run_in(DISK, self._apply, [event.record for event in events])
+
+    def _apply(self, records: list[dict]):
+        if self.store is None:
+            self.store = SessionStore(self.path)
+        self.store.apply(records)
+        if self.store.prune_due():
+            deleted = self.store.prune(self.retention_days)
+            if any(deleted.values()):
+                print(f"[Sessions] Pruned {deleted}")
+
+    async def close(self):
+        if self.store is not None:
+            await run_in(DISK, self.store.close)
+            self.store = None
+
+
+def configured_sinks(
+    logger: "Logger", session: "aiohttp.ClientSession", instrument: "Instrument"
+) -> list[Sink]:
+    """The Sheets sink and the optional sinks enabled in config."""
+    sinks: list[Sink] = [SheetsSink(logger)]
+    if EVENT_LOG_FILE:
+        sinks.append(JsonlSink(Path(EVENT_LOG_FILE)))
+    if EVENT_SYSLOG:
+        sinks.append(SyslogSink())
+    if EVENT_COLLECTOR_URL:
+        sinks.append(HttpSink(session, EVENT_COLLECTOR_URL, instrument))
+    if SESSION_DB:
+        sinks.append(SessionStoreSink(Path(SESSION_DB)))
+    return sinks
@@ -0,0 +1,272 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from functools import cached_property
+from typing import ClassVar, Optional
+
+from metrics import counter, gauge, histogram
+from timer_service import get_timers
+
+SINK_QUEUE_SIZE = 1000  # Events buffered per sink; the oldest are dropped beyond this
+SINK_RETRY_MIN_DELAY = 1.0  # Backoff bounds (seconds) while a sink keeps failing
+SINK_RETRY_MAX_DELAY = 120.0
+SINK_MAX_ATTEMPTS = 10  # Write attempts per batch (about 8 minutes of backoff) before it is dropped
+CLOSE_TIMEOUT = 10.0  # Seconds allowed to drain the sinks on shutdown
+
+EVENTS = counter("bluebox_events", "Business events published, by kind")
+SINK_EVENTS = counter("bluebox_event_sink_events", "Events handled per sink, by result")
+SINK_QUEUE_DEPTH = gauge("bluebox_event_sink_queue_depth", "Events waiting per sink")
+SINK_WRITE_SECONDS = histogram(
+    "bluebox_event_sink_write_seconds", "Time for one sink to write one batch"
+)
+
+
+@dataclass(frozen=True)
+class Event:
+    """
+    A business event. Built once by a state and shared by every sink;
+    `kind` names it in the JSON records.
+    """
+
+    kind: ClassVar[str] = "event"
+    at: datetime = field(default_factory=datetime.now)
+
+    @cached_property
+    def record(self) -> dict:
+        """JSON-ready form (computed once, shared by all sinks)."""
+        record = {"event": self.kind}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            record[f.name] = value.isoformat() if isinstance(value, datetime) else value
+        return record
+
+
+@dataclass(frozen=True)
+class BoxStarted(Event):
+    kind: ClassVar[str] = "box_started"
+    ip: str = ""
+    instrument: str = ""
+
+
+@dataclass(frozen=True)
+class CardTapped(Event):
+    """A card was read; opens a new session row."""
+
+    kind: ClassVar[str] = "card_tapped"
+    card_id: str = ""
+    ip: str = ""
+
+
+@dataclass(frozen=True)
+class UserVerified(Event):
+    kind: ClassVar[str] = "user_verified"
+    card_id: str = ""
+    user_id: str = ""
+    full_name: str = ""
+    token_expiration: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class UnknownCard(Event):
+    kind: ClassVar[str] = "unknown_card"
+    card_id: str = ""
+    token_expiration: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SessionStarted(Event):
+    kind: ClassVar[str] = "session_started"
+    reservation_id: str = ""
+    user_id: str = ""
+
+
+@dataclass(frozen=True)
+class SessionExtended(Event):
+    kind: ClassVar[str] = "session_extended"
+    reason: str = "Extended by user"
+
+
+@dataclass(frozen=True)
+class SessionEnded(Event):
+    kind: ClassVar[str] = "session_ended"
+    reason: str = ""  # "Ended by user" / "Ended by timeout"
+
+
+@dataclass(frozen=True)
+class ErrorOccurred(Event):
+    kind: ClassVar[str] = "error"
+    source: str = ""  # Function or state that failed
+    message: str = ""
+
+
+class Sink(ABC):
+    """
+    Destination of events. The bus calls write() from the sink's own task with
+    up to max_batch events, after lingering up to `linger` seconds for more.
+    A write that raises is retried with backoff, up to max_attempts times and
+    only if retryable(); meanwhile new events queue up (up to max_queue, oldest
+    dropped first), other sinks are not affected.
+    """
+
+    name = "sink"
+    max_batch = 50
+    linger = 1.0  # Seconds
+    max_queue = SINK_QUEUE_SIZE
+    max_attempts = SINK_MAX_ATTEMPTS
+
+    @abstractmethod
+    async def write(self, events: list[Event]):
+        ...
+
+    def retryable(self, error: Exception) -> bool:
+        """False for errors a retry cannot fix; the batch is then dropped at once."""
+        return not isinstance(error, (TypeError, ValueError))  # e.g. JSON serialization
+
+    async def close(self):
+        pass
+
+
+@dataclass
+class SinkStats:
+    written: int = 0
+    dropped: int = 0  # Events lost: queue overflow or a batch given up
+    failures: int = 0  # Failed write attempts
+    batches: int = 0
+
+
+class _SinkRunner:
+    """Queue and writer task of one sink."""
+
+    def __init__(self, sink: Sink):
+        self.sink = sink
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.stats = SinkStats()
+        self.task: Optional[asyncio.Task] = None
+        self.in_flight = 0  # Events taken from the queue, not written yet
+        SINK_QUEUE_DEPTH.set_function(self.queue.qsize, sink=sink.name)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    def put(self, event: Event):
+        if self.queue.qsize() >= self.sink.max_queue:
+            # Backpressure: a stuck sink loses its oldest events, never blocks the app
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.stats.dropped += 1
+            SINK_EVENTS.inc(sink=self.sink.name, result="dropped")
+        self.queue.put_nowait(event)
+
+    async def _collect(self) -> list[Event]:
+        timers = get_timers()
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.sink.linger
+        while len(batch) < self.sink.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await timers.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            self.in_flight = len(batch)
+            if await self._write(batch):
+                self.stats.written += len(batch)
+                self.stats.batches += 1
+                SINK_EVENTS.inc(len(batch), sink=self.sink.name, result="written")
+            else:
+                self.stats.dropped += len(batch)
+                SINK_EVENTS.inc(len(batch), sink=self.sink.name, result="failed")
+            self.in_flight = 0
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _write(self, batch: list[Event]) -> bool:
+        """Writes a batch, retrying with backoff; False once it is given up."""
+        delay = SINK_RETRY_MIN_DELAY
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with SINK_WRITE_SECONDS.time(sink=self.sink.name):
+                    await self.sink.write(batch)
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.failures += 1
+                if not self.sink.retryable(e) or attempt >= self.sink.max_attempts:
+                    print(
+                        f"[Events] {self.sink.name} failed ({e!r}) after {attempt} "
+                        f"attempts, dropping {len(batch)} events"
+                    )
+                    return False
+                print(f"[Events] {self.sink.name} failed ({e}), retry in {delay:g} s")
+                await get_timers().sleep(delay)
+                delay = min(delay * 2, SINK_RETRY_MAX_DELAY)
+
+    async def close(self, timeout: float):
+        if self.task is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                left = self.queue.qsize() + self.in_flight
+                print(f"[Events] {self.sink.name}: {left} events not written")
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        try:
+            await self.sink.close()
+        except Exception as e:
+            print(f"[Events] Failed to close {self.sink.name}: {e}")
+
+
+class EventBus:
+    """
+    Fans business events out to pluggable sinks (Sheets, JSONL file, syslog,
+    HTTP collector, ...).
+    - publish() never blocks: each sink has its own queue and writer task
+    - Each sink batches on its own (max_batch, linger) and retries on its own,
+      so a slow or failing sink never delays the others or the state machine
+    """
+
+    def __init__(self):
+        self._runners: dict[str, _SinkRunner] = {}
+
+    def add_sink(self, sink: Sink):
+        """Adds a sink; a sink with the same name is replaced (its queue is kept)."""
+        runner = self._runners.get(sink.name)
+        if runner is None:
+            runner = self._runners[sink.name] = _SinkRunner(sink)
+        else:
+            runner.sink = sink
+        runner.start()
+
+    def publish(self, event: Event):
+        EVENTS.inc(kind=event.kind)
+        for runner in self._runners.values():
+            runner.put(event)
+
+    def stats(self) -> dict[str, SinkStats]:
+        return {name: runner.stats for name, runner in self._runners.items()}
+
+    async def close(self, timeout: float = CLOSE_TIMEOUT):
+        """Writes what is queued (up to timeout, all sinks at once) and stops."""
+        await asyncio.gather(
+            *(runner.close(timeout) for runner in self._runners.values())
+        )
+        self._runners.clear()
@@ -0,0 +1,236 @@
+import asyncio
+import functools
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+# Executor names, one per hardware/IO subsystem
+RFID = "rfid"
+LCD = "lcd"
+SHEETS = "sheets"
+SYSTEM = "system"
+DISK = "disk"
+
+# name: (worker threads, calls allowed to wait in queue, seconds before a call counts as stuck)
+EXECUTOR_LIMITS = {
+    RFID: (1, 1, None),  # Card reads block until a card arrives, never "stuck"
+    LCD: (1, 4, 2.0),
+    SHEETS: (2, 8, 60.0),
+    SYSTEM: (1, 8, 10.0),
+    DISK: (1, 16, 10.0),
+}
+
+WATCHDOG_INTERVAL = 5.0  # Seconds between watchdog checks
+
+
+@dataclass
+class ExecutorStats:
+    """Counters and timings of one executor (times in seconds)."""
+
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    queued: int = 0
+    running: int = 0
+    stuck: int = 0  # Calls running too long, or abandoned by a cancelled caller
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    total_run: float = 0.0
+    max_run: float = 0.0
+
+
+@dataclass
+class _Call:
+    name: str
+    submitted: float
+    started: Optional[float] = None
+    abandoned: bool = False  # The awaiting coroutine was cancelled
+    reported: bool = False
+    run: Optional[float] = None  # Seconds, once finished
+    failed: bool = False
+
+
+class InstrumentedExecutor:
+    """
+    Bounded thread pool for one subsystem.
+    - At most max_workers calls run and max_queue calls wait; further callers await
+    - Records queue-wait and run time of every call
+    - Keeps track of running calls, so the watchdog can report stuck threads
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_queue: int,
+        stuck_after: Optional[float] = None,
+    ):
+        self.name = name
+        self.stuck_after = stuck_after
+        self.stats = ExecutorStats()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"bb-{name}"
+        )
+        self._slots = asyncio.Semaphore(max_workers + max_queue)
+        self._calls: dict[int, _Call] = {}
+        self._ids = itertools.count()
+        self._stats_lock = threading.Lock()
+        self._register_metrics()
+
+    def _register_metrics(self):
+        """Exports the stats as bluebox_executor_* metrics, labelled by executor."""
+        from metrics import counter, gauge, histogram  # Imports this module
+
+        self._calls_total = counter("bluebox_executor_calls", "Executor calls finished, by result")
+        self._wait_seconds = histogram(
+            "bluebox_executor_wait_seconds", "Time calls waited for an executor thread"
+        )
+        self._run_seconds = histogram("bluebox_executor_run_seconds", "Run time of executor calls")
+        for field_name, help in (
+            ("queued", "Calls waiting for an executor thread"),
+            ("running", "Calls running in an executor thread"),
+            ("stuck", "Executor calls running too long or abandoned by their caller"),
+        ):
+            gauge(f"bluebox_executor_{field_name}", help).set_function(
+                lambda field_name=field_name: getattr(self.stats, field_name), executor=self.name
+            )
+
+    async def run(self, fn, /, *args, **kwargs):
+        """Runs fn(*args, **kwargs) in this executor and returns its result."""
+        loop = asyncio.get_running_loop()
+        await self._slots.acquire()
+        call_id = next(self._ids)
+        call = _Call(name=getattr(fn, "__qualname__", repr(fn)), submitted=time.monotonic())
+        with self._stats_lock:
+            self._calls[call_id] = call
+            self.stats.submitted += 1
+            self.stats.queued += 1
+
+        job = functools.partial(self._execute, call_id, call, fn, args, kwargs)
+        try:
+            future = self._pool.submit(job)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the thread is done, also for an abandoned call,
+        # so a stuck thread keeps counting against the limits of its pool
+        future.add_done_callback(lambda _: self._release(loop, call))
+        try:
+            return await asyncio.wrap_future(future, loop=loop)
+        except asyncio.CancelledError:
+            with self._stats_lock:
+                if call.started is None:
+                    # Never started: drop it, the worker will skip it
+                    self._calls.pop(call_id, None)
+                    self.stats.queued -= 1
+                else:
+                    # The thread keeps running; the watchdog will report it
+                    call.abandoned = True
+            raise
+
+    def _release(self, loop: asyncio.AbstractEventLoop, call: _Call):
+        """Frees the slot of a finished or dropped call (called from any thread)."""
+        try:
+            loop.call_soon_threadsafe(self._finished, call)
+        except RuntimeError:
+            pass  # Loop already closed at shutdown
+
+    def _finished(self, call: _Call):
+        """On the loop: frees the slot and records the call (metrics are not thread-safe)."""
+        self._slots.release()
+        if call.run is None:
+            return  # Dropped before it started
+        self._wait_seconds.observe(call.started - call.submitted, executor=self.name)
+        self._run_seconds.observe(call.run, executor=self.name)
+        self._calls_total.inc(executor=self.name, result="failed" if call.failed else "ok")
+
+    def _execute(self, call_id: int, call: _Call, fn, args, kwargs):
+        """Runs in a worker thread."""
+        with self._stats_lock:
+            if call_id not in self._calls:
+                return None  # Caller was cancelled while the call was queued
+            call.started = time.monotonic()
+            wait = call.started - call.submitted
+            self.stats.queued -= 1
+            self.stats.running += 1
+            self.stats.total_wait += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            run = time.monotonic() - call.started
+            with self._stats_lock:
+                self._calls.pop(call_id, None)
+                self.stats.running -= 1
+                self.stats.completed += 1
+                self.stats.failed += failed
+                self.stats.total_run += run
+                self.stats.max_run = max(self.stats.max_run, run)
+                call.run = run
+                call.failed = failed
+
+    def check_stuck(self) -> list[str]:
+        """Returns descriptions of stuck calls, each reported only once."""
+        now = time.monotonic()
+        stuck = []
+        with self._stats_lock:
+            calls = list(self._calls.values())
+        for call in calls:
+            if call.started is None:
+                continue
+            running_for = now - call.started
+            too_long = self.stuck_after is not None and running_for > self.stuck_after
+            if (too_long or call.abandoned) and not call.reported:
+                call.reported = True
+                reason = "abandoned" if call.abandoned else "running"
+                stuck.append(f"{call.name} {reason} for {running_for:.1f} s")
+        with self._stats_lock:
+            self.stats.stuck = sum(1 for call in self._calls.values() if call.reported)
+        return stuck
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executors: dict[str, InstrumentedExecutor] = {}
+
+
+def get_executor(name: str) -> InstrumentedExecutor:
+    """Returns the executor for a subsystem, creating it on first use."""
+    executor = _executors.get(name)
+    if executor is None:
+        max_workers, max_queue, stuck_after = EXECUTOR_LIMITS[name]
+        executor = InstrumentedExecutor(name, max_workers, max_queue, stuck_after)
+        _executors[name] = executor
+    return executor
+
+
+async def run_in(name: str, fn, /, *args, **kwargs):
+    """Runs a blocking call in the executor of the given subsystem."""
+    return await get_executor(name).run(fn, *args, **kwargs)
+
+
+async def watchdog(interval: float = WATCHDOG_INTERVAL):
+    """Periodically reports calls that are stuck in any executor."""
+    from timer_service import get_timers  # Imports metrics, which imports this module
+
+    timers = get_timers()
+    while True:
+        await timers.sleep(interval)
+        for name, executor in list(_executors.items()):
+            for description in executor.check_stuck():
+                print(f"[Executors] {name}: stuck call {description}")
+
+
+def shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
@@ -0,0 +1,135 @@
+"""
+Startup import cost report.
+
+Runs a fresh interpreter with `-X importtime`, importing what bb-app-main.py
+loads before the first frame and then its APP_MODULES, and reports both
+phases, the slowest modules and the cost per top-level package:
+
+    python import_profile.py
+    python import_profile.py --bundle dist/bluebox.pyz  # imports from the bundle
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+ENTRYPOINT = APP_DIR / "bb-app-main.py"
+PHASE_MARKER = "--- bluebox phase: "
+
+# Imports the entry point without running main(), then the deferred modules
+PROBE = f"""
+import importlib, runpy, sys
+sys.stderr.write({PHASE_MARKER!r} + "first_frame\\n")
+entry = runpy.run_path(sys.argv[1], run_name="bb_app_profile")
+sys.stderr.write({PHASE_MARKER!r} + "app\\n")
+for name in entry["APP_MODULES"]:
+    importlib.import_module(name)
+"""
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0: imported by the probe itself
+    phase: str
+
+
+def parse(stderr: str) -> list[ImportRecord]:
+    """Parses the `import time: self | cumulative | name` lines of -X importtime."""
+    records = []
+    phase = "interpreter"
+    for line in stderr.splitlines():
+        if line.startswith(PHASE_MARKER):
+            phase = line[len(PHASE_MARKER) :].strip()
+            continue
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        records.append(
+            ImportRecord(name.strip(), int(self_us), int(cumulative_us), depth, phase)
+        )
+    return records
+
+
+def profile(python: str, bundle: Path | None = None) -> list[ImportRecord]:
+    env = dict(os.environ)
+    path = [str(APP_DIR)]
+    if bundle is not None:
+        path.insert(0, str(bundle.resolve()))
+    env["PYTHONPATH"] = os.pathsep.join(path + [env.get("PYTHONPATH", "")]).rstrip(os.pathsep)
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", PROBE, str(ENTRYPOINT)],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        tail = "\n".join(
+            line for line in result.stderr.splitlines() if not line.startswith("import time:")
+        )
+        raise RuntimeError(f"Import probe failed:\n{tail}")
+    return parse(result.stderr)
+
+
+def summarize(records: list[ImportRecord], top: int) -> dict:
+    phases: dict[str, int] = defaultdict(int)
+    packages: dict[str, int] = defaultdict(int)
+    for record in records:
+        if record.depth == 0:
+            phases[record.phase] += record.cumulative_us
+        packages[record.module.split(".")[0]] += record.self_us
+    slowest = sorted(records, key=lambda r: r.self_us, reverse=True)[:top]
+    return {
+        "phases_ms": {phase: us / 1000 for phase, us in phases.items()},
+        "packages_ms": {
+            name: us / 1000
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+        "slowest": [asdict(record) for record in slowest],
+        "modules": len(records),
+    }
+
+
+def report(summary: dict):
+    print(f"{summary['modules']} modules imported")
+    print("\nphase                 cumulative")
+    for phase, ms in summary["phases_ms"].items():
+        print(f"{phase:<20}{ms:>10.1f}ms")
+    print("\npackage               self total")
+    for name, ms in summary["packages_ms"].items():
+        print(f"{name:<20}{ms:>10.1f}ms")
+    print("\nmodule                                      self  cumulative  phase")
+    for record in summary["slowest"]:
+        print(
+            f"{record['module']:<40}{record['self_us'] / 1000:>8.1f}ms"
+            f"{record['cumulative_us'] / 1000:>10.1f}ms  {record['phase']}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-module import cost of the app startup")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter to profile")
+    parser.add_argument("--bundle", type=Path, help="Import from this zipapp bundle first")
+    parser.add_argument("--top", type=int, default=20, help="Rows in the package/module tables")
+    parser.add_argument("--json", type=Path, help="Also write the summary as JSON")
+    args = parser.parse_args(argv)
+
+    summary = summarize(profile(args.python, args.bundle), args.top)
+    report(summary)
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,23 @@
 from RPLCD.i2c import CharLCD
 import asyncio
 from typing import Optional
+from executors import LCD, run_in
+from metrics import counter, histogram
+from timer_service import get_timers
+
+LCD_COLS = 20
+LCD_ROWS = 4
+CURSOR_MOVE_COST = 3  # Unchanged cells cheaper to rewrite than to skip with a cursor move
+CLEAR_COST = 6  # A clear command costs about as much as writing this many cells
+
+FRAME_SECONDS = histogram("bluebox_lcd_frame_seconds", "Time to write one frame to the LCD")
+FRAME_CELLS = counter("bluebox_lcd_cells", "Character cells sent to the LCD")
+FRAMES_SKIPPED = counter("bluebox_lcd_frames_skipped", "Frames identical to the glass")
+
+
+def _cost(changes: list[tuple[int, int, str]]) -> int:
+    """Approximate bus cost of a list of (row, col, text) writes, in cells."""
+    return sum(len(text) + CURSOR_MOVE_COST for _, _, text in changes)
 
 
 # initialize the LCD display, (expander chip, port)
@@ -8,6 +25,7 @@ class LCDController:
     """
     Asynchronous controller for an I²C character LCD using the RPLCD library.
     Supports non-blocking message display, backlight control, and flashing effects.
+    Keeps a shadow framebuffer of what is on the glass and only sends changed cells.
     """
 
     def __init__(
@@ -19,13 +37,83 @@ class LCDController:
         self.lcd = CharLCD(chip, address)
         # Ensure exclusive LCD access for concurrent tasks
         self.lock = asyncio.Lock()
+        # Shadow framebuffer: what is currently on the glass (None = unknown)
+        self._glass: Optional[list[str]] = None
+        self._backlight: Optional[bool] = None
+
+    def _compose(self, lines: list[Optional[str]], clear: bool) -> list[str]:
+        """Builds the next frame from the requested lines."""
+        if clear or self._glass is None:
+            frame = [" " * LCD_COLS] * LCD_ROWS
+        else:
+            frame = list(self._glass)
+        for row, text in enumerate(lines):
+            if text:
+                frame[row] = str(text)[:LCD_COLS].ljust(LCD_COLS)
+        return frame
+
+    def _diff(self, frame: list[str]) -> list[tuple[int, int, str]]:
+        """Returns (row, col, text) runs that differ between glass and frame."""
+        if self._glass is None:
+            return [(row, 0, line) for row, line in enumerate(frame)]
+
+        changes = []
+        for row, (old, new) in enumerate(zip(self._glass, frame)):
+            start = None
+            last = None
+            for col in range(LCD_COLS):
+                if old[col] == new[col]:
+                    continue
+                if start is not None and col - last > CURSOR_MOVE_COST:
+                    changes.append((row, start, new[start : last + 1]))
+                    start = None
+                if start is None:
+                    start = col
+                last = col
+            if start is not None:
+                changes.append((row, start, new[start : last + 1]))
+        return changes
 
-    async def _write(self, text, row):
-        if text:
-            # Set cursor to specified row, column 0 (1-indexed row)
-            await asyncio.to_thread(setattr, self.lcd, "cursor_pos", (row - 1, 0))
-            # Write the text to that position
-            await asyncio.to_thread(self.lcd.write_string, text)
+    def _blit(self, changes: list[tuple[int, int, str]], backlight: Optional[bool], clear: bool):
+        """Runs in a worker thread: pushes one frame to the hardware."""
+        if backlight is not None:
+            self.lcd.backlight_enabled = backlight
+        if clear:
+            self.lcd.clear()
+        for row, col, text in changes:
+            self.lcd.cursor_pos = (row, col)
+            self.lcd.write_string(text)
+
+    async def draw(self, lines: list[Optional[str]], backlight: bool = True, clear: bool = True):
+        """Shows a frame, sending only the changed cells in a single hardware call."""
+        async with self.lock:
+            frame = self._compose(lines, clear)
+            changes = self._diff(frame)
+            redraw = [
+                (row, 0, line.rstrip()) for row, line in enumerate(frame) if line.strip()
+            ]
+            # Unknown glass, or mostly blanking: clear once and write only the text
+            use_clear = self._glass is None or (
+                _cost(redraw) + CLEAR_COST < _cost(changes)
+            )
+            if use_clear:
+                changes = redraw
+            backlight_change = backlight if backlight != self._backlight else None
+
+            if not changes and backlight_change is None and not use_clear:
+                FRAMES_SKIPPED.inc()
+                return  # Identical frame, nothing to send
+
+            try:
+                with FRAME_SECONDS.time():
+                    await run_in(LCD, self._blit, changes, backlight_change, use_clear)
+                FRAME_CELLS.inc(sum(len(text) for _, _, text in changes))
+            except Exception:
+                self._glass = None  # Glass content unknown after a failed write
+                self._backlight = None
+                raise
+            self._glass = frame
+            self._backlight = backlight
 
     async def message(
         self,
@@ -37,42 +125,31 @@ class LCDController:
         clear: bool = True,
         display_time: int = 2,
     ):
-        async with self.lock:
-            # Turn backlight on/off
-            await asyncio.to_thread(setattr, self.lcd, "backlight_enabled", backlight)
-
-            # Optionally clear the LCD before writing new message
-            if clear is True:
-                await asyncio.to_thread(self.lcd.clear)
-
-            # Write provided lines to rows 1–4
-            if line1 is not None:
-                await self._write(line1, 1)
-            if line2 is not None:
-                await self._write(line2, 2)
-            if line3 is not None:
-                await self._write(line3, 3)
-            if line4 is not None:
-                await self._write(line4, 4)
+        await self.draw([line1, line2, line3, line4], backlight=backlight, clear=clear)
         # Keep the message visible for a defined duration
-        await asyncio.sleep(display_time)
+        await get_timers().sleep(display_time)
 
-    async def _backlight(self, status: bool):
-        await asyncio.to_thread(setattr, self.lcd, "backlight_enabled", status)
+    async def _backlight_set(self, status: bool):
+        if status != self._backlight:
+            await run_in(LCD, setattr, self.lcd, "backlight_enabled", status)
+            self._backlight = status
 
     async def _clear(self):
-        await asyncio.to_thread(self.lcd.clear)
+        async with self.lock:
+            await run_in(LCD, self.lcd.clear)
+            self._glass = [" " * LCD_COLS] * LCD_ROWS
 
     # Flashing screen for alarm or notification
     async def flashing(self, interval, number_of_flashes):
+        timers = get_timers()
         for _ in range(number_of_flashes):
-            await asyncio.sleep(interval)
-            await asyncio.to_thread(setattr, self.lcd, "backlight_enabled", True)
-            await asyncio.sleep(interval)
-            await asyncio.to_thread(setattr, self.lcd, "backlight_enabled", False)
+            await timers.sleep(interval, slack=0)
+            await self._backlight_set(True)
+            await timers.sleep(interval, slack=0)
+            await self._backlight_set(False)
 
     async def cleanup(self):
         # Clear screen
-        await asyncio.to_thread(self.lcd.clear)
+        await self._clear()
         # Turn off backlight
-        await asyncio.to_thread(setattr, self.lcd, "backlight_enabled", False)
+        await self._backlight_set(False)
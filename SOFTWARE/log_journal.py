@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+from executors import DISK, run_in
+from timer_service import Timer, get_timers
+
+SEGMENT_SIZE = 64 * 1024  # Bytes per segment file before rotating to a new one
+FSYNC_BATCH = 32  # Records buffered before they are written and fsynced
+FSYNC_INTERVAL = 1.0  # Seconds a record may stay in memory before fsync
+COMMIT_FILE = "committed"  # Holds the highest sequence number already in the sheet
+
+
+class LogJournal:
+    """
+    Append-only, segment-rotated journal of log operations.
+    - Records are JSON lines, written and fsynced in batches
+    - Every record gets a sequence number; commit(seq) marks records as delivered
+    - Segments that only hold delivered records are deleted (compaction)
+    - Undelivered records are kept in memory for replay and reloaded on start
+    """
+
+    def __init__(self, directory: Path, segment_size: int = SEGMENT_SIZE):
+        self.directory = Path(directory)
+        self.segment_size = segment_size
+        self.committed = 0  # Highest delivered sequence number
+        self.next_seq = 1
+        self._uncommitted: list[dict] = []  # Records not yet delivered, in order
+        self._buffer: list[dict] = []  # Records not yet written to disk
+        self._segments: list[int] = []  # First sequence number of every segment
+        self._flush_handle: Timer | None = None
+        self._io_lock = asyncio.Lock()
+        self._opened = False
+
+    async def open(self):
+        """Loads the commit marker and all undelivered records from disk (once)."""
+        async with self._io_lock:
+            if self._opened:
+                return
+            await run_in(DISK, self._load)
+            self._opened = True
+        print(
+            f"[Journal] Opened, {len(self._uncommitted)} undelivered records "
+            f"in {len(self._segments)} segments"
+        )
+
+    def append(self, record: dict) -> int:
+        """Adds a record and returns its sequence number. Never blocks."""
+        seq = self.next_seq
+        self.next_seq += 1
+        entry = {"seq": seq, **record}
+        self._uncommitted.append(entry)
+        self._buffer.append(entry)
+
+        loop = asyncio.get_running_loop()
+        if len(self._buffer) >= FSYNC_BATCH:
+            loop.create_task(self.flush())
+        elif self._flush_handle is None:
+            self._flush_handle = get_timers().call_later(
+                FSYNC_INTERVAL, lambda: loop.create_task(self.flush())
+            )
+        return seq
+
+    def uncommitted(self, limit: int | None = None) -> list[dict]:
+        """Returns undelivered records in order (oldest first)."""
+        if limit is None:
+            return list(self._uncommitted)
+        return self._uncommitted[:limit]
+
+    def __len__(self) -> int:
+        return len(self._uncommitted)
+
+    async def flush(self):
+        """Writes buffered records to the active segment and fsyncs once."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        async with self._io_lock:
+            if not self._buffer:
+                return
+            records, self._buffer = self._buffer, []
+            try:
+                await run_in(DISK, self._write, records)
+            except OSError as e:
+                # Still in memory (and delivered from there); retried on the next flush
+                self._buffer = records + self._buffer
+                print(f"[Journal] Failed to write {len(records)} records: {e}")
+
+    async def commit(self, seq: int):
+        """Marks all records up to seq as delivered and compacts old segments."""
+        if seq <= self.committed:
+            return
+        self.committed = seq
+        self._uncommitted = [r for r in self._uncommitted if r["seq"] > seq]
+        async with self._io_lock:
+            await run_in(DISK, self._write_commit, seq)
+            await run_in(DISK, self._compact)
+
+    async def close(self):
+        await self.flush()
+
+    def _segment_path(self, first_seq: int) -> Path:
+        return self.directory / f"{first_seq:012d}.log"
+
+    def _load(self):
+        # Start over: a failed open may have loaded part of the records
+        self._uncommitted = []
+        self._segments = []
+        self.directory.mkdir(parents=True, exist_ok=True)
+        commit_path = self.directory / COMMIT_FILE
+        if commit_path.exists():
+            try:
+                self.committed = int(commit_path.read_text().strip() or 0)
+            except ValueError:
+                self.committed = 0
+
+        self._segments = sorted(
+            int(path.stem) for path in self.directory.glob("*.log") if path.stem.isdigit()
+        )
+        last_seq = self.committed
+        for first_seq in self._segments:
+            with self._segment_path(first_seq).open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn write from a power cut, skip it
+                    if record["seq"] <= last_seq:
+                        continue  # Delivered, or written twice by a retried flush
+                    last_seq = record["seq"]
+                    self._uncommitted.append(record)
+        self.next_seq = last_seq + 1
+        self._compact()
+
+    def _write(self, records: list[dict]):
+        if not self._segments:
+            self._segments.append(records[0]["seq"])
+        path = self._segment_path(self._segments[-1])
+        if path.exists() and path.stat().st_size >= self.segment_size:
+            # Rotate: start a new segment named after its first record
+            self._segments.append(records[0]["seq"])
+            path = self._segment_path(self._segments[-1])
+
+        data = "".join(json.dumps(record) + "\n" for record in records)
+        with path.open("a", encoding="utf-8") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def _write_commit(self, seq: int):
+        path = self.directory / COMMIT_FILE
+        tmp_path = path.with_name(COMMIT_FILE + ".tmp")
+        tmp_path.write_text(str(seq))
+        os.replace(tmp_path, path)
+
+    def _compact(self):
+        """Deletes segments whose records were all delivered (never the active one)."""
+        while len(self._segments) > 1 and self._segments[1] <= self.committed + 1:
+            self._segment_path(self._segments.pop(0)).unlink(missing_ok=True)
+        # The active segment can go too, once it is full and fully delivered
+        if self._segments and self.committed + 1 >= self.next_seq and not self._buffer:
+            path = self._segment_path(self._segments[-1])
+            if path.exists() and path.stat().st_size >= self.segment_size:
+                path.unlink()
+                self._segments.pop()
@@ -1,13 +1,47 @@
 from pathlib import Path
-import gspread
-from gspread import Spreadsheet
 from datetime import datetime
+from typing import TYPE_CHECKING, Optional
 import asyncio
+import re
+import time
 from config import config
-import gspread.utils
-from dataclasses import dataclass, fields
+from dataclasses import dataclass, field, fields, replace
+from log_journal import LogJournal
+from timer_service import get_timers
+from executors import DISK, SHEETS, run_in
+from metrics import counter, gauge, histogram
+
+if TYPE_CHECKING:
+    from gspread import Spreadsheet, Worksheet
 #
 
+MAX_QUEUE_SIZE = 500  # Log operations buffered before new ones are dropped
+MAX_BATCH_SIZE = 50  # Log operations combined into one flush
+BATCH_LINGER = 1.0  # Seconds to wait for more operations before flushing
+FLUSH_TIMEOUT = 10.0  # Seconds allowed to drain the queue on shutdown
+MAX_REPLAY_RECORDS = 1000  # Journal records pushed to the sheet in one request
+RETRY_MIN_DELAY = 5.0  # Backoff bounds (seconds) while the sheet is unreachable
+RETRY_MAX_DELAY = 300.0
+ROWS_CHUNK = 500  # Grid rows added to a period worksheet at a time
+
+# Rows are appended to one worksheet per month ("2026-10"); the view worksheet
+# shows the live months newest first, older months go to "<sheet>_archive"
+PERIOD_FORMAT = "%Y-%m"
+PERIOD_TITLE = re.compile(r"^\d{4}-\d{2}$")
+VIEW_TITLE = getattr(config, "LOG_VIEW_TITLE", "Newest first")
+LIVE_PERIODS = getattr(config, "LOG_LIVE_PERIODS", 3)  # Months kept in the live spreadsheet
+ARCHIVE_SUFFIX = "_archive"
+
+JOURNAL_DIR = getattr(config, "LOG_JOURNAL_DIR", Path("/home/bluebox/log_journal"))
+LOCAL_LOG_FILE = getattr(config, "LOCAL_LOG_FILE", Path("/home/bluebox/log_local.txt"))
+
+PUSH_SECONDS = histogram(
+    "bluebox_logger_push_seconds", "Time to push one batch of log records to the sheet"
+)
+LOG_OPERATIONS = counter("bluebox_logger_operations", "Log operations by result")
+QUEUE_DEPTH = gauge("bluebox_logger_queue_depth", "Log operations waiting for the writer")
+UNDELIVERED = gauge("bluebox_logger_undelivered", "Journaled log records not yet in the sheet")
+
 # sh_name = config.mac_address
 
 
@@ -30,39 +64,120 @@ class LogSchema:
     github_branch: str = "GITHUB BRANCH"
 
 
+# Field name -> (1-based column index, column header), read from the schema once
+_COLUMNS = {f.name: (index, f.default) for index, f in enumerate(fields(LogSchema), 1)}
+
+
 def get_headers_from_schema() -> list[str]:
     """Returns a list of column headers from the LogSchema dataclass."""
-    return [f.default for f in fields(LogSchema)]
+    return [header for _, header in _COLUMNS.values()]
 
 
 def get_column_index(field_name: str) -> int:
     """Returns 1-based index of a column given the schema field name."""
-    return [f.name for f in fields(LogSchema)].index(field_name) + 1
+    try:
+        return _COLUMNS[field_name][0]
+    except KeyError:
+        raise ValueError(f"{field_name} is not a log field") from None
+
+
+def current_period(at: Optional[datetime] = None) -> str:
+    """Title of the worksheet that rows logged at `at` (default: now) go to."""
+    return (at or datetime.now()).strftime(PERIOD_FORMAT)
+
+
+@dataclass
+class _NewRow:
+    """Queued request to start a new log row (new session)."""
+
+    period: str = field(default_factory=current_period)
+
+    def to_record(self) -> dict:
+        return {"op": "new_row", "period": self.period}
+
+
+@dataclass
+class _CellWrite:
+    """Queued write of one field (and optional note) into the current row."""
+
+    column: int
+    value: str
+    note: str | None = None
+
+    def to_record(self) -> dict:
+        return {"op": "cell", "column": self.column, "value": self.value, "note": self.note}
+
+
+@dataclass
+class _PendingRow:
+    """Fields of one sheet row rebuilt from journal records."""
+
+    inserted: bool = True  # False until the row exists in the sheet
+    period: Optional[str] = None  # Worksheet of a new row
+    values: dict[int, str] = field(default_factory=dict)
+    notes: dict[int, str] = field(default_factory=dict)
+
+
+@dataclass
+class _Period:
+    """A month's worksheet and where its next row goes."""
+
+    worksheet: "Worksheet"
+    next_row: int  # 1-based; row 1 holds the headers
+    row_count: int  # Grid rows; more are added in ROWS_CHUNK steps
+
+
+@dataclass
+class WriterStats:
+    """Queue-depth and throughput counters of the background sheet writer."""
+
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    enqueued: int = 0
+    dropped: int = 0
+    batches: int = 0
+    api_calls: int = 0
+    failed_pushes: int = 0
+    undelivered: int = 0  # Journal records not yet in the sheet
+    last_flush_seconds: float = 0.0
+
+
+def _service_account(filename: str):
+    """
+    gspread.service_account, importing gspread on first use (in the Sheets
+    thread): with the Google auth stack it takes seconds to load on a Pi.
+    """
+    import gspread
+
+    return gspread.service_account(filename=filename)
 
 
 class _LoggerInterface:
     """
     A proxy that dynamically creates async logging functions like:
     await logger.make_log.token("abc") → writes to the TOKEN column
+    Each function is created on first use and then cached on the proxy.
+    States publish events (events.py) instead; this stays for ad-hoc writes.
     """
 
     def __init__(self, logger: "Logger"):
         self._logger = logger
 
     def __dir__(self):
-        return [f.name for f in fields(LogSchema)]
+        return list(_COLUMNS)
 
     def __getattr__(self, attr):
+        # Only called for fields without a cached function yet
         try:
-            col = get_column_index(attr)
-            col_name = getattr(LogSchema(), attr)
-        except ValueError:
+            col, col_name = _COLUMNS[attr]
+        except KeyError:
             raise AttributeError(f"[Logger] No such log field: {attr}")
 
         async def log_fun(value, note=None):
             print(f"[Logger] Writing log in column {col} with name '{col_name}'")
             await self._logger.write_log(col, value, note)
 
+        setattr(self, attr, log_fun)
         return log_fun
 
 
@@ -70,119 +185,443 @@ class Logger:
     """
     Handles:
     - Opening or creating a Google Sheet per device
-    - Writing log rows and individual log fields
+    - Appending log rows (one worksheet per month) and individual log fields
+    - A "newest first" view of the live months and archival of older ones
     - Fallback logging to a local text file
     - Dynamic log functions via self.make_log
     """
 
-    def __init__(self, mac_address, instrument_name):
+    def __init__(self, mac_address, instrument_name, journal_dir: Path = JOURNAL_DIR):
         self.sh_name = f"{mac_address}_{instrument_name}"  # Unique name for the sheet
         self.headers = get_headers_from_schema()
         self.gc = None
-        self.sheet: Spreadsheet = None
-        self.current_log_row = (
-            2  # Always write to row 2, so logs are new (top) ---> old (bot)
-        )
+        self.spreadsheet: "Spreadsheet" = None
+        # Rows are appended (no row shifts, flat cost); the view sorts them newest first
+        self._periods: dict[str, _Period] = {}
+        self._current: tuple[str, int] | None = None  # (period, row) of the open session row
         self.make_log = _LoggerInterface(self)  # Exposes async logging methods
         self._fallback_lock = asyncio.Lock()
-
-    async def initialize(self):
-        """Authenticate and open or create the Google Sheet."""
+        # Background writer: make_log.* only enqueues, the writer batches the sheet calls
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+        self._writer_task: asyncio.Task | None = None
+        # Every operation is journaled first, so nothing is lost while offline
+        self.journal = LogJournal(journal_dir)
+        self._retry_at = 0.0
+        self._retry_delay = RETRY_MIN_DELAY
+        self._delivered = asyncio.Event()
+        self.stats = WriterStats()
+        QUEUE_DEPTH.set_function(self._queue.qsize)
+        UNDELIVERED.set_function(lambda: len(self.journal))
+
+    async def initialize(self, sheet_key: str | None = None) -> bool:
+        """
+        Authenticate and open or create the Google Sheet.
+        A known sheet_key (spreadsheet ID) is opened directly, without a Drive search.
+        Returns whether the sheet is ready.
+        """
         try:
-            self.gc = await asyncio.to_thread(
-                gspread.service_account,
-                filename=config.LOGGER_JSON,
-            )
-            self.sheet = await self._open_or_create_sheet()
+            if self.gc is None:
+                self.gc = await run_in(
+                    SHEETS,
+                    _service_account,
+                    filename=config.LOGGER_JSON,
+                )
+            if sheet_key:
+                try:
+                    self.spreadsheet = await run_in(SHEETS, self.gc.open_by_key, sheet_key)
+                except Exception as e:
+                    print(f"[Logger] Cached sheet {sheet_key} not usable: {e}")
+            if self.spreadsheet is None:
+                self.spreadsheet = await self._open_or_create_sheet()
 
         except Exception as e:
             await self.write_local_log(f"Error initialize logger: {e}")
+            return False
+        self.resume()  # Deliver what was journaled before the sheet was ready
+        return True
+
+    @property
+    def sheet_key(self) -> str | None:
+        """Spreadsheet ID of the open sheet (None until initialized)."""
+        if self.spreadsheet is None:
+            return None
+        return self.spreadsheet.id
+
+    async def _open_or_create_sheet(self) -> "Spreadsheet":
+        import gspread  # Already loaded by _service_account
 
-    async def _open_or_create_sheet(self):
         try:
             # Try to open the existing sheet
-            spreadsheet = await asyncio.to_thread(self.gc.open, self.sh_name)
-            return spreadsheet.sheet1
+            return await run_in(SHEETS, self.gc.open, self.sh_name)
 
         except gspread.SpreadsheetNotFound:
             # Sheet not found → create and initialize new one
-            sheet = await asyncio.to_thread(self.gc.create, self.sh_name)
-            # Share sheet to google disc
-            await asyncio.to_thread(
-                sheet.share,
-                config.LOGGER_ACC,
-                perm_type="user",
-                role="writer",
-                notify=True,
-            )
-            # Prepare headers according to the LogSchema
-            await self._prepare_headers(sheet.sheet1)
-            return sheet.sheet1
+            spreadsheet = await run_in(SHEETS, self._create_spreadsheet, self.sh_name)
+            # The first worksheet becomes the newest-first view
+            await run_in(SHEETS, spreadsheet.sheet1.update_title, VIEW_TITLE)
+            return spreadsheet
 
         except Exception as e:
             print(f"Error in _open_or_create_sheet: {e}")
             await self.write_local_log(f"Error in _open_or_create_sheet: {e}")
             raise
 
-    async def check_headers(self):
-        """Checks if the sheet already has headers; initializes them if missing."""
-        if not self.sheet:
-            await self.write_local_log("Header check failed: sheet not initialized")
-            return
+    def _create_spreadsheet(self, title: str) -> "Spreadsheet":
+        """Creates a spreadsheet shared with LOGGER_ACC (blocking)."""
+        spreadsheet = self.gc.create(title)
+        # Share sheet to google disc
+        spreadsheet.share(config.LOGGER_ACC, perm_type="user", role="writer", notify=True)
+        return spreadsheet
 
-        try:
-            a1_cell = await asyncio.to_thread(self.sheet.cell, 1, 1)
-            if not a1_cell or not a1_cell.value or not a1_cell.value.strip():
-                print("[Logger] Headers not found — initializing...")
-                await self._prepare_headers(self.sheet)
-            else:
-                print("[Logger] Headers already exist.")
-        except Exception as e:
-            await self.write_local_log(f"Header check error: {e}")
+    def _header_range(self, rows: int = 1) -> str:
+        return f"A1:{chr(64 + len(self.headers))}{rows}"
 
-    async def _prepare_headers(self, ws):
-        """Writes column headers to row 1."""
-        headers_range = f"A1:{chr(64 + len(self.headers))}1"
-        await asyncio.to_thread(ws.update, headers_range, [self.headers])
+    def _open_period(self, title: str) -> tuple[_Period, bool]:
+        """Opens (or adds) a month's worksheet and finds its next free row (blocking)."""
+        import gspread
 
-    async def insert_new_row(self):
-        """Inserts an empty row at position 2 for a new session/log event."""
-        if not self.sheet:
-            await self.write_local_log("Insert row failed: Sheet not initialized")
-            return
+        try:
+            worksheet = self.spreadsheet.worksheet(title)
+        except gspread.WorksheetNotFound:
+            worksheet = self.spreadsheet.add_worksheet(
+                title, rows=ROWS_CHUNK, cols=len(self.headers)
+            )
+            worksheet.update(self._header_range(), [self.headers])
+            return _Period(worksheet, next_row=2, row_count=worksheet.row_count), True
+        # Column A (log entry) is filled in every row
+        used = len(worksheet.col_values(1))
+        return _Period(worksheet, next_row=max(used + 1, 2), row_count=worksheet.row_count), False
+
+    async def _period(self, title: str) -> _Period:
+        period = self._periods.get(title)
+        if period is None:
+            period, created = await run_in(SHEETS, self._open_period, title)
+            self._periods[title] = period
+            if created:
+                print(f"[Logger] Started log worksheet {title}")
+                try:
+                    archived = await run_in(SHEETS, self._rotate)
+                except Exception as e:
+                    # Logging goes on; the next rotation tries again
+                    archived = []
+                    await self.write_local_log(f"Log rotation failed: {e}")
+                for old in archived:
+                    self._periods.pop(old, None)
+        return period
+
+    def _rotate(self) -> list[str]:
+        """
+        After a new month started: moves months beyond LIVE_PERIODS to the archive
+        spreadsheet and points the view at the live months (blocking).
+        Returns the archived titles.
+        """
+        worksheets = self.spreadsheet.worksheets()
+        periods = sorted(
+            (ws for ws in worksheets if PERIOD_TITLE.match(ws.title)), key=lambda ws: ws.title
+        )
+        old, live = periods[:-LIVE_PERIODS], periods[-LIVE_PERIODS:]
+        if old:
+            self._archive(old)
+        view = next((ws for ws in worksheets if ws.title == VIEW_TITLE), None)
+        if view is None:
+            # Sheets from before the monthly layout keep their old rows in sheet1
+            view = self.spreadsheet.add_worksheet(
+                VIEW_TITLE, rows=ROWS_CHUNK, cols=len(self.headers), index=0
+            )
+        last = chr(64 + len(self.headers))
+        ranges = ";".join(f"'{ws.title}'!A2:{last}" for ws in live)
+        formula = (
+            f"=QUERY({{{ranges}}}, "
+            '"select * where Col1 is not null order by Col1 desc", 0)'
+        )
+        view.update(
+            self._header_range(rows=2),
+            [self.headers, [formula] + [""] * (len(self.headers) - 1)],
+            value_input_option="USER_ENTERED",
+        )
+        return [ws.title for ws in old]
 
+    def _archive(self, worksheets: list["Worksheet"]):
+        """Copies months to "<sheet>_archive", trimmed to their rows, then deletes them (blocking)."""
+        import gspread
+
+        name = self.sh_name + ARCHIVE_SUFFIX
         try:
-            await asyncio.to_thread(self.sheet.insert_row, [], 2)
-            self.current_log_row = 2
-        except Exception as e:
-            await self.write_local_log(f"Error inserting new log row: {str(e)}")
+            archive = self.gc.open(name)
+        except gspread.SpreadsheetNotFound:
+            archive = self._create_spreadsheet(name)
+        for worksheet in worksheets:
+            used = max(len(worksheet.col_values(1)), 1)
+            copy = archive.get_worksheet_by_id(worksheet.copy_to(archive.id)["sheetId"])
+            copy.resize(rows=used)  # Compact: no empty grid rows in the archive
+            try:
+                copy.update_title(worksheet.title)
+            except gspread.exceptions.APIError:
+                pass  # Month archived before (late journal replay), keep "Copy of ..."
+            self.spreadsheet.del_worksheet(worksheet)
+            print(f"[Logger] Archived log worksheet {worksheet.title} ({used - 1} rows)")
+
+    async def insert_new_row(self, at: Optional[datetime] = None):
+        """Queues a new row for a new session/log event (in the worksheet of `at`)."""
+        self._enqueue(_NewRow(current_period(at)))
 
     async def write_log(self, column, log_msg, log_note=None):
-        """Writes a message to a given column in the current log row."""
+        """Queues a message for a given column in the current log row."""
+        note = str(log_note) if log_note else None
+        self._enqueue(_CellWrite(column, str(log_msg), note))
+
+    def _enqueue(self, op):
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer_loop())
         try:
-            if not self.sheet:
-                raise Exception("Google sheet not initialized")
+            self._queue.put_nowait(op)
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            LOG_OPERATIONS.inc(result="dropped")
+            print(f"[Logger] Queue full, dropping {op}")
+            asyncio.create_task(self.write_local_log(f"Log queue full, dropped: {op}"))
+            return
+        if op is None:
+            return
+        self.stats.enqueued += 1
+        LOG_OPERATIONS.inc(result="enqueued")
+        self.stats.queue_depth = self._queue.qsize()
+        self.stats.max_queue_depth = max(
+            self.stats.max_queue_depth, self.stats.queue_depth
+        )
 
-            await asyncio.to_thread(
-                self.sheet.update_cell, self.current_log_row, column, str(log_msg)
-            )
+    def resume(self):
+        """Retries delivery right away (e.g. after connectivity comes back)."""
+        self._retry_at = 0.0
+        self._retry_delay = RETRY_MIN_DELAY
+        if self._writer_task is not None and len(self.journal):
+            self._enqueue(None)  # Wake the writer
 
-            if log_note:
-                note_cell = gspread.utils.rowcol_to_a1(self.current_log_row, column)
-                await asyncio.to_thread(
-                    self.sheet.update_note, note_cell, str(log_note)
+    async def _collect(self, timeout: float | None) -> list:
+        """Waits (up to timeout) for operations, then lingers to batch more."""
+        loop = asyncio.get_running_loop()
+        try:
+            batch = [await asyncio.wait_for(self._queue.get(), timeout=timeout)]
+        except asyncio.TimeoutError:
+            return []
+        deadline = loop.time() + BATCH_LINGER
+        while len(batch) < MAX_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(
+                    await asyncio.wait_for(self._queue.get(), timeout=remaining)
                 )
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _writer_loop(self):
+        """Journals queued operations and pushes undelivered ones to the sheet."""
+        loop = asyncio.get_running_loop()
+        await self._open_journal()
+        while True:
+            timeout = None
+            if len(self.journal):
+                timeout = max(self._retry_at - loop.time(), 0)
+
+            batch = await self._collect(timeout)
+            for op in batch:
+                if op is not None:
+                    self.journal.append(op.to_record())
+                self._queue.task_done()
+            self.stats.queue_depth = self._queue.qsize()
+
+            if len(self.journal) and loop.time() >= self._retry_at:
+                if await self._push():
+                    self._retry_delay = RETRY_MIN_DELAY
+                else:
+                    self.stats.failed_pushes += 1
+                    self._retry_at = loop.time() + self._retry_delay
+                    self._retry_delay = min(self._retry_delay * 2, RETRY_MAX_DELAY)
+            self.stats.undelivered = len(self.journal)
+            if not len(self.journal):
+                self._delivered.set()
+
+    async def _open_journal(self):
+        """Opens the journal, retrying with backoff while the disk refuses."""
+        delay = RETRY_MIN_DELAY
+        while True:
+            try:
+                await self.journal.open()
+                return
+            except Exception as e:
+                # Queued operations wait meanwhile; overflow goes to the local log
+                print(f"[Logger] Cannot open log journal ({e}), retry in {delay:g} s")
+                await self.write_local_log(f"Log journal unavailable: {e}")
+                await get_timers().sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+
+    async def _push(self) -> bool:
+        """Sends undelivered journal records to the sheet in one request."""
+        records = self.journal.uncommitted(limit=MAX_REPLAY_RECORDS)
+        started = time.monotonic()
+        try:
+            if not self.spreadsheet:
+                raise Exception("Google sheet not initialized")
+            with PUSH_SECONDS.time():
+                await self._write_rows(self._rows_from_records(records))
         except Exception as e:
             print(f"Error in write log: {e}")
-            await self.write_local_log(f"Error in write log: {str(e)}")
+            LOG_OPERATIONS.inc(result="push_failed")
+            return False
+
+        if len(records) > MAX_BATCH_SIZE:
+            print(f"[Logger] Replayed {len(records)} journaled log records")
+        try:
+            await self.journal.commit(records[-1]["seq"])
+        except Exception as e:
+            # Delivered all the same; a restart before the next commit replays them
+            print(f"[Logger] Failed to record delivery in the journal: {e}")
+            await self.write_local_log(f"Log journal commit failed: {e}")
+        LOG_OPERATIONS.inc(len(records), result="delivered")
+        self.stats.batches += 1
+        self.stats.last_flush_seconds = time.monotonic() - started
+        return True
+
+    @staticmethod
+    def _rows_from_records(records: list[dict]) -> list[_PendingRow]:
+        """Groups records into rows; leading cells belong to the current row."""
+        rows: list[_PendingRow] = []
+        row = None
+        for record in records:
+            if record["op"] == "new_row":
+                # Journals from before the monthly layout have no period
+                row = _PendingRow(inserted=False, period=record.get("period"))
+                rows.append(row)
+                continue
+            if row is None:
+                row = _PendingRow(inserted=True)
+                rows.append(row)
+            row.values[record["column"]] = record["value"]
+            if record.get("note"):
+                row.notes[record["column"]] = record["note"]
+        return rows
+
+    async def _write_rows(self, rows: list[_PendingRow]):
+        from gspread.utils import absolute_range_name, rowcol_to_a1
+
+        # New rows go below the last one of their month: nothing shifts, so a
+        # write costs the same on a sheet with ten rows or ten thousand
+        requests = []
+        values = []
+        planned: dict[str, _Period] = {}  # Row bookkeeping, kept only if the calls succeed
+        current = self._current
+
+        async def period(title: str) -> _Period:
+            if title not in planned:
+                planned[title] = replace(await self._period(title))
+            return planned[title]
+
+        for row in rows:
+            if row.inserted and current is None:
+                # Cells for the row open before a restart: the last row of this month
+                title = current_period()
+                if (await period(title)).next_row > 2:
+                    current = (title, planned[title].next_row - 1)
+                else:
+                    row.inserted = False  # Nothing to continue, start a row
+            if not row.inserted:
+                title = row.period or current_period()
+                target = await period(title)
+                if target.next_row > target.row_count:
+                    requests.append(
+                        {
+                            "appendDimension": {
+                                "sheetId": target.worksheet.id,
+                                "dimension": "ROWS",
+                                "length": ROWS_CHUNK,
+                            }
+                        }
+                    )
+                    target.row_count += ROWS_CHUNK
+                current = (title, target.next_row)
+                target.next_row += 1
+
+            title, row_number = current
+            sheet_id = (await period(title)).worksheet.id
+            for column, value in sorted(row.values.items()):
+                cell = rowcol_to_a1(row_number, column)
+                # USER_ENTERED: times and numbers become typed cells, as typed by hand
+                values.append({"range": absolute_range_name(title, cell), "values": [[value]]})
+            for column, note in sorted(row.notes.items()):
+                requests.append(
+                    {
+                        "updateCells": {
+                            "range": {
+                                "sheetId": sheet_id,
+                                "startRowIndex": row_number - 1,
+                                "endRowIndex": row_number,
+                                "startColumnIndex": column - 1,
+                                "endColumnIndex": column,
+                            },
+                            "rows": [{"values": [{"note": note}]}],
+                            "fields": "note",
+                        }
+                    }
+                )
+
+        # Grid growth and notes in one call (a batchUpdate applies all requests or
+        # none), then the values in one USER_ENTERED call. Replaying a batch after
+        # a failed values call rewrites the same cells and notes
+        if requests:
+            await run_in(SHEETS, self.spreadsheet.batch_update, {"requests": requests})
+            self.stats.api_calls += 1
+            for title, target in planned.items():
+                self._periods[title].row_count = target.row_count  # The grid has grown
+        if values:
+            await run_in(
+                SHEETS,
+                self.spreadsheet.values_batch_update,
+                {"valueInputOption": "USER_ENTERED", "data": values},
+            )
+            self.stats.api_calls += 1
+        self._periods.update(planned)
+        self._current = current
+
+    async def close(self, timeout: float = FLUSH_TIMEOUT):
+        """
+        Tries to deliver queued log operations (up to timeout) and stops the writer.
+        Whatever is not delivered stays in the journal for the next start.
+        """
+        if self._writer_task is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            if len(self.journal) and self.spreadsheet is None:
+                # Sheet never opened: nothing to wait for, the next start replays them
+                print(f"[Logger] Log sheet not open, {len(self.journal)} records left in journal")
+            elif len(self.journal):
+                self._delivered.clear()
+                self.resume()
+                await asyncio.wait_for(
+                    self._delivered.wait(), timeout=max(deadline - loop.time(), 0)
+                )
+        except asyncio.TimeoutError:
+            print(f"[Logger] Flush timed out, {len(self.journal)} records left in journal")
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+        self._writer_task = None
+        await self.journal.close()
 
     async def write_local_log(self, message: str):
         """Writes a log message to a fallback local text file."""
-        local_log_path = Path("/home/bluebox/log_local.txt")
+        local_log_path = Path(LOCAL_LOG_FILE)
         try:
             line = f"{datetime.now().isoformat()} - {message}\n"
             async with self._fallback_lock:
-                await asyncio.to_thread(self._append_local_log, local_log_path, line)
+                await run_in(DISK, self._append_local_log, local_log_path, line)
         except Exception as e:
             print(f"Failed to write local log:{e}, message: {message}")
 
@@ -0,0 +1,271 @@
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+from config import config
+from executors import RFID, run_in
+from metrics import counter, histogram
+
+# MFRC522 registers (datasheet section 9)
+COMMAND_REG = 0x01
+COM_IEN_REG = 0x02
+DIV_IEN_REG = 0x03
+COM_IRQ_REG = 0x04
+ERROR_REG = 0x06
+FIFO_DATA_REG = 0x09
+FIFO_LEVEL_REG = 0x0A
+CONTROL_REG = 0x0C
+BIT_FRAMING_REG = 0x0D
+MODE_REG = 0x11
+TX_CONTROL_REG = 0x14
+TX_AUTO_REG = 0x15
+T_MODE_REG = 0x2A
+T_PRESCALER_REG = 0x2B
+T_RELOAD_REG_H = 0x2C
+T_RELOAD_REG_L = 0x2D
+VERSION_REG = 0x37
+
+# Commands
+PCD_IDLE = 0x00
+PCD_TRANSCEIVE = 0x0C
+PCD_RESETPHASE = 0x0F
+
+# PICC commands (ISO 14443-3)
+PICC_REQIDL = 0x26
+PICC_ANTICOLL = 0x93
+
+# Interrupt bits in ComIEnReg / ComIrqReg
+IRQ_INVERT = 0x80  # IRQ pin is active low
+IRQ_RX = 0x20
+IRQ_IDLE = 0x10
+IRQ_ERR = 0x02
+IRQ_TIMER = 0x01
+IRQ_DONE = IRQ_RX | IRQ_IDLE | IRQ_TIMER
+IRQ_PUSH_PULL = 0x80  # DivIEnReg: drive the IRQ pin, no external pull-up needed
+ERROR_MASK = 0x1B  # BufferOvfl, CollErr, ParityErr, ProtocolErr
+
+# Pins (gpiozero naming); IRQ is optional, the reader polls without it
+RFID_IRQ_PIN = getattr(config, "RFID_IRQ_PIN", None)
+RFID_RESET_PIN = getattr(config, "RFID_RESET_PIN", "BOARD22")  # Same pin as SimpleMFRC522
+
+TRANSCEIVE_TIMEOUT = 0.05  # Seconds; the chip timer gives up after ~15 ms anyway
+STATUS_POLL_INTERVAL = 0.002  # Seconds between status reads when IRQ is not wired
+POLL_FAST = 0.05  # Seconds between card requests right after card activity
+POLL_IDLE = 0.25  # Slowest request rate while no card is around
+POLL_BACKOFF = 1.5
+CARD_COOLDOWN = 2  # Seconds before the same card is reported again
+ERROR_DELAY = 1.0  # Seconds to wait before re-initialising after an SPI error
+
+TAP_LATENCY = histogram(
+    "bluebox_rfid_tap_seconds",
+    "Card arrival to card ID (upper bound: since the last empty card request)",
+)
+CARD_READS = counter("bluebox_rfid_reads", "Card reads by result (card, duplicate, error)")
+
+
+def uid_to_num(uid: list[int]) -> int:
+    """Same card number as SimpleMFRC522 (all five anticollision bytes)."""
+    number = 0
+    for byte in uid[:5]:
+        number = number * 256 + byte
+    return number
+
+
+class MFRC522Async:
+    """
+    Asynchronous, UID-only MFRC522 reader.
+    - Every transceive waits for the IRQ pin edge instead of busy-polling SPI
+      (or polls the status register every few ms if IRQ is not wired)
+    - Card requests are sent at an adaptive rate: fast after activity, slow when idle
+    - Register reads and FIFO transfers are batched into single SPI transfers
+    - Works with any object offering spidev's xfer2(), e.g. a fake SPI device
+    """
+
+    def __init__(self, spi, irq=None, reset=None):
+        self.spi = spi
+        self.irq = irq  # gpiozero input device on the IRQ pin, or None
+        self.reset = reset  # gpiozero output device on the reset pin, or None
+        self.transfers = 0  # SPI transfers, for diagnostics
+        self._irq_event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = False
+        # Last card reported by cards(): kept here, not in the generator, so the
+        # cooldown survives a read cancelled by a state change
+        self._last_card: Optional[int] = None
+        self._last_card_time = float("-inf")
+
+    @classmethod
+    def open(
+        cls,
+        bus: int = 0,
+        device: int = 0,
+        speed: int = 1_000_000,
+        irq_pin=RFID_IRQ_PIN,
+        reset_pin=RFID_RESET_PIN,
+    ) -> "MFRC522Async":
+        """Opens the reader on the Raspberry Pi SPI bus."""
+        import spidev
+        from gpiozero import DigitalInputDevice, DigitalOutputDevice
+
+        spi = spidev.SpiDev()
+        spi.open(bus, device)
+        spi.max_speed_hz = speed
+        reset = DigitalOutputDevice(reset_pin, initial_value=True) if reset_pin else None
+        irq = DigitalInputDevice(irq_pin, pull_up=True) if irq_pin is not None else None
+        return cls(spi, irq=irq, reset=reset)
+
+    async def start(self):
+        """Resets and configures the chip, and hooks up the IRQ pin."""
+        self._loop = asyncio.get_running_loop()
+        self._irq_event = asyncio.Event()
+        if self.irq is not None:
+            self.irq.when_activated = self._on_irq
+        version = await run_in(RFID, self._init)
+        self._ready = True
+        mode = "IRQ" if self.irq is not None else "polling"
+        print(f"[RFID] MFRC522 version 0x{version:02X} ready ({mode})")
+
+    def close(self):
+        if self.irq is not None:
+            self.irq.when_activated = None
+            self.irq.close()
+        if self.reset is not None:
+            self.reset.close()
+        close = getattr(self.spi, "close", None)
+        if close is not None:
+            close()
+        self._ready = False
+
+    async def cards(self, cooldown: float = CARD_COOLDOWN) -> AsyncIterator[int]:
+        """
+        Yields card numbers as cards are presented.
+        The same card is reported again only after the cooldown, also across
+        generators (a new one is started after a cancelled read).
+        """
+        interval = POLL_FAST
+        empty_since = time.monotonic()  # End of the last request that saw no card
+        while True:
+            try:
+                if not self._ready:
+                    await self.start()
+                uid = await self.read_uid()
+            except OSError as e:
+                CARD_READS.inc(result="error")
+                print(f"[RFID] SPI error: {e}")
+                self._ready = False
+                await asyncio.sleep(ERROR_DELAY)
+                continue
+
+            if uid is None:
+                empty_since = time.monotonic()
+                interval = min(interval * POLL_BACKOFF, POLL_IDLE)
+                await asyncio.sleep(interval)
+                continue
+
+            interval = POLL_FAST
+            card_id = uid_to_num(uid)
+            now = time.monotonic()
+            if card_id != self._last_card or now - self._last_card_time > cooldown:
+                self._last_card = card_id
+                self._last_card_time = now
+                CARD_READS.inc(result="card")
+                TAP_LATENCY.observe(now - empty_since)
+                yield card_id
+                empty_since = time.monotonic()
+            else:
+                CARD_READS.inc(result="duplicate")
+                await asyncio.sleep(interval)
+
+    async def read_uid(self) -> Optional[list[int]]:
+        """Requests a card and returns its 5 UID bytes (4 + BCC), or None."""
+        ok, _, bits = await self.transceive([PICC_REQIDL], tx_last_bits=7)
+        if not ok or bits != 16:
+            return None
+        ok, data, _ = await self.transceive([PICC_ANTICOLL, 0x20])
+        if not ok or len(data) != 5:
+            return None
+        check = data[0] ^ data[1] ^ data[2] ^ data[3]
+        if check != data[4]:
+            return None
+        return data
+
+    async def transceive(
+        self, data: list[int], tx_last_bits: int = 0
+    ) -> tuple[bool, list[int], int]:
+        """Sends data to the card; returns (ok, response bytes, response bits)."""
+        self._irq_event.clear()
+        await run_in(RFID, self._start_transceive, data, tx_last_bits)
+
+        if self.irq is not None:
+            try:
+                await asyncio.wait_for(self._irq_event.wait(), TRANSCEIVE_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass  # Missed edge: the status read below tells what happened
+        else:
+            deadline = time.monotonic() + TRANSCEIVE_TIMEOUT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(STATUS_POLL_INTERVAL)
+                (irq,) = await run_in(RFID, self._read, COM_IRQ_REG)
+                if irq & IRQ_DONE:
+                    break
+
+        return await run_in(RFID, self._finish_transceive)
+
+    def _on_irq(self):
+        """Runs in the gpiozero thread on every IRQ edge."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._irq_event.set)
+
+    # Blocking SPI helpers, they run in the RFID executor
+
+    def _write(self, reg: int, *values: int):
+        """Writes one or more bytes (burst) to a single register."""
+        self.spi.xfer2([(reg << 1) & 0x7E, *values])
+        self.transfers += 1
+
+    def _read(self, *regs: int) -> list[int]:
+        """Reads several registers in one SPI transfer."""
+        addresses = [((reg << 1) & 0x7E) | 0x80 for reg in regs]
+        result = self.spi.xfer2(addresses + [0])
+        self.transfers += 1
+        return result[1:]
+
+    def _init(self) -> int:
+        self._write(COMMAND_REG, PCD_RESETPHASE)
+        time.sleep(0.05)  # Oscillator start-up after soft reset
+        self._write(T_MODE_REG, 0x8D)  # Timer starts after transmission, ~15 ms timeout
+        self._write(T_PRESCALER_REG, 0x3E)
+        self._write(T_RELOAD_REG_L, 30)
+        self._write(T_RELOAD_REG_H, 0)
+        self._write(TX_AUTO_REG, 0x40)  # 100 % ASK modulation
+        self._write(MODE_REG, 0x3D)  # CRC preset 0x6363
+        self._write(COM_IEN_REG, IRQ_INVERT | IRQ_DONE | IRQ_ERR)
+        self._write(DIV_IEN_REG, IRQ_PUSH_PULL)
+        tx_control, version = self._read(TX_CONTROL_REG, VERSION_REG)
+        if not tx_control & 0x03:
+            self._write(TX_CONTROL_REG, tx_control | 0x03)  # Antenna on
+        return version
+
+    def _start_transceive(self, data: list[int], tx_last_bits: int):
+        self._write(COMMAND_REG, PCD_IDLE)
+        self._write(COM_IRQ_REG, 0x7F)  # Clear all interrupt bits (releases IRQ pin)
+        self._write(FIFO_LEVEL_REG, 0x80)  # Flush FIFO
+        self._write(FIFO_DATA_REG, *data)
+        self._write(BIT_FRAMING_REG, tx_last_bits)
+        self._write(COMMAND_REG, PCD_TRANSCEIVE)
+        self._write(BIT_FRAMING_REG, 0x80 | tx_last_bits)  # StartSend
+
+    def _finish_transceive(self) -> tuple[bool, list[int], int]:
+        irq, error, level, control = self._read(
+            COM_IRQ_REG, ERROR_REG, FIFO_LEVEL_REG, CONTROL_REG
+        )
+        self._write(BIT_FRAMING_REG, 0x00)
+        if not irq & (IRQ_RX | IRQ_IDLE) or error & ERROR_MASK:
+            return False, [], 0  # Timer ran out (no card) or receive error
+        level &= 0x7F
+        last_bits = control & 0x07
+        bits = (level - 1) * 8 + last_bits if last_bits else level * 8
+        if level == 0:
+            return False, [], 0
+        data = self._read(*[FIFO_DATA_REG] * level)
+        return True, data, bits
@@ -1,4 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+import time
 
 
 @dataclass
@@ -19,18 +22,44 @@ class Instrument:
 
 @dataclass
 class Reservation:
-    remaining_time: int = 0
+    remaining_time: int = 0  # Minutes, server value or local estimate (see tick)
     recording_id: str = ""
     reservation_id: str = ""
     warning_sent: bool = False
     ended_by_user: bool = False
     ended_by_time: bool = False
+    sync_requested: bool = False  # Ask the server for remaining_time on the next occasion
+    # Last server value of remaining_time and when it arrived (monotonic clock)
+    synced_remaining: int = field(default=0, compare=False)
+    synced_at: float = field(default_factory=time.monotonic, compare=False)
+
+    def __post_init__(self):
+        self.synced_remaining = self.remaining_time
+
+    def estimate(self) -> int:
+        """Remaining minutes, counted down locally from the last server value."""
+        elapsed = time.monotonic() - self.synced_at
+        return self.synced_remaining - int(elapsed // 60)
+
+    def tick(self):
+        self.remaining_time = self.estimate()
+
+    def sync(self, remaining_time: int) -> int:
+        """Adopts a server value; returns its drift from the local estimate (minutes)."""
+        drift = remaining_time - self.estimate()
+        self.remaining_time = remaining_time
+        self.synced_remaining = remaining_time
+        self.synced_at = time.monotonic()
+        self.sync_requested = False
+        return drift
 
 
 @dataclass
 class Token:
     string: str
     expiration: str
+    # Server clock at the time the token was issued (HTTP Date header)
+    server_date: Optional[datetime] = field(default=None, compare=False)
 
     def to_dict(self):
         return {"string": self.string, "expiration": self.expiration}
@@ -0,0 +1,318 @@
+import asyncio
+import socket
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from executors import SYSTEM, run_in
+from metrics import counter
+from timer_service import get_timers
+
+SYS_NET = Path("/sys/class/net")
+PROC_ROUTE = Path("/proc/net/route")
+
+POLL_INTERVAL = 30.0  # Seconds between safety-net rereads (netlink may drop events)
+SETTLE_DELAY = 0.05  # Seconds to collect a burst of netlink messages into one reread
+DUMP_TIMEOUT = 1.0  # Seconds to wait for the kernel's address dump
+
+# rtnetlink constants (linux/netlink.h, linux/rtnetlink.h, linux/if_addr.h)
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+RTM_GETADDR = 22
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_F_TENTATIVE = 0x40
+RT_SCOPE_UNIVERSE = 0
+
+_NLMSGHDR = struct.Struct("=LHHLL")
+_IFADDRMSG = struct.Struct("=BBBBI")
+_RTATTR = struct.Struct("=HH")
+
+NET_CHANGES = counter("bluebox_net_changes", "Interface changes seen, by kind")
+
+
+@dataclass(frozen=True)
+class NetSnapshot:
+    """Interfaces (without loopback) as read at one moment."""
+
+    links: dict[str, bool] = field(default_factory=dict)  # Interface -> link up
+    addresses: dict[str, tuple[str, ...]] = field(default_factory=dict)
+    default: Optional[str] = None  # Interface of the default route
+
+    @property
+    def ip(self) -> str:
+        """Addresses of the interfaces with link, default route first (like `hostname -I`)."""
+        names = sorted(self.links, key=lambda name: (name != self.default, name))
+        return " ".join(
+            address
+            for name in names
+            if self.links[name]
+            for address in self.addresses.get(name, ())
+        )
+
+    @property
+    def link_up(self) -> bool:
+        """True if any interface has link and an address, i.e. traffic can leave the box."""
+        return any(up and self.addresses.get(name) for name, up in self.links.items())
+
+
+@dataclass
+class NetChange:
+    """Published to subscribers when the snapshot changes."""
+
+    previous: NetSnapshot
+    current: NetSnapshot
+
+    @property
+    def link_changed(self) -> bool:
+        return self.previous.link_up != self.current.link_up
+
+    @property
+    def ip_changed(self) -> bool:
+        return self.previous.ip != self.current.ip
+
+
+def _read_sys(name: str, attribute: str) -> Optional[str]:
+    try:
+        return (SYS_NET / name / attribute).read_text().strip()
+    except OSError:
+        return None  # e.g. carrier of an interface that is administratively down
+
+
+def _link_up(name: str) -> bool:
+    return _read_sys(name, "operstate") in ("up", "unknown") and _read_sys(name, "carrier") == "1"
+
+
+def default_interface() -> Optional[str]:
+    """Interface of the IPv4 default route, from /proc/net/route."""
+    try:
+        lines = PROC_ROUTE.read_text().splitlines()[1:]
+    except OSError:
+        return None
+    for line in lines:
+        fields = line.split()
+        if len(fields) > 7 and fields[1] == "00000000" and fields[7] == "00000000":
+            return fields[0]
+    return None
+
+
+def _parse_addresses(data: bytes, names: dict[int, str], addresses: dict[str, list[str]]) -> bool:
+    """Collects global addresses from RTM_NEWADDR messages; True once the dump is done."""
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, kind, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            return True
+        if kind == NLMSG_DONE:
+            return True
+        if kind == NLMSG_ERROR:
+            raise OSError("Netlink address dump failed")
+        body = offset + _NLMSGHDR.size
+        family, _, flags, scope, index = _IFADDRMSG.unpack_from(data, body)
+        attributes = {}
+        position = body + _IFADDRMSG.size
+        while position + _RTATTR.size <= offset + length:
+            attr_length, attr_type = _RTATTR.unpack_from(data, position)
+            if attr_length < _RTATTR.size:
+                break
+            attributes[attr_type] = data[position + _RTATTR.size : position + attr_length]
+            position += (attr_length + 3) & ~3
+        raw = attributes.get(IFA_LOCAL, attributes.get(IFA_ADDRESS))
+        name = names.get(index)
+        if raw and name and scope == RT_SCOPE_UNIVERSE and not flags & IFA_F_TENTATIVE:
+            addresses.setdefault(name, []).append(socket.inet_ntop(family, raw))
+        offset += (length + 3) & ~3
+    return False
+
+
+def _dump_addresses(names: dict[int, str]) -> dict[str, list[str]]:
+    """Asks the kernel for all interface addresses (RTM_GETADDR dump)."""
+    addresses: dict[str, list[str]] = {}
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+        sock.settimeout(DUMP_TIMEOUT)
+        request = _IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        header = _NLMSGHDR.pack(
+            _NLMSGHDR.size + len(request), RTM_GETADDR, NLM_F_REQUEST | NLM_F_DUMP, 1, 0
+        )
+        sock.sendall(header + request)
+        while not _parse_addresses(sock.recv(65536), names, addresses):
+            pass
+    # IPv4 first, like hostname -I
+    return {name: sorted(found, key=lambda a: ":" in a) for name, found in addresses.items()}
+
+
+def _outbound_address() -> Optional[str]:
+    """Source address of the default route; a UDP connect sends no packet."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.connect(("192.0.2.1", 9))  # TEST-NET-1, never contacted
+            return sock.getsockname()[0]
+        except OSError:
+            return None
+
+
+def read_snapshot() -> NetSnapshot:
+    """Reads interfaces, links and addresses without starting a process (blocking)."""
+    names = {index: name for index, name in socket.if_nameindex() if name != "lo"}
+    default = default_interface()
+    links = {name: _link_up(name) for name in names.values()}
+    try:
+        addresses = _dump_addresses(names)
+    except (AttributeError, OSError):
+        # No rtnetlink (not Linux, or sandboxed): the outbound address is all we know
+        address = _outbound_address()
+        name = default or "default"
+        addresses = {name: [address]} if address else {}
+        links.setdefault(name, address is not None)
+    return NetSnapshot(
+        links=links,
+        addresses={name: tuple(found) for name, found in addresses.items()},
+        default=default,
+    )
+
+
+def read_mac(interface: Optional[str] = None) -> Optional[str]:
+    """
+    MAC address of an interface (default: the default-route interface, else the
+    first interface with a hardware address), from /sys.
+    """
+    candidates = [interface] if interface else []
+    if not candidates:
+        default = default_interface()
+        names = sorted(name for _, name in socket.if_nameindex() if name != "lo")
+        candidates = ([default] if default else []) + names
+    for name in candidates:
+        mac = _read_sys(name, "address")
+        if mac and mac != "00:00:00:00:00:00":
+            return mac.lower()
+    return None
+
+
+class NetInfo:
+    """
+    Interface information without subprocesses.
+    - Reads addresses through rtnetlink and link state/MAC from /sys
+    - Listens on an rtnetlink socket, so link and address changes arrive within
+      milliseconds; a slow poll covers dropped netlink messages
+    - Publishes NetChange to subscribers when link or addresses change
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.snapshot = NetSnapshot()
+        self.mac: Optional[str] = None  # Read once: it identifies the instrument
+        self._subscribers: list[asyncio.Queue] = []
+        self._sock: Optional[socket.socket] = None
+        self._refresh_handle: Optional[asyncio.TimerHandle] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._stale = False
+        self._poll_task: Optional[asyncio.Task] = None
+
+    @property
+    def ip(self) -> str:
+        return self.snapshot.ip
+
+    @property
+    def link_up(self) -> bool:
+        return self.snapshot.link_up
+
+    async def start(self):
+        self.snapshot = await run_in(SYSTEM, read_snapshot)
+        self.mac = await run_in(SYSTEM, read_mac)
+        print(f"[NetInfo] MAC {self.mac}, IP {self.ip or '-'}, link {'up' if self.link_up else 'down'}")
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.setblocking(False)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR | RTMGRP_IPV4_ROUTE))
+            asyncio.get_running_loop().add_reader(sock.fileno(), self._on_netlink)
+            self._sock = sock
+        except (AttributeError, OSError) as e:
+            print(f"[NetInfo] No netlink notifications ({e}), polling every {self.poll_interval} s")
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def close(self):
+        if self._sock is not None:
+            asyncio.get_running_loop().remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+        for task in (self._poll_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._poll_task = None
+        self._refresh_task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """Returns a queue receiving a NetChange on every link/address change."""
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    async def refresh(self) -> NetSnapshot:
+        """Rereads the interfaces and publishes what changed."""
+        try:
+            current = await run_in(SYSTEM, read_snapshot)
+        except Exception as e:
+            print(f"[NetInfo] Failed to read interfaces: {e}")
+            return self.snapshot
+        change = NetChange(self.snapshot, current)
+        self.snapshot = current
+        if change.link_changed or change.ip_changed:
+            kind = "link" if change.link_changed else "address"
+            NET_CHANGES.inc(kind=kind)
+            print(
+                f"[NetInfo] {kind} change: IP {change.previous.ip or '-'} -> {current.ip or '-'}, "
+                f"link {'up' if current.link_up else 'down'}"
+            )
+            for queue in self._subscribers:
+                queue.put_nowait(change)
+        return current
+
+    def _on_netlink(self):
+        # Only the fact that something changed matters, the snapshot is reread
+        try:
+            while self._sock.recv(65536):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            print(f"[NetInfo] Netlink receive failed: {e}")  # e.g. ENOBUFS, reread anyway
+        if self._refresh_handle is None:
+            loop = asyncio.get_running_loop()
+            self._refresh_handle = loop.call_later(SETTLE_DELAY, self._start_refresh)
+
+    def _start_refresh(self):
+        self._refresh_handle = None
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._stale = True  # Read again once the running read is done
+            return
+        self._refresh_task = asyncio.create_task(self._refresh_until_current())
+
+    async def _refresh_until_current(self):
+        self._stale = True
+        while self._stale:
+            self._stale = False
+            await self.refresh()
+
+    async def _poll_loop(self):
+        while True:
+            await get_timers().sleep(self.poll_interval)
+            await self.refresh()
@@ -5,90 +5,76 @@ from screen_manager import Screens
 from typing import Optional
 from logger import Logger
 from app_context import AppContext
-from http_config import CONNECTIVITY_TIMEOUT
-
-from getmac import get_mac_address as gma  # module for mac adress
-from subprocess import check_output  # module for ip address
-
-
-CHECK_URLS = [
-    "https://www.google.com",
-    "https://www.ceitec.cz/",
-    "https://cloudflare.com",
-    "https://1.1.1.1",
-]
-
-
-async def check_internet_connection(timeout: int = 5, retries: int = 2) -> bool:
-    """Try to reach well-known servers to confirm internet access."""
-    request_timeout = aiohttp.ClientTimeout(
-        total=min(timeout, CONNECTIVITY_TIMEOUT.total or timeout),
-        connect=CONNECTIVITY_TIMEOUT.connect,
-        sock_read=CONNECTIVITY_TIMEOUT.sock_read,
-    )
-    for _ in range(retries):
-        try:
-            async with aiohttp.ClientSession(timeout=request_timeout) as session:
-                for url in CHECK_URLS:
-                    async with session.get(url, timeout=timeout):
-                        return True  # Success if any URL is reachable
-        except (aiohttp.ClientError, asyncio.TimeoutError):
-            pass
-        await asyncio.sleep(1)
-    print("Offline")  # All attempts failed
-    return False
+
+from executors import SYSTEM, run_in
+from netinfo import read_mac, read_snapshot
+from api_policy import CircuitOpenError
+from events import ErrorOccurred
 
 
 async def network_monitor(
     screens: Screens,
     context: AppContext,
-    check_interval: float = 5.0,
 ):
     """
     Runs in the background to track network status.
-    Shows/hides 'offline' warnings based on connectivity.
+    Shows/hides 'offline' warnings based on changes published by the
+    ConnectivityService.
     """
-    was_online = context.network_status
-    consecutive_failures: int = 0
-    failure_threshold: int = 3  # How many checks must fail to be considered offline
-
-    while True:
-        is_online = await check_internet_connection()
-
-        if is_online:
-            consecutive_failures = 0
-            if not was_online:
-                async with context.lock:
-                    context.network_status = True
+    changes = context.connectivity.subscribe()
+    try:
+        while True:
+            is_online = await changes.get()
+            async with context.lock:
+                context.network_status = is_online
+                if is_online:
                     await screens.connection_restored()
-                was_online = True
-        else:
-            consecutive_failures += 1
-            if consecutive_failures >= failure_threshold and was_online:
-                async with context.lock:
-                    context.network_status = False
+                    if context.logger is not None:
+                        context.logger.resume()  # Replay logs journaled while offline
+                else:
                     await screens.no_connection()
-                was_online = False
-
-        await asyncio.sleep(check_interval)
+    finally:
+        context.connectivity.unsubscribe(changes)
 
 
 async def wait_until_online(context: AppContext, screen: Screens):
     """
     Blocks progress until the device is connected to the internet.
-    Continuously displays 'no connection' message.
+    Displays 'no connection' message while waiting.
+    """
+    if context.connectivity.is_online:
+        # A failed check alone does not make the service report a transition
+        context.network_status = True
+        screen.offline_cleared()
+        return
+    context.flags.lcd_in_use = True
+    context.flags.block_buttons = True
+    await screen.no_connection()
+    await context.connectivity.wait_online()
+    context.network_status = True
+    screen.offline_cleared()  # network_monitor only clears it on a transition
+
+
+async def address_monitor(context: AppContext):
+    """
+    Keeps context.instrument.ip current: NetInfo publishes address changes
+    (DHCP renewals, cable/Wi-Fi switches) and every session row logs the IP.
     """
-    while not context.network_status:
-        context.flags.lcd_in_use = True
-        context.flags.block_buttons = True
-        await screen.no_connection()
-        await asyncio.sleep(2)
+    changes = context.netinfo.subscribe()
+    try:
+        while True:
+            change = await changes.get()
+            if change.ip_changed and context.instrument is not None and change.current.ip:
+                print(f"[Network] IP changed: {context.instrument.ip} -> {change.current.ip}")
+                context.instrument.ip = change.current.ip
+    finally:
+        context.netinfo.unsubscribe(changes)
 
 
 async def fetch_mac() -> str:
-    """Retrieve the MAC address of the device."""
+    """Retrieve the MAC address of the device (from /sys, no subprocess)."""
     try:
-        mac = gma()
+        mac = await run_in(SYSTEM, read_mac)
         print("My MAC adress is: {}".format(mac))
         return mac
 
@@ -97,12 +83,10 @@ async def fetch_mac() -> str:
 
 
 async def fetch_ip() -> str:
-    """Retrieve the IP address using shell command."""
+    """Retrieve the IP addresses of the device, like `hostname -I` (via netlink, no subprocess)."""
     try:
-        ip = str(check_output(["hostname", "-I"]))
-
-        trimmed_ip = ip[2:40]
-        return trimmed_ip
+        snapshot = await run_in(SYSTEM, read_snapshot)
+        return snapshot.ip
 
     except Exception as mac_e:
         print("fetch ip error: " + str(mac_e))
@@ -125,15 +109,29 @@ async def safe_api_call(
     :param args: Positional arguments for the API function.
     :param kwargs: Keyword arguments for the API function.
     """
+    # Fail fast while the backend is known to be down (circuit breaker open)
+    breaker = context.api.breaker if context.api is not None else None
+    if breaker is not None and breaker.is_open:
+        await api_screens.backend_unavailable()
+        return None
+
     await wait_until_online(context=context, screen=api_screens)
     from token_handler import verify_token
 
     try:
-        await verify_token(context=context)  # Ensure token is still valid
+        token = await verify_token(context=context)  # Ensure token is still valid
+        if token is not None and "token" in kwargs:
+            kwargs["token"] = token  # Always call the API with the current token
         return await api_func(**kwargs)  # Call the API
+    except CircuitOpenError as e:
+        print(f"Error in {api_func.__name__}: {e}")
+        await api_screens.backend_unavailable()
+        return None
     except (aiohttp.ClientError, asyncio.TimeoutError, Exception) as e:
         error_message = f"Error in {api_func.__name__}: {e}"
         print(error_message)
+        if context.events is not None:
+            context.events.publish(ErrorOccurred(source=api_func.__name__, message=str(e)))
 
         if logger:
             pass
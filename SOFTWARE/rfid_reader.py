@@ -1,48 +1,42 @@
-from mfrc522 import SimpleMFRC522
+from mfrc522_async import MFRC522Async
 import asyncio
-import time
 
 
 class RFIDReader:
-    def __init__(self) -> None:
-        # Initialize the RFID reader hardware
-        self.reader = SimpleMFRC522()
-
-        # Cache of the last read card ID to avoid duplicates
-        self.last_card_id = None
-
-        # Timestamp of the last successful card read
-        self._last_read_time = 0
+    def __init__(self, driver: MFRC522Async | None = None) -> None:
+        # Initialize the RFID reader hardware (UID-only, IRQ or adaptive polling)
+        self.reader = driver if driver is not None else MFRC522Async.open()
 
         # Minimum time (in seconds) between reads of the same card
         self._cooldown = 2
 
+        # Card stream of the driver, deduplicated with the cooldown above
+        self._cards = None
+
     async def read_card(self) -> str | None:
         """
-        Reads an RFID card and returns the corrected card ID.
-        Applies a cooldown and filters out duplicate reads.
+        Waits for the next RFID card and returns the corrected card ID.
+        Duplicate reads within the cooldown are filtered out by the driver.
         """
+        if self._cards is None:
+            self._cards = self.reader.cards(cooldown=self._cooldown)
         try:
-            # Blocking read from RFID reader
-            card_id, _ = await asyncio.to_thread(self.reader.read)
-            now = time.time()
-
-            # Only accept new card or if cooldown has passed
-            if (
-                card_id != self.last_card_id
-                or (now - self._last_read_time) > self._cooldown
-            ):
-                self._last_read_time = now
-                self.last_card_id = card_id
-                return await self._process_card(card_id)
-
-            # Ignore duplicate reads during cooldown
-            return None
-
+            card_id = await anext(self._cards)
+            return await self._process_card(card_id)
+
+        except asyncio.CancelledError:
+            # The generator is closed by the cancellation, start a new one next time
+            # (the cooldown state lives in the driver, so it carries over)
+            self._cards = None
+            raise
         except Exception as e:
             print(f"RFID read error: {e}")
+            self._cards = None
             return None
 
+    def close(self):
+        self.reader.close()
+
     async def _process_card(self, card_id: int) -> str:
         """
         Processes the card ID, applying corrections and converting to string.
@@ -1,25 +1,63 @@
 from lcd_display import LCDController
 import inspect
 import random
+from typing import Optional
 from model_classes import Instrument
+from screen_scheduler import (
+    ScreenScheduler,
+    PRIORITY_BACKGROUND,
+    PRIORITY_NORMAL,
+    PRIORITY_WARNING,
+    PRIORITY_OFFLINE,
+    PRIORITY_BUTTON,
+)
+
+PROGRESS_EXPIRY = 30  # Seconds a "Checking..." screen may stay without a result
+EXPIRY_GRACE = 3  # Extra seconds a message may wait behind higher-priority screens
 
 
 class Screens:
     """
-    Class responsible to store all used screens possible to display
+    Class responsible to store all used screens possible to display.
+    Screens are posted to the ScreenScheduler, so no method waits for display time.
     """
 
     def __init__(self, lcd_controller: LCDController):
         self.lcd = lcd_controller
+        self.scheduler = ScreenScheduler(lcd_controller)
+
+    def _post(
+        self,
+        *lines: Optional[str],
+        display_time: float = 2,
+        priority: int = PRIORITY_NORMAL,
+        persistent: bool = False,
+        expiry: Optional[float] = None,
+        **options,
+    ):
+        """Posts a screen; display_time becomes its minimum dwell time."""
+        if persistent:
+            expiry = None
+        elif expiry is None:
+            expiry = display_time + EXPIRY_GRACE
+        return self.scheduler.post(
+            list(lines),
+            priority=priority,
+            min_dwell=display_time,
+            expiry=expiry,
+            **options,
+        )
 
     async def starting_screen(self):
-        await self.lcd.message(
+        return self._post(
             "Starting...",
             display_time=0.1,
+            priority=PRIORITY_BACKGROUND,
+            persistent=True,
         )
 
     async def initial_logs(self, time: str, ip: str, instrument: Instrument):
-        await self.lcd.message(
+        self._post(
             "Initial logs:",
             f"{time}",
             f"{ip}",
@@ -28,27 +66,42 @@ class Screens:
         )
 
     async def no_connection(self):
-        await self.lcd.message("Device is OFFLINE.", "Please wait.", "Reconnecting...")
+        self._post(
+            "Device is OFFLINE.",
+            "Please wait.",
+            "Reconnecting...",
+            priority=PRIORITY_OFFLINE,
+            persistent=True,
+            key="offline",
+        )
+
+    def offline_cleared(self):
+        """Removes the offline screen (without the 'ONLINE' notice)."""
+        self.scheduler.clear(key="offline")
 
     async def connection_restored(self):
-        await self.lcd.message(
+        self.scheduler.clear(priority=PRIORITY_OFFLINE)
+        self._post(
             "Device is ONLINE.", "Resuming session...", display_time=2
         )
 
     async def welcome_screen(self, instrument_name: str):
-        await self.lcd.message(
+        self._post(
             "Welcome at",
             f"{instrument_name}",
             "Please log in",
             "with your card",
-            # display_time=0.1,
+            display_time=0,
+            priority=PRIORITY_BACKGROUND,
+            persistent=True,
         )
 
     # User
     async def checking_user(self):
-        await self.lcd.message(
+        self._post(
             "Checking user...",
-            # display_time=0.5,
+            display_time=0,
+            expiry=PROGRESS_EXPIRY,
         )
 
     async def user_ok(self, user_name: str):
@@ -66,14 +119,14 @@ class Screens:
             phrase = random.choice(phrases)
             return phrase
 
-        await self.lcd.message(
+        self._post(
             f"Hi {user_name}",
             f"{await random_phase()}",
             # display_time=0.5,
         )
 
     async def user_not_in_database(self):
-        await self.lcd.message(
+        self._post(
             "Card not registered.",
             "Please register it.",
             # display_time=0.1,
@@ -81,13 +134,14 @@ class Screens:
 
     # Reservation
     async def checking_reservation(self):
-        await self.lcd.message(
+        self._post(
             "Checking reservation",
-            # display_time=0.1,
+            display_time=0,
+            expiry=PROGRESS_EXPIRY,
         )
 
     async def reservation_ok(self):
-        await self.lcd.message(
+        self._post(
             "Reservation found.",
             "Starting session...",
             "",
@@ -96,7 +150,7 @@ class Screens:
         )
 
     async def reservation_nok(self):
-        await self.lcd.message(
+        self._post(
             "No reservation",
             "in next 30 minutes.",
             "Please make one.",
@@ -106,75 +160,95 @@ class Screens:
     # Session
 
     async def in_reservation(self, remaining_session_time: int):
-        await self.lcd.message(
+        self._post(
             "Remaining time:",
             f"{remaining_session_time} minutes",
             "Extend -> Hold Green",
             "Stop -> Hold Red",
-            display_time=5,
+            display_time=0,
             backlight=False,
+            priority=PRIORITY_BACKGROUND,
+            persistent=True,
+            key="in_reservation",
         )
 
     async def loading_screen(self, label: str, duration: int = 5, char: str = "#"):
         for i in range(duration):
             bar = "[" + char * (i + 1) + " " * (duration - i - 1) + "]"
-            await self.lcd.message(label, bar, "", "", display_time=1)
+            # Frames dwell 1 s each, so the scheduler plays them in sequence
+            self._post(
+                label, bar, "", "", display_time=1, expiry=duration + EXPIRY_GRACE
+            )
 
     async def show_stopped(self):
-        await self.lcd.message("Stopped!")
+        self._post("Stopped!")
 
     async def show_reloaded(self):
-        await self.lcd.message("Reloaded")
+        self._post("Reloaded")
 
     async def session_ended_by_timeout(self):
-        await self.lcd.message(
+        self._post(
             "Your session ended.",
             "See you next time.",
             display_time=2,
         )
 
     async def user_stop_reservation(self):
-        await self.lcd.message(
+        self._post(
             "Your session ended.",
             "See you next time.",
             display_time=2,
         )
 
     async def want_to_end_session(self):
-        await self.lcd.message(
+        self._post(
             "Hold RED button", "for 3 seconds", "to end reservation."
         )
 
     async def reservation_end_warning(self, remaining_session_time: int):
-        await self.lcd.flashing(0.3, 5)
-        await self.lcd.message(
+        # Backlight flashes 5 times (0.3 s) before the warning stays for 5 s
+        self._post(
             "Session will end in",
             f"{remaining_session_time} minutes.",
             "Extend -> Hold green",
             "Stop -> Hold red",
-            display_time=5,
+            display_time=5 + 2 * 5 * 0.3,
+            priority=PRIORITY_WARNING,
+            flash_interval=0.3,
+            flashes=5,
         )
 
     async def returning(self):
-        await self.lcd.message("Returning...")
+        self._post("Returning...")
 
     async def want_to_extend_reservation(self):
-        await self.lcd.message(
+        self._post(
             "Hold GREEN button", "for 3 seconds", "to extend your", "reservation."
         )
 
     async def reservation_extended(self):
-        await self.lcd.message(
+        self._post(
             "Your session", "was extended", "by 15 minutes.", display_time=5
         )
 
     # Error
     async def error_message(self, error: str, source_function="Unknown"):
-        await self.lcd.message(
+        self._post(
             f"F:{source_function[:18]}",
             error[:20],
             error[20:],
             display_time=5,
+            priority=PRIORITY_WARNING,
+        )
+
+    async def backend_unavailable(self):
+        self._post(
+            "Server unavailable.",
+            "Please try again",
+            "in a moment.",
+            display_time=3,
+            priority=PRIORITY_WARNING,
+            key="backend",
         )
 
     # Button menu
@@ -191,7 +265,7 @@ class Screens:
             else:
                 display_lines.append(f"  {option}")
 
-        await self.lcd.message(
+        self._post(
             display_lines[0],
             display_lines[1],
             display_lines[2],
@@ -200,7 +274,7 @@ class Screens:
         )
 
     async def button_menu_extend(self):
-        await self.lcd.message(
+        self._post(
             "Scan your card",
             "to extend session",
             "by 15 minutes.",
@@ -209,14 +283,14 @@ class Screens:
         )
 
     async def button_menu_extend_ok(self):
-        await self.lcd.message(
+        self._post(
             "Session extended",
             "by 15 minutes.",
             # display_time=0.1,
         )
 
     async def extend_not_yet(self):
-        await self.lcd.message(
+        self._post(
             "Session can be",
             "extended only",
             "15 minutes",
@@ -225,7 +299,7 @@ class Screens:
         )
 
     async def button_menu_extend_bad_card(self):
-        await self.lcd.message(
+        self._post(
             "Unauthorized user",
             "Session not extended",
             "Returning to session",
@@ -233,7 +307,7 @@ class Screens:
         )
 
     async def button_menu_end_confirmation(self):
-        await self.lcd.message(
+        self._post(
             "Press button",
             "to confirm",
             "session end.",
@@ -267,4 +341,18 @@ class Screens:
                     await attr(*args)
 
     async def loading_screen_step(self, label: str, bar: str):
-        await self.lcd.message(label, bar, "", "", display_time=0.1)
+        # Expires quickly, so the progress disappears once the button is released
+        self._post(
+            label,
+            bar,
+            "",
+            "",
+            display_time=0,
+            expiry=0.5,
+            priority=PRIORITY_BUTTON,
+            key="button",
+        )
+
+    def loading_screen_clear(self):
+        """Removes the button progress bar right away (button released)."""
+        self.scheduler.clear(key="button")
@@ -0,0 +1,180 @@
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from typing import Optional
+
+from lcd_display import LCDController
+from timer_service import get_timers
+
+# Screen priorities, higher ones preempt lower ones immediately
+PRIORITY_BACKGROUND = 0  # Idle screens (welcome, remaining time)
+PRIORITY_NORMAL = 10  # Flow messages (checking user, reservation found, ...)
+PRIORITY_WARNING = 20  # Errors and end-of-reservation warning
+PRIORITY_OFFLINE = 30  # No connection
+PRIORITY_BUTTON = 40  # Button hold progress
+
+SCREEN_SLACK = 0.05  # Seconds a dwell/expiry/flash deadline may be late to share a wakeup
+
+
+@dataclass
+class Screen:
+    """One screen posted to the scheduler."""
+
+    lines: list[Optional[str]]
+    priority: int = PRIORITY_NORMAL
+    min_dwell: float = 0.0  # Seconds on glass before same/lower priority may replace it
+    expiry: Optional[float] = None  # Seconds after posting until removed (None = persistent)
+    backlight: bool = True
+    flash_interval: float = 0.0  # Backlight flashing when first shown
+    flashes: int = 0
+    key: Optional[str] = None  # A newer screen with the same key replaces this one
+    seq: int = 0
+    posted_at: float = 0.0
+    shown_at: Optional[float] = None
+    shown: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        if self.expiry is None:
+            return None
+        return self.posted_at + self.expiry
+
+    @property
+    def transient(self) -> bool:
+        return self.expiry is not None
+
+
+class ScreenScheduler:
+    """
+    Owns the LCD. States post screens and never wait for display time.
+    - A higher-priority screen preempts the current one immediately
+    - A screen stays at least min_dwell before same/lower priority screens replace it
+    - Transient screens (with expiry) yield to any other screen once dwell is over
+    - Persistent screens stay until replaced by same/higher priority or cleared
+    """
+
+    def __init__(self, lcd: LCDController):
+        self.lcd = lcd
+        self._screens: list[Screen] = []  # Active screens in posting order
+        self._current: Optional[Screen] = None
+        self._changed = asyncio.Event()
+        self._seq = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+
+    def post(self, lines: list[Optional[str]], **options) -> Screen:
+        """Queues a screen (see Screen for options) and returns immediately."""
+        loop = asyncio.get_running_loop()
+        screen = Screen(lines=list(lines), **options)
+        screen.seq = next(self._seq)
+        screen.posted_at = loop.time()
+
+        # Drop superseded screens: same key, or unshown fillers of the same priority
+        self._screens = [
+            s
+            for s in self._screens
+            if not (screen.key is not None and s.key == screen.key and s is not self._current)
+            and not (
+                s.priority == screen.priority
+                and s.shown_at is None
+                and s.min_dwell == 0
+            )
+        ]
+        self._screens.append(screen)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._changed.set()
+        return screen
+
+    def clear(self, priority: Optional[int] = None, key: Optional[str] = None):
+        """Removes screens of a priority level and/or with a key."""
+        self._screens = [
+            s
+            for s in self._screens
+            if not (
+                (priority is None or s.priority == priority)
+                and (key is None or s.key == key)
+            )
+        ]
+        self._changed.set()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _select(self, now: float) -> Optional[Screen]:
+        self._screens = [
+            s for s in self._screens if s.expires_at is None or s.expires_at > now
+        ]
+        current = self._current if self._current in self._screens else None
+        if not self._screens:
+            return None
+
+        top = max(s.priority for s in self._screens)
+        if current is None or top > current.priority:
+            return next(s for s in self._screens if s.priority == top)
+
+        if now < current.shown_at + current.min_dwell:
+            return current  # Still dwelling
+
+        same = [
+            s
+            for s in self._screens
+            if s.seq > current.seq and s.priority == current.priority
+        ]
+        if same or (current.transient and len(self._screens) > 1):
+            self._screens.remove(current)
+            top = max(s.priority for s in self._screens)
+            return next(s for s in self._screens if s.priority == top)
+        return current
+
+    def _backlight(self, screen: Screen, now: float) -> bool:
+        if screen.flashes and screen.flash_interval > 0:
+            phase = int((now - screen.shown_at) / screen.flash_interval)
+            if phase < 2 * screen.flashes:
+                return phase % 2 == 1
+        return screen.backlight
+
+    def _next_deadline(self, now: float) -> Optional[float]:
+        deadlines = [s.expires_at for s in self._screens if s.expires_at is not None]
+        current = self._current
+        if current is not None and current in self._screens:
+            dwell_end = current.shown_at + current.min_dwell
+            if dwell_end > now and len(self._screens) > 1:
+                deadlines.append(dwell_end)
+            if current.flashes and current.flash_interval > 0:
+                phase = int((now - current.shown_at) / current.flash_interval)
+                if phase < 2 * current.flashes:
+                    deadlines.append(
+                        current.shown_at + (phase + 1) * current.flash_interval
+                    )
+        deadlines = [d for d in deadlines if d > now]
+        return min(deadlines) if deadlines else None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._changed.clear()
+            now = loop.time()
+            screen = self._select(now)
+            if screen is not None:
+                if screen.shown_at is None:
+                    screen.shown_at = now
+                self._current = screen
+                try:
+                    await self.lcd.draw(screen.lines, backlight=self._backlight(screen, now))
+                except Exception as e:
+                    print(f"[Screens] LCD write failed: {e}")
+                screen.shown.set()  # On the glass (or the LCD write failed)
+
+            deadline = self._next_deadline(loop.time())
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                await get_timers().wait_for(self._changed.wait(), timeout, slack=SCREEN_SLACK)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,398 @@
+"""
+On-device SQLite store of sessions, users, extensions, stop reasons and errors,
+filled from the business events (event_sinks.SessionStoreSink), and a CLI to
+query it without network access:
+
+    python session_store.py days --since 2026-10-01
+    python session_store.py users --limit 10
+    python session_store.py sessions --user <user id>
+    python session_store.py errors --since 2026-10-17
+    python session_store.py prune --days 365
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from config import config
+
+SESSION_DB = getattr(config, "SESSION_DB", Path("/home/bluebox/sessions.db"))  # None disables
+RETENTION_DAYS = getattr(config, "SESSION_RETENTION_DAYS", 365)
+RETENTION_INTERVAL = 24 * 60 * 60  # Seconds between retention runs while the app runs
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    full_name TEXT NOT NULL DEFAULT '',
+    card_id TEXT NOT NULL DEFAULT '',
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    reservation_id TEXT NOT NULL DEFAULT '',
+    user_id TEXT NOT NULL DEFAULT '',
+    card_id TEXT NOT NULL DEFAULT '',
+    started_at TEXT NOT NULL,
+    ended_at TEXT,
+    end_reason TEXT,
+    extensions INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_by_user ON sessions (user_id, started_at);
+CREATE INDEX IF NOT EXISTS sessions_by_start ON sessions (started_at);
+CREATE TABLE IF NOT EXISTS extensions (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    at TEXT NOT NULL,
+    reason TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS extensions_by_session ON extensions (session_id);
+CREATE TABLE IF NOT EXISTS unknown_cards (
+    at TEXT NOT NULL,
+    card_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS unknown_cards_by_time ON unknown_cards (at);
+CREATE TABLE IF NOT EXISTS errors (
+    at TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    message TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS errors_by_time ON errors (at);
+"""
+
+# Minutes of a session (0 while it is still open)
+_MINUTES = "(julianday(COALESCE(s.ended_at, s.started_at)) - julianday(s.started_at)) * 1440"
+
+
+def _timestamp(value: str) -> str:
+    """ISO timestamp to seconds, the format stored (and compared as text)."""
+    return datetime.fromisoformat(value).isoformat(timespec="seconds")
+
+
+class SessionStore:
+    """
+    SQLite (WAL) store of what happened on the box. Blocking: the app calls it
+    from the DISK executor, the CLI directly. WAL lets the CLI read while the
+    app writes.
+    """
+
+    def __init__(self, path: Path = SESSION_DB, readonly: bool = False):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._last_retention: Optional[float] = None
+        # The session the next extension/end belongs to, and who tapped last
+        self._open_session: Optional[int] = None
+        self._last_user: dict = {}
+        if readonly:
+            self.db = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            # Before the first table: lets prune() give pages back to the file system
+            self.db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.db.execute("PRAGMA journal_mode = WAL")
+            self.db.execute("PRAGMA synchronous = NORMAL")  # WAL: durable up to the last checkpoint
+            self.db.executescript(SCHEMA)
+            row = self.db.execute(
+                "SELECT id FROM sessions WHERE ended_at IS NULL ORDER BY started_at DESC LIMIT 1"
+            ).fetchone()
+            self._open_session = row[0] if row else None
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    # --- Writing (event records, see events.Event.record) ---
+
+    def apply(self, records: list[dict]):
+        """Stores a batch of event records in one transaction."""
+        with self._lock, self.db:
+            for record in records:
+                handler = getattr(self, "_on_" + record["event"], None)
+                if handler is not None:
+                    handler(record, _timestamp(record["at"]))
+
+    def _on_user_verified(self, record: dict, at: str):
+        self._last_user = record
+        self.db.execute(
+            """
+            INSERT INTO users (user_id, full_name, card_id, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                full_name = excluded.full_name,
+                card_id = excluded.card_id,
+                last_seen = excluded.last_seen
+            """,
+            (record["user_id"], record["full_name"], record["card_id"], at, at),
+        )
+
+    def _on_unknown_card(self, record: dict, at: str):
+        self._last_user = {}
+        self.db.execute(
+            "INSERT INTO unknown_cards (at, card_id) VALUES (?, ?)", (at, record["card_id"])
+        )
+
+    def _on_session_started(self, record: dict, at: str):
+        if self._open_session is not None:
+            # The box missed the end (e.g. power loss): it ended at its last known activity
+            self.db.execute(
+                """
+                UPDATE sessions SET end_reason = 'Superseded', ended_at = COALESCE(
+                    (SELECT MAX(at) FROM extensions WHERE session_id = sessions.id), started_at
+                ) WHERE id = ?
+                """,
+                (self._open_session,),
+            )
+        card_id = self._last_user.get("card_id", "")
+        cursor = self.db.execute(
+            """
+            INSERT INTO sessions (reservation_id, user_id, card_id, started_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (record["reservation_id"], record["user_id"], card_id, at),
+        )
+        self._open_session = cursor.lastrowid
+
+    def _on_session_extended(self, record: dict, at: str):
+        if self._open_session is None:
+            return
+        self.db.execute(
+            "INSERT INTO extensions (session_id, at, reason) VALUES (?, ?, ?)",
+            (self._open_session, at, record["reason"]),
+        )
+        self.db.execute(
+            "UPDATE sessions SET extensions = extensions + 1 WHERE id = ?", (self._open_session,)
+        )
+
+    def _on_session_ended(self, record: dict, at: str):
+        self._close_open(at, record["reason"])
+
+    def _on_error(self, record: dict, at: str):
+        self.db.execute(
+            "INSERT INTO errors (at, source, message) VALUES (?, ?, ?)",
+            (at, record["source"], record["message"]),
+        )
+
+    def _close_open(self, at: str, reason: str):
+        if self._open_session is not None:
+            self.db.execute(
+                "UPDATE sessions SET ended_at = ?, end_reason = ? WHERE id = ?",
+                (at, reason, self._open_session),
+            )
+            self._open_session = None
+
+    # --- Retention ---
+
+    def prune(self, days: int = RETENTION_DAYS) -> dict[str, int]:
+        """Deletes what is older than `days` and gives the freed pages back."""
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+        deleted = {}
+        with self._lock:
+            with self.db:
+                for table, column in (
+                    ("sessions", "started_at"),  # Extensions go with their session
+                    ("unknown_cards", "at"),
+                    ("errors", "at"),
+                    ("users", "last_seen"),
+                ):
+                    cursor = self.db.execute(f"DELETE FROM {table} WHERE {column} < ?", (cutoff,))
+                    deleted[table] = cursor.rowcount
+            self.db.execute("PRAGMA incremental_vacuum")
+            self._last_retention = time.monotonic()
+        return deleted
+
+    def prune_due(self) -> bool:
+        """True on the first call and then once per RETENTION_INTERVAL."""
+        return (
+            self._last_retention is None
+            or time.monotonic() - self._last_retention >= RETENTION_INTERVAL
+        )
+
+    def vacuum(self):
+        """Rebuilds the file (compacts it fully); needs free space of its size."""
+        with self._lock:
+            self.db.execute("VACUUM")
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # --- Queries ---
+
+    def _query(self, sql: str, params: tuple) -> list[dict]:
+        with self._lock:
+            return [dict(row) for row in self.db.execute(sql, params)]
+
+    @staticmethod
+    def _range(since: Optional[str], until: Optional[str]) -> tuple[str, str]:
+        # Dates are inclusive: --until 2026-10-17 covers the whole day
+        low = _timestamp(since) if since else ""
+        high = (
+            (datetime.fromisoformat(until) + timedelta(days=1)).isoformat(timespec="seconds")
+            if until and len(until) == 10
+            else (_timestamp(until) if until else "9999")
+        )
+        return low, high
+
+    def usage_by_day(self, since: str = None, until: str = None) -> list[dict]:
+        low, high = self._range(since, until)
+        return self._query(
+            f"""
+            SELECT date(s.started_at) AS day,
+                   COUNT(*) AS sessions,
+                   COUNT(DISTINCT s.user_id) AS users,
+                   SUM(s.extensions) AS extensions,
+                   ROUND(SUM({_MINUTES}), 1) AS minutes
+            FROM sessions s
+            WHERE s.started_at >= ? AND s.started_at < ?
+            GROUP BY day ORDER BY day
+            """,
+            (low, high),
+        )
+
+    def usage_by_user(self, since: str = None, until: str = None, limit: int = 50) -> list[dict]:
+        low, high = self._range(since, until)
+        return self._query(
+            f"""
+            SELECT s.user_id, u.full_name,
+                   COUNT(*) AS sessions,
+                   SUM(s.extensions) AS extensions,
+                   ROUND(SUM({_MINUTES}), 1) AS minutes,
+                   MAX(s.started_at) AS last_session
+            FROM sessions s LEFT JOIN users u ON u.user_id = s.user_id
+            WHERE s.started_at >= ? AND s.started_at < ?
+            GROUP BY s.user_id ORDER BY minutes DESC LIMIT ?
+            """,
+            (low, high, limit),
+        )
+
+    def sessions(
+        self, user_id: str = None, since: str = None, until: str = None, limit: int = 50
+    ) -> list[dict]:
+        low, high = self._range(since, until)
+        user_filter = "AND s.user_id = ?" if user_id else ""
+        params = (low, high) + ((user_id,) if user_id else ()) + (limit,)
+        return self._query(
+            f"""
+            SELECT s.started_at, s.ended_at, s.end_reason, s.extensions,
+                   ROUND({_MINUTES}, 1) AS minutes,
+                   s.user_id, u.full_name, s.reservation_id
+            FROM sessions s LEFT JOIN users u ON u.user_id = s.user_id
+            WHERE s.started_at >= ? AND s.started_at < ? {user_filter}
+            ORDER BY s.started_at DESC LIMIT ?
+            """,
+            params,
+        )
+
+    def stop_reasons(self, since: str = None, until: str = None) -> list[dict]:
+        low, high = self._range(since, until)
+        return self._query(
+            """
+            SELECT COALESCE(end_reason, 'Open') AS reason, COUNT(*) AS sessions
+            FROM sessions WHERE started_at >= ? AND started_at < ?
+            GROUP BY reason ORDER BY sessions DESC
+            """,
+            (low, high),
+        )
+
+    def errors(self, since: str = None, until: str = None, limit: int = 50) -> list[dict]:
+        low, high = self._range(since, until)
+        return self._query(
+            "SELECT at, source, message FROM errors WHERE at >= ? AND at < ? "
+            "ORDER BY at DESC LIMIT ?",
+            (low, high, limit),
+        )
+
+    def unknown_cards(self, since: str = None, until: str = None, limit: int = 50) -> list[dict]:
+        low, high = self._range(since, until)
+        return self._query(
+            """
+            SELECT card_id, COUNT(*) AS taps, MAX(at) AS last_tap
+            FROM unknown_cards WHERE at >= ? AND at < ?
+            GROUP BY card_id ORDER BY taps DESC LIMIT ?
+            """,
+            (low, high, limit),
+        )
+
+
+def _print_table(rows: list[dict]):
+    if not rows:
+        print("(no rows)")
+        return
+    columns = list(rows[0])
+    widths = {
+        column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns
+    }
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(widths[column]) for column in columns))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Query the on-device session store")
+    parser.add_argument("--db", type=Path, default=SESSION_DB, help="SQLite file")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add(name: str, help: str, limit: bool = True):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("--since", help="From date/time (ISO, inclusive)")
+        command.add_argument("--until", help="To date (inclusive) or date/time (exclusive)")
+        if limit:
+            command.add_argument("--limit", type=int, default=50)
+        return command
+
+    add("days", "Sessions, users and minutes per day", limit=False)
+    add("users", "Sessions and minutes per user")
+    add("sessions", "Recent sessions").add_argument("--user", help="Only this user id")
+    add("reasons", "How sessions ended", limit=False)
+    add("errors", "Recent errors")
+    add("unknown", "Unknown cards")
+    prune = commands.add_parser("prune", help="Delete old data")
+    prune.add_argument("--days", type=int, default=RETENTION_DAYS)
+    commands.add_parser("vacuum", help="Compact the database file")
+    args = parser.parse_args(argv)
+
+    if args.db is None or not Path(args.db).exists():
+        print(f"No session store at {args.db}", file=sys.stderr)
+        return 1
+    store = SessionStore(args.db, readonly=args.command not in ("prune", "vacuum"))
+    try:
+        if args.command == "prune":
+            result = store.prune(args.days)
+        elif args.command == "vacuum":
+            store.vacuum()
+            result = {"size_bytes": Path(args.db).stat().st_size}
+        else:
+            queries = {
+                "days": lambda: store.usage_by_day(args.since, args.until),
+                "users": lambda: store.usage_by_user(args.since, args.until, args.limit),
+                "sessions": lambda: store.sessions(args.user, args.since, args.until, args.limit),
+                "reasons": lambda: store.stop_reasons(args.since, args.until),
+                "errors": lambda: store.errors(args.since, args.until, args.limit),
+                "unknown": lambda: store.unknown_cards(args.since, args.until, args.limit),
+            }
+            started = time.perf_counter()
+            result = queries[args.command]()
+            elapsed = time.perf_counter() - started
+    finally:
+        store.close()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif isinstance(result, dict):
+        print(", ".join(f"{key}: {value}" for key, value in result.items()))
+    else:
+        _print_table(result)
+        print(f"({len(result)} rows in {elapsed * 1000:.1f} ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+"""
+Stand-in for the reservation backend: the contracts APIClient uses, with
+realistic state (tokens that expire, bookings that count down, extend rules)
+and the latency and faults of a simulation.faults.Scenario.
+
+    cd SOFTWARE
+    python -m simulation.backend --port 8765 --scenario flaky.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Optional
+
+from aiohttp import web
+
+from simulation.faults import (
+    DISCONNECT,
+    ERROR,
+    SLOW_DRIP,
+    TIMEOUT,
+    FaultProfile,
+    FlapState,
+    Scenario,
+)
+
+# Config names of the endpoints and their paths
+ENDPOINTS = {
+    "FETCH_TOKEN": ("POST", "/token"),
+    "EQUIPMENT_BY_MAC": ("POST", "/equipment/by-mac"),
+    "CONTACT_BY_RFID": ("POST", "/contact/by-rfid"),
+    "RECORDING_START": ("POST", "/recording/start"),
+    "RECORDING_INFO": ("GET", "/recording/{reservation_id}"),
+    "RECORDING_STOP": ("POST", "/recording/stop"),
+}
+
+
+@dataclass
+class Contact:
+    contact_id: str
+    firstname: str
+    full_name: str
+
+
+@dataclass
+class Equipment:
+    equipment_id: str
+    alias: str
+
+
+@dataclass
+class Booking:
+    """A reservation of one instrument; recording while the user is at it."""
+
+    reservation_id: str
+    contact_id: str
+    equipment_id: str
+    start: float  # Backend clock (seconds)
+    end: float
+    recording_id: Optional[str] = None
+
+    def remaining(self, now: float) -> int:
+        """Minutes to the end, rounded up like the real backend."""
+        return max(math.ceil((self.end - now) / 60), 0)
+
+
+class StandInBackend:
+    """
+    Local aiohttp backend with the contracts of the real one.
+    - Tokens expire after token_lifetime; recording calls with an expired token get 401
+    - Cards and MACs are registered on first use unless auto_register is off (then 404)
+    - A tap starts the user's booking (one is created on demand with auto_book);
+      a tap or extend during a recording extends it if that is allowed:
+      less than extend_window minutes left and no other booking in the way
+    - Bookings count down on the backend clock, which runs time_scale times
+      faster than real time (e.g. 60: a minute per second)
+    - Latency and faults per endpoint, and network flaps, follow the scenario
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        scenario: Optional[Scenario] = None,
+        time_scale: float = 1.0,
+        token_lifetime: int = 3600,  # Seconds (backend clock)
+        reservation_minutes: int = 10,
+        extend_minutes: int = 15,
+        extend_window: int = 15,  # Extend only allowed with less than this left
+        auto_register: bool = True,
+        auto_book: bool = True,
+    ):
+        self.host = host
+        self.port = port
+        self.scenario = scenario if scenario is not None else Scenario()
+        self.time_scale = time_scale
+        self.token_lifetime = token_lifetime
+        self.reservation_minutes = reservation_minutes
+        self.extend_minutes = extend_minutes
+        self.extend_window = extend_window
+        self.auto_register = auto_register
+        self.auto_book = auto_book
+
+        self.contacts: dict[str, Contact] = {}  # By card ID
+        self.equipment: dict[str, Equipment] = {}  # By MAC address
+        self.tokens: dict[str, float] = {}  # Token -> expiration (backend clock)
+        self.bookings: dict[str, Booking] = {}
+        self.requests: dict[str, int] = {}  # Per endpoint
+        self.outcomes: dict[str, int] = {}  # Injected faults by kind
+
+        # One random stream per endpoint: concurrency does not reorder the draws
+        self._rngs = {
+            name: random.Random(f"{self.scenario.seed}:{name}") for name in ENDPOINTS
+        }
+        self.network = FlapState(self.scenario.flap, random.Random(f"{self.scenario.seed}:flap"))
+        self._ids = itertools.count(1)
+        self._epoch = time.monotonic()
+        self._runner: Optional[web.AppRunner] = None
+        self._site: Optional[web.TCPSite] = None
+        self._flap_task: Optional[asyncio.Task] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def urls(self) -> dict[str, str]:
+        """Endpoint URLs in the shape of the config values."""
+        return {name: self.base_url + path for name, (_, path) in ENDPOINTS.items()}
+
+    def now(self) -> float:
+        """Backend clock in seconds, time_scale times faster than real time."""
+        return (time.monotonic() - self._epoch) * self.time_scale
+
+    # Registry, for scenarios that want explicit users and bookings
+
+    def register_card(self, card_id: str, firstname: str = "Sim", full_name: str = "") -> Contact:
+        contact = Contact(f"contact-{card_id}", firstname, full_name or f"{firstname} {card_id}")
+        self.contacts[card_id] = contact
+        return contact
+
+    def register_equipment(self, mac: str, alias: str = "") -> Equipment:
+        equipment = Equipment(f"eq-{mac}", alias or f"SIM {mac[-5:]}")
+        self.equipment[mac] = equipment
+        return equipment
+
+    def book(self, contact_id: str, equipment_id: str, start: float, minutes: int) -> Booking:
+        """Adds a booking starting at `start` (backend clock seconds)."""
+        number = next(self._ids)
+        booking = Booking(f"res-{number}", contact_id, equipment_id, start, start + minutes * 60)
+        self.bookings[booking.reservation_id] = booking
+        return booking
+
+    # Lifecycle
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        for name, (method, path) in ENDPOINTS.items():
+            app.router.add_route(method, path, getattr(self, "_" + name.lower()), name=name)
+        app.router.add_route("HEAD", "/", self._head)  # Connectivity probe
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app(), access_log=None, handle_signals=False)
+        await self._runner.setup()
+        await self._listen()
+        self._flap_task = asyncio.create_task(self._flap_loop())
+
+    async def close(self):
+        if self._flap_task is not None:
+            self._flap_task.cancel()
+            try:
+                await self._flap_task
+            except asyncio.CancelledError:
+                pass
+            self._flap_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            self._site = None
+
+    async def _listen(self):
+        self._site = web.TCPSite(self._runner, self.host, self.port, reuse_address=True)
+        await self._site.start()
+
+    async def _flap_loop(self):
+        """Stops listening while the network is down, like a dropped link."""
+        while True:
+            down = self.network.is_down()
+            if down and self._site is not None:
+                print("[Backend] Network down")
+                await self._site.stop()
+                self._site = None
+            elif not down and self._site is None:
+                print("[Backend] Network up")
+                await self._listen()
+            await asyncio.sleep(0.1)
+
+    # Faults
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if self.network.is_down():
+            self._count(self.outcomes, "flap")
+            request.transport.abort()  # Kept-alive connections die with the link
+            raise web.HTTPServiceUnavailable()
+        name = request.match_info.route.name
+        if name is None:
+            return await handler(request)  # Connectivity probe, no faults
+
+        self._count(self.requests, name)
+        await request.read()  # Take the body now, a client that gave up cannot send it later
+        profile = self.scenario.profile(name)
+        rng = self._rngs[name]
+        outcome = profile.draw(rng)
+        await asyncio.sleep(profile.latency.sample(rng))
+        if outcome != "ok":
+            self._count(self.outcomes, outcome)
+
+        if outcome == DISCONNECT:
+            request.transport.abort()
+            raise web.HTTPServiceUnavailable()
+        if outcome == TIMEOUT:
+            await asyncio.sleep(profile.hang)
+        if outcome == ERROR:
+            response = web.json_response({"status": "injected error"}, status=profile.error_status)
+        else:
+            response = await handler(request)
+        response.headers["Date"] = format_datetime(datetime.now().astimezone(), usegmt=True)
+        if outcome == SLOW_DRIP:
+            return await self._drip(request, response, profile)
+        return response
+
+    async def _drip(self, request: web.Request, response: web.Response, profile: FaultProfile):
+        """Sends the body a few bytes at a time."""
+        body = response.body
+        stream = web.StreamResponse(status=response.status, headers=response.headers)
+        stream.content_length = len(body)
+        await stream.prepare(request)
+        for offset in range(0, len(body), profile.drip_chunk):
+            await stream.write(body[offset : offset + profile.drip_chunk])
+            await asyncio.sleep(profile.drip_interval)
+        await stream.write_eof()
+        return stream
+
+    @staticmethod
+    def _count(counts: dict, key: str):
+        counts[key] = counts.get(key, 0) + 1
+
+    # Endpoints
+
+    def _authorized(self, request: web.Request) -> bool:
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        expiration = self.tokens.get(token)
+        return expiration is not None and expiration > self.now()
+
+    async def _head(self, request: web.Request) -> web.Response:
+        return web.Response()
+
+    async def _fetch_token(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if not body.get("apiKey"):
+            return web.json_response({"message": "missing api key"}, status=401)
+        token = f"token-{next(self._ids)}"
+        self.tokens[token] = self.now() + self.token_lifetime
+        lifetime = self.token_lifetime / self.time_scale  # Real seconds for the client
+        expires = datetime.now().astimezone() + timedelta(seconds=lifetime)
+        return web.json_response({"accessToken": token, "expiresAt": expires.isoformat()})
+
+    async def _equipment_by_mac(self, request: web.Request) -> web.Response:
+        mac = (await request.json())["mac_address"]
+        equipment = self.equipment.get(mac)
+        if equipment is None and self.auto_register:
+            equipment = self.register_equipment(mac)
+        if equipment is None:
+            return web.json_response({"message": "unknown equipment"}, status=404)
+        return web.json_response(
+            [{"equipmentid": equipment.equipment_id, "alias": equipment.alias}]
+        )
+
+    async def _contact_by_rfid(self, request: web.Request) -> web.Response:
+        card_id = (await request.json())["rfid"]
+        contact = self.contacts.get(card_id)
+        if contact is None and self.auto_register:
+            contact = self.register_card(card_id)
+        if contact is None:
+            return web.json_response({"message": "unknown card"}, status=404)
+        return web.json_response(
+            [
+                {
+                    "contactid": contact.contact_id,
+                    "firstname": contact.firstname,
+                    "full_name": contact.full_name,
+                }
+            ]
+        )
+
+    def _expire(self):
+        now = self.now()
+        for reservation_id, booking in list(self.bookings.items()):
+            if booking.end <= now:
+                del self.bookings[reservation_id]
+
+    async def _recording_start(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return web.json_response({"status": "token expired"}, status=401)
+        body = await request.json()
+        contact_id, equipment_id = body["contactId"], body["equipmentId"]
+        self._expire()
+        now = self.now()
+        on_equipment = [b for b in self.bookings.values() if b.equipment_id == equipment_id]
+
+        current = next(
+            (b for b in on_equipment if b.contact_id == contact_id and b.start <= now), None
+        )
+        if current is None:
+            if any(b.recording_id and b.start <= now for b in on_equipment):
+                return web.json_response({"status": "instrument in use"}, status=409)
+            if not self.auto_book:
+                return web.json_response({"status": "no reservation"}, status=404)
+            current = self.book(contact_id, equipment_id, now, self.reservation_minutes)
+        elif current.recording_id is not None:
+            # Tap or extend during a recording
+            if current.remaining(now) >= self.extend_window:
+                return web.json_response({"status": "extend not allowed yet"}, status=409)
+            new_end = current.end + self.extend_minutes * 60
+            if any(b is not current and b.start < new_end for b in on_equipment):
+                return web.json_response({"status": "next reservation in the way"}, status=409)
+            current.end = new_end
+
+        if current.recording_id is None:
+            current.recording_id = f"rec-{next(self._ids)}"
+        return web.json_response(
+            {
+                "recording": current.recording_id,
+                "reservation": current.reservation_id,
+                "timetoend": current.remaining(now),
+            }
+        )
+
+    async def _recording_info(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return web.json_response({"status": "token expired"}, status=401)
+        booking = self.bookings.get(request.match_info["reservation_id"])
+        if booking is None:
+            return web.json_response({"timetoend": 0})  # Ended
+        return web.json_response({"timetoend": booking.remaining(self.now())})
+
+    async def _recording_stop(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return web.json_response({"status": "token expired"}, status=401)
+        body = await request.json()
+        if self.bookings.pop(body["serviceAppointmentId"], None) is None:
+            return web.json_response({"status": "not found"}, status=404)
+        return web.json_response({"status": "stopped"})
+
+
+async def serve(args):
+    backend = StandInBackend(
+        host=args.host,
+        port=args.port,
+        scenario=Scenario.load(args.scenario),
+        time_scale=args.time_scale,
+    )
+    await backend.start()
+    print(f"[Backend] Serving on {backend.base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await backend.close()
+        print(f"[Backend] Requests: {backend.requests}, faults: {backend.outcomes}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the reservation backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", type=Path, help="Fault scenario JSON")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Backend clock speed-up")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+End-to-end latency benchmark: runs the real state machine against fake
+hardware and a local stub backend, drives it with scripted taps and button
+holds, and reports p50/p95/p99 per user-visible step.
+
+    cd SOFTWARE
+    python -m simulation.bench --iterations 20 --save simulation/baselines/main.json
+    python -m simulation.bench --iterations 20 --compare simulation/baselines/main.json
+
+Measured steps (time.monotonic, from the harness action to the transition):
+- tap_to_user: card on the reader -> VerifyUserState returns
+- tap_to_reservation: card on the reader -> InReservationState entered
+- hold_to_extend: extend button down -> back in InReservationState
+- hold_to_stop: stop button down -> WaitingForCardState entered
+The hold steps include button_service's HOLD_DURATION.
+
+After the sessions the box idles in WaitingForCardState for --idle seconds and
+the wakeups per second of the timer service and of the whole process (voluntary
+context switches, including the stand-in backend and fake hardware) are reported.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from simulation.environment import SimConfig, install
+from simulation.backend import StandInBackend
+from simulation.fake_gspread import FakeSheetsService
+from simulation.faults import Scenario
+
+STEPS = ("tap_to_user", "tap_to_reservation", "hold_to_extend", "hold_to_stop")
+QUANTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+SETTLE = 0.3  # Seconds between steps, so each one starts from a quiet state
+REGRESSION_THRESHOLD = 0.10  # Relative p95 change reported as a regression
+STEP_TIMEOUT = 90  # Seconds a step may take before it counts as failed
+STOP_ATTEMPTS = 3  # Stop holds tried before the session is left to time out
+# Transitions that end a hold: the expected one or a fallback
+STEP_TARGETS = ("InReservationState", "WaitingForCardState", "TimeOutState")
+DEFAULT_SCENARIO = Scenario.from_dict({"default": {"latency": {"kind": "fixed", "mean": 0.05}}})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Linear interpolation between closest ranks."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    summary = {"count": len(values), "mean": sum(values) / len(values), "max": max(values)}
+    for name, q in QUANTILES:
+        summary[name] = percentile(values, q)
+    return summary
+
+
+def card_uid(number: int) -> list[int]:
+    """4-byte UID of the number-th simulated card."""
+    return [0x5A, (number >> 16) & 0xFF, (number >> 8) & 0xFF, number & 0xFF]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def hold(box, button, target: str, source: str) -> Optional[float]:
+    """Holds a button until the expected transition; returns the latency or None."""
+    await asyncio.sleep(SETTLE)
+    started = time.monotonic()
+    button.press()
+    try:
+        event = await box.wait_for(STEP_TARGETS, since=started, timeout=STEP_TIMEOUT)
+    except TimeoutError:
+        return None  # Press ignored (e.g. offline) or the state hung
+    finally:
+        button.release()
+    if event.target != target or event.source != source:
+        return None
+    return event.at - started
+
+
+async def iteration(box, number: int, samples: dict[str, list[float]], failures: dict[str, int]):
+    """One session: tap, extend, stop. Failed steps are counted, not measured."""
+    started = time.monotonic()
+    box.tap(card_uid(number))
+    try:
+        outcome = await box.wait_for(
+            ("InReservationState", "WaitingForCardState"), since=started, timeout=STEP_TIMEOUT
+        )
+    finally:
+        box.remove_card()
+    user = box.find("VerifyReservationState", "VerifyUserState", since=started)
+    if user is not None:
+        samples["tap_to_user"].append(user.at - started)
+    if outcome.target != "InReservationState":
+        failures["tap"] += 1
+        return
+    samples["tap_to_reservation"].append(outcome.at - started)
+
+    latency = await hold(box, box.extend_btn, "InReservationState", "ExtendReservationState")
+    if latency is None:
+        failures["extend"] += 1
+    else:
+        samples["hold_to_extend"].append(latency)
+
+    for _ in range(STOP_ATTEMPTS):
+        if box.state != "InReservationState":
+            break
+        latency = await hold(box, box.stop_btn, "WaitingForCardState", "UserStopReservationState")
+        if latency is None:
+            failures["stop"] += 1
+        else:
+            samples["hold_to_stop"].append(latency)
+    with contextlib.suppress(TimeoutError):
+        await box.wait_for("WaitingForCardState", since=started, timeout=STEP_TIMEOUT)
+    await asyncio.sleep(SETTLE)
+
+
+async def measure_idle(seconds: float) -> Optional[dict]:
+    """Wakeups per second while the box waits for a card."""
+    from timer_service import context_switches, get_timers
+
+    if seconds <= 0:
+        return None
+    timers = get_timers()
+    wakeups, switches = timers.wakeups, context_switches()
+    started = time.monotonic()
+    await asyncio.sleep(seconds)
+    elapsed = time.monotonic() - started
+    after = context_switches()
+    return {
+        "timers": (timers.wakeups - wakeups) / elapsed,
+        "process": (after - switches) / elapsed if switches is not None and after is not None else None,
+    }
+
+
+async def run(args) -> dict:
+    from simulation.harness import VirtualBox
+
+    backend = args.backend
+    await backend.start()
+    box = VirtualBox("bench", "b8:27:eb:00:00:01", args.workdir / "box")
+    samples: dict[str, list[float]] = {step: [] for step in STEPS}
+    failures = {"tap": 0, "extend": 0, "stop": 0}
+    boot = {}
+    try:
+        started = time.monotonic()
+        await box.start()
+        boot["cold"] = time.monotonic() - started
+        for number in range(args.warmup + args.iterations):
+            card = number % args.cards
+            if number < args.warmup:
+                await iteration(box, card, {step: [] for step in STEPS}, dict(failures))
+            else:
+                await iteration(box, card, samples, failures)
+                print(f"[Bench] {number - args.warmup + 1}/{args.iterations} done")
+        lcd_cells = box.context.screens.lcd.lcd.cells_written
+        idle = await measure_idle(args.idle)
+        # Restart on the same files: instrument and sheet key come from the boot cache
+        await box.stop()
+        box = VirtualBox("bench", "b8:27:eb:00:00:01", args.workdir / "box")
+        started = time.monotonic()
+        await box.start()
+        boot["warm"] = time.monotonic() - started
+    finally:
+        await box.stop()
+        await backend.close()
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "params": {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "cards": args.cards,
+            "scenario": str(args.scenario) if args.scenario else None,
+        },
+        "results": {step: summarize(values) for step, values in samples.items()},
+        "failures": failures,
+        "boot_seconds": boot,
+        "backend_requests": backend.requests,
+        "backend_faults": backend.outcomes,
+        "lcd_cells": lcd_cells,
+        "idle_wakeups_per_second": idle,
+        "sheets": args.sheets.usage(),
+    }
+
+
+def report(result: dict, baseline: dict | None = None) -> bool:
+    """Prints the results (and the change against a baseline); True if no regression."""
+    ok = True
+    print(f"\n{'step':<20}" + "".join(f"{name:>10}" for name, _ in QUANTILES) + "     count")
+    for step in STEPS:
+        summary = result["results"][step]
+        if not summary["count"]:
+            print(f"{step:<20}   no samples")
+            continue
+        line = f"{step:<20}" + "".join(f"{summary[name] * 1000:>8.1f}ms" for name, _ in QUANTILES)
+        line += f"{summary['count']:>10}"
+        previous = (baseline or {}).get("results", {}).get(step)
+        if previous and previous.get("count"):
+            change = summary["p95"] / previous["p95"] - 1
+            line += f"   p95 {change:+.1%} vs {baseline.get('revision', '?')}"
+            if change > REGRESSION_THRESHOLD:
+                line += "  REGRESSION"
+                ok = False
+        print(line)
+    boot = result.get("boot_seconds", {})
+    print(
+        f"\ntime to ready: cold {boot.get('cold', 0) * 1000:.1f}ms, "
+        f"warm {boot.get('warm', 0) * 1000:.1f}ms"
+    )
+    print(f"failed steps: {result['failures']}")
+    print(f"backend requests: {result['backend_requests']}")
+    print(f"injected faults: {result['backend_faults']}")
+    print(f"sheets: {result['sheets']}, lcd cells: {result['lcd_cells']}")
+    idle = result.get("idle_wakeups_per_second")
+    if idle:
+        process = idle["process"]
+        print(
+            f"idle wakeups/s: timers {idle['timers']:.2f}, process "
+            + (f"{process:.1f}" if process is not None else "n/a")
+        )
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tap-to-session latency benchmark")
+    parser.add_argument("--iterations", type=int, default=20, help="Measured sessions")
+    parser.add_argument("--warmup", type=int, default=2, help="Sessions run before measuring")
+    parser.add_argument(
+        "--cards", type=int, default=5, help="Distinct cards (repeats hit the user cache)"
+    )
+    parser.add_argument(
+        "--scenario", type=Path, help="Latency/fault scenario JSON (default: 50 ms, no faults)"
+    )
+    parser.add_argument("--port", type=int, default=0, help="Stub backend port (0: any free)")
+    parser.add_argument("--save", type=Path, help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against")
+    parser.add_argument("--workdir", type=Path, help="Token/cache/journal files (default: temp)")
+    parser.add_argument(
+        "--idle", type=float, default=5.0, help="Seconds idle after the sessions (wakeup rate)"
+    )
+    args = parser.parse_args(argv)
+
+    args.port = args.port or free_port()
+    temp = None
+    if args.workdir is None:
+        temp = tempfile.TemporaryDirectory(prefix="bluebox-bench-")
+        args.workdir = Path(temp.name)
+
+    # The app reads config at import time, so the environment goes in first
+    scenario = Scenario.load(args.scenario) if args.scenario else DEFAULT_SCENARIO
+    args.backend = StandInBackend(port=args.port, scenario=scenario)
+    args.sheets = FakeSheetsService(
+        scenario.sheets, seed=scenario.seed, network=args.backend.network
+    )
+    install(SimConfig(args.backend.urls(), args.workdir / "box"), args.sheets)
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if temp is not None:
+            temp.cleanup()
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    ok = report(result, baseline)
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(result, indent=2))
+        print(f"Saved baseline to {args.save}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
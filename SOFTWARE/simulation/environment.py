@@ -0,0 +1,58 @@
+"""
+Installs the simulated environment: a generated `config` module and the
+fake RPLCD / gspread entry points. Call install() before importing any
+application module (they read config at import time).
+"""
+
+import sys
+import types
+from pathlib import Path
+
+from simulation.fake_gspread import FakeSheetsService
+from simulation.fake_hardware import FakeCharLCD
+
+
+class SimConfig:
+    """Config object in the shape of config/config.py, pointing at the stand-ins."""
+
+    def __init__(self, urls: dict[str, str], workdir: Path, **overrides):
+        workdir = Path(workdir)
+        workdir.mkdir(parents=True, exist_ok=True)
+        self.API_KEY = "simulation"
+        for name, url in urls.items():
+            setattr(self, name, url)
+        self.TOKEN_FILE = workdir / "token.json"
+        self.LOGGER_JSON = str(workdir / "service-account.json")
+        self.LOGGER_ACC = "logs-owner@example.com"
+        self.LOG_JOURNAL_DIR = workdir / "log_journal"
+        self.LOCAL_LOG_FILE = workdir / "log_local.txt"
+        self.BOOT_CACHE_FILE = workdir / "boot_cache.json"
+        self.USER_CACHE_FILE = workdir / "user_cache.json"
+        self.SESSION_DB = workdir / "sessions.db"
+        self.METRICS_PORT = None  # The harness reads the registry directly
+        self.METRICS_TEXTFILE = None
+        self.RFID_IRQ_PIN = None
+        for name, value in overrides.items():
+            setattr(self, name, value)
+
+
+def install(config: SimConfig, sheets: FakeSheetsService) -> SimConfig:
+    """Makes `from config import config`, RPLCD and gspread resolve to the fakes."""
+    if "api_client" in sys.modules:
+        raise RuntimeError("install() must run before the application is imported")
+
+    config_module = types.ModuleType("config")
+    config_module.config = config
+    sys.modules["config"] = config_module
+
+    rplcd = types.ModuleType("RPLCD")
+    rplcd_i2c = types.ModuleType("RPLCD.i2c")
+    rplcd_i2c.CharLCD = FakeCharLCD
+    rplcd.i2c = rplcd_i2c
+    sys.modules["RPLCD"] = rplcd
+    sys.modules["RPLCD.i2c"] = rplcd_i2c
+
+    import gspread
+
+    gspread.service_account = sheets.service_account
+    return config
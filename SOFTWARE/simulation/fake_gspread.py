@@ -0,0 +1,352 @@
+import copy
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import gspread
+import requests
+from gspread.exceptions import APIError
+
+from simulation.faults import DISCONNECT, ERROR, OK, SLOW_DRIP, TIMEOUT, FaultProfile, FlapState
+
+# Google Sheets API per-minute quotas of one service account (per user, per project)
+READ_QUOTA = 60
+WRITE_QUOTA = 60
+DEFAULT_ROWS = 1000  # Grid of a new worksheet, like Google's defaults
+DEFAULT_COLS = 26
+
+
+@dataclass
+class FakeCell:
+    row: int
+    col: int
+    value: Optional[str]
+
+
+class FakeWorksheet:
+    """In-memory worksheet with the calls Logger makes (cell, update, batch_update, ...)."""
+
+    def __init__(
+        self,
+        spreadsheet: "FakeSpreadsheet",
+        sheet_id: int = 0,
+        title: str = "Sheet1",
+        rows: int = DEFAULT_ROWS,
+        cols: int = DEFAULT_COLS,
+    ):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self.rows: list[list[str]] = []
+        self.notes: dict[tuple[int, int], str] = {}
+
+    def _set(self, row: int, col: int, value: str):
+        if row > self.row_count or col > self.col_count:
+            raise APIError(
+                _ErrorResponse(400, f"Range ({row},{col}) exceeds grid limits of {self.title}")
+            )
+        while len(self.rows) < row:
+            self.rows.append([])
+        line = self.rows[row - 1]
+        while len(line) < col:
+            line.append("")
+        line[col - 1] = value
+
+    def cell(self, row: int, col: int) -> FakeCell:
+        self.spreadsheet.service.call("read")
+        line = self.rows[row - 1] if row <= len(self.rows) else []
+        value = line[col - 1] if col <= len(line) else None
+        return FakeCell(row, col, value or None)
+
+    def col_values(self, col: int) -> list[str]:
+        """Values of a column up to its last non-empty cell."""
+        self.spreadsheet.service.call("read")
+        values = [line[col - 1] if col <= len(line) else "" for line in self.rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def update(self, range_name: str, values: list[list], **kwargs):
+        self.spreadsheet.service.call("write")
+        start = range_name.split(":")[0]
+        row, col = gspread.utils.a1_to_rowcol(start)
+        with self.spreadsheet.service.lock:
+            for r, line in enumerate(values):
+                for c, value in enumerate(line):
+                    self._set(row + r, col + c, str(value))
+
+    def update_title(self, title: str):
+        self.spreadsheet.service.call("write")
+        with self.spreadsheet.service.lock:
+            if any(ws.title == title for ws in self.spreadsheet._worksheets if ws is not self):
+                raise APIError(_ErrorResponse(400, f"A sheet with the name {title} already exists"))
+            self.title = title
+
+    def resize(self, rows: Optional[int] = None, cols: Optional[int] = None):
+        self.spreadsheet.service.call("write")
+        with self.spreadsheet.service.lock:
+            if rows is not None:
+                self.row_count = rows
+                del self.rows[rows:]
+            if cols is not None:
+                self.col_count = cols
+
+    def copy_to(self, destination_spreadsheet_id: str) -> dict:
+        service = self.spreadsheet.service
+        service.call("write")
+        with service.lock:
+            destination = next(
+                s for s in service.spreadsheets.values() if s.id == destination_spreadsheet_id
+            )
+            copy = destination._add(f"Copy of {self.title}", self.row_count, self.col_count)
+            copy.rows = [list(line) for line in self.rows]
+            copy.notes = dict(self.notes)
+        return {"sheetId": copy.id, "title": copy.title}
+
+    def _staged(self) -> "FakeWorksheet":
+        """Copy of the grid that batch_update changes before committing."""
+        staged = copy.copy(self)
+        staged.rows = [list(line) for line in self.rows]
+        staged.notes = dict(self.notes)
+        return staged
+
+    def _insert_rows(self, start: int, end: int):
+        self.row_count += end - start
+        for _ in range(end - start):
+            self.rows.insert(start, [])
+        self.notes = {
+            (row + (end - start) if row > start else row, col): note
+            for (row, col), note in self.notes.items()
+        }
+
+    def _update_cells(self, request: dict):
+        grid = request["range"]
+        row = grid["startRowIndex"] + 1
+        col = grid["startColumnIndex"] + 1
+        for r, line in enumerate(request["rows"]):
+            for c, cell in enumerate(line["values"]):
+                value = cell.get("userEnteredValue", {}).get("stringValue")
+                if value is not None:
+                    self._set(row + r, col + c, value)
+                if "note" in cell:
+                    self.notes[(row + r, col + c)] = cell["note"]
+
+
+class FakeSpreadsheet:
+    def __init__(self, service: "FakeSheetsService", title: str):
+        self.service = service
+        self.title = title
+        self.id = uuid.uuid4().hex
+        self._worksheets: list[FakeWorksheet] = []
+        self._add("Sheet1", DEFAULT_ROWS, DEFAULT_COLS)
+        self.shared_with: list[str] = []
+
+    @property
+    def sheet1(self) -> FakeWorksheet:
+        return self._worksheets[0]
+
+    def _add(self, title: str, rows: int, cols: int, index: Optional[int] = None) -> FakeWorksheet:
+        sheet_id = max((ws.id for ws in self._worksheets), default=-1) + 1
+        worksheet = FakeWorksheet(self, sheet_id, title, rows, cols)
+        self._worksheets.insert(len(self._worksheets) if index is None else index, worksheet)
+        return worksheet
+
+    def worksheets(self) -> list[FakeWorksheet]:
+        self.service.call("read")
+        with self.service.lock:
+            return list(self._worksheets)
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.service.call("read")
+        with self.service.lock:
+            for worksheet in self._worksheets:
+                if worksheet.title == title:
+                    return worksheet
+        raise gspread.WorksheetNotFound(title)
+
+    def get_worksheet_by_id(self, sheet_id: int) -> FakeWorksheet:
+        self.service.call("read")
+        with self.service.lock:
+            for worksheet in self._worksheets:
+                if worksheet.id == sheet_id:
+                    return worksheet
+        raise gspread.WorksheetNotFound(sheet_id)
+
+    def add_worksheet(self, title: str, rows: int, cols: int, index: Optional[int] = None):
+        self.service.call("write")
+        with self.service.lock:
+            if any(ws.title == title for ws in self._worksheets):
+                raise APIError(_ErrorResponse(400, f"A sheet with the name {title} already exists"))
+            return self._add(title, rows, cols, index)
+
+    def del_worksheet(self, worksheet: FakeWorksheet):
+        self.service.call("write")
+        with self.service.lock:
+            self._worksheets.remove(worksheet)
+
+    def share(self, email: str, perm_type: str = "user", role: str = "writer", notify: bool = True):
+        self.service.call("write")
+        self.shared_with.append(email)
+
+    def batch_update(self, body: dict) -> dict:
+        self.service.call("write")
+        with self.service.lock:
+            sheets = {ws.id: ws for ws in self._worksheets}
+            # All requests or none, like the real API: work on copies
+            staged = {sheet_id: ws._staged() for sheet_id, ws in sheets.items()}
+            for request in body["requests"]:
+                if "insertDimension" in request:
+                    grid = request["insertDimension"]["range"]
+                    staged[grid["sheetId"]]._insert_rows(grid["startIndex"], grid["endIndex"])
+                elif "appendDimension" in request:
+                    append = request["appendDimension"]
+                    staged[append["sheetId"]].row_count += append["length"]
+                elif "updateCells" in request:
+                    update = request["updateCells"]
+                    staged[update["range"]["sheetId"]]._update_cells(update)
+            for sheet_id, worksheet in sheets.items():
+                worksheet.rows = staged[sheet_id].rows
+                worksheet.notes = staged[sheet_id].notes
+                worksheet.row_count = staged[sheet_id].row_count
+        return {"replies": [{} for _ in body["requests"]]}
+
+    def values_batch_update(self, body: dict) -> dict:
+        """Values to A1 ranges; USER_ENTERED parsing is not simulated (kept as text)."""
+        self.service.call("write")
+        with self.service.lock:
+            staged = {ws.title: ws._staged() for ws in self._worksheets}
+            for entry in body["data"]:
+                title, cell = entry["range"].rsplit("!", 1)
+                title = title[1:-1].replace("''", "'") if title.startswith("'") else title
+                row, col = gspread.utils.a1_to_rowcol(cell)
+                for r, line in enumerate(entry["values"]):
+                    for c, value in enumerate(line):
+                        staged[title]._set(row + r, col + c, str(value))
+            for worksheet in self._worksheets:
+                worksheet.rows = staged[worksheet.title].rows
+        return {"totalUpdatedCells": sum(len(entry["values"]) for entry in body["data"])}
+
+
+class FakeClient:
+    def __init__(self, service: "FakeSheetsService"):
+        self.service = service
+
+    def open(self, title: str) -> FakeSpreadsheet:
+        self.service.call("read")
+        with self.service.lock:
+            spreadsheet = self.service.spreadsheets.get(title)
+        if spreadsheet is None:
+            raise gspread.SpreadsheetNotFound(title)
+        return spreadsheet
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        self.service.call("read")
+        with self.service.lock:
+            for spreadsheet in self.service.spreadsheets.values():
+                if spreadsheet.id == key:
+                    return spreadsheet
+        raise gspread.SpreadsheetNotFound(key)
+
+    def create(self, title: str) -> FakeSpreadsheet:
+        self.service.call("write")
+        with self.service.lock:
+            spreadsheet = self.service.spreadsheets.setdefault(
+                title, FakeSpreadsheet(self.service, title)
+            )
+        return spreadsheet
+
+
+class _ErrorResponse:
+    """Just enough of a requests.Response for gspread's APIError."""
+
+    def __init__(self, code: int, message: str):
+        self.status_code = code
+        self.text = message
+        self._error = {"code": code, "message": message, "status": "SIMULATED"}
+
+    def json(self) -> dict:
+        return {"error": self._error}
+
+
+class FakeSheetsService:
+    """
+    Google Sheets stand-in shared by all loggers of a simulation.
+    - service_account() replaces gspread.service_account
+    - Requests are counted per kind (read/write) and checked against the
+      per-minute quotas of the (single, shared) service account: over quota
+      they fail with APIError 429 like the real API
+    - Latency, errors, hangs and disconnects follow a FaultProfile, and the
+      network flaps of the backend (if given) cut Sheets off too
+    """
+
+    def __init__(
+        self,
+        profile: Optional[FaultProfile] = None,
+        seed: int = 1,
+        network: Optional[FlapState] = None,
+        read_quota: Optional[int] = READ_QUOTA,  # None: count, but never throttle
+        write_quota: Optional[int] = WRITE_QUOTA,
+    ):
+        self.profile = profile if profile is not None else FaultProfile()
+        self.network = network
+        self.quota = {"read": read_quota, "write": write_quota}
+        self.spreadsheets: dict[str, FakeSpreadsheet] = {}
+        self.calls = {"read": 0, "write": 0}
+        self.throttled = {"read": 0, "write": 0}
+        self.faults: dict[str, int] = {}
+        self.peak_per_minute = {"read": 0, "write": 0}
+        self.lock = threading.Lock()
+        self._rng = random.Random(f"{seed}:sheets")
+        self._recent = {"read": deque(), "write": deque()}  # Request times, last minute
+        self.history: list[tuple[float, str]] = []  # (wall clock, kind) of every request
+
+    def service_account(self, filename=None, **kwargs) -> FakeClient:
+        return FakeClient(self)
+
+    def call(self, kind: str):
+        """Accounts one API request (runs in the Sheets executor thread)."""
+        with self.lock:
+            now = time.monotonic()
+            recent = self._recent[kind]
+            while recent and recent[0] <= now - 60:
+                recent.popleft()
+            quota = self.quota[kind]
+            if quota is not None and len(recent) >= quota:
+                self.throttled[kind] += 1
+                raise APIError(_ErrorResponse(429, f"Quota exceeded for {kind} requests per minute"))
+            recent.append(now)
+            self.history.append((time.time(), kind))
+            self.calls[kind] += 1
+            self.peak_per_minute[kind] = max(self.peak_per_minute[kind], len(recent))
+            outcome = self.profile.draw(self._rng)
+            latency = self.profile.latency.sample(self._rng)
+            if outcome != OK:
+                self.faults[outcome] = self.faults.get(outcome, 0) + 1
+
+        if self.network is not None and self.network.is_down():
+            raise requests.exceptions.ConnectionError("Simulated network flap")
+        time.sleep(latency)
+        if outcome == ERROR:
+            raise APIError(_ErrorResponse(self.profile.error_status, "Simulated backend error"))
+        if outcome == TIMEOUT:
+            time.sleep(self.profile.hang)
+            raise requests.exceptions.ReadTimeout("Simulated timeout")
+        if outcome == DISCONNECT:
+            raise requests.exceptions.ConnectionError("Simulated disconnect")
+        if outcome == SLOW_DRIP:
+            time.sleep(self.profile.drip_interval * 10)  # Slow body, but it arrives
+
+    def usage(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "throttled": dict(self.throttled),
+            "peak_per_minute": dict(self.peak_per_minute),
+            "quota_per_minute": dict(self.quota),
+            "faults": dict(self.faults),
+        }
@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class FakeCharLCD:
+    """
+    Stands in for RPLCD.i2c.CharLCD.
+    - Keeps the text on the glass, so a harness can read the screen
+    - Sleeps per written cell to approximate the I2C bus time of a real backpack
+    """
+
+    def __init__(
+        self,
+        i2c_expander: str = "PCF8574",
+        address: int = 0x27,
+        cols: int = 20,
+        rows: int = 4,
+        cell_delay: float = 0.0004,  # ~4 nibble writes at 100 kHz per character
+        **kwargs,
+    ):
+        self.cols = cols
+        self.rows = rows
+        self.cell_delay = cell_delay
+        self.backlight_enabled = True
+        self.cursor_pos = (0, 0)
+        self.cells_written = 0
+        self.clears = 0
+        self._lines = [" " * cols for _ in range(rows)]
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._lines = [" " * self.cols for _ in range(self.rows)]
+            self.cursor_pos = (0, 0)
+            self.clears += 1
+        time.sleep(self.cell_delay * 6)  # HD44780 clear takes ~1.5 ms
+
+    def write_string(self, text: str):
+        with self._lock:
+            row, col = self.cursor_pos
+            for char in text:
+                if char == "\n":
+                    row, col = row + 1, 0
+                    continue
+                if row < self.rows and col < self.cols:
+                    line = self._lines[row]
+                    self._lines[row] = line[:col] + char + line[col + 1 :]
+                col += 1
+            self.cursor_pos = (row, col)
+            self.cells_written += len(text)
+        time.sleep(self.cell_delay * len(text))
+
+    def text(self) -> list[str]:
+        """Returns the current content of the glass, one string per row."""
+        with self._lock:
+            return list(self._lines)
+
+    def close(self, clear: bool = False):
+        if clear:
+            self.clear()
+
+
+class FakeButton:
+    """
+    Stands in for gpiozero.Button as used by button_service.
+    press() and release() are called by the harness; is_held turns True
+    once the button has been down for hold_time, like gpiozero's HoldMixin.
+    """
+
+    def __init__(self, pin=None, hold_time: float = 1.0, bounce_time: Optional[float] = None, **kwargs):
+        self.pin = pin
+        self.hold_time = hold_time
+        self.bounce_time = bounce_time
+        self.when_pressed: Optional[Callable[[], None]] = None
+        self.when_released: Optional[Callable[[], None]] = None
+        self.when_held: Optional[Callable[[], None]] = None
+        self._pressed_at: Optional[float] = None
+        self.closed = False
+
+    @property
+    def is_pressed(self) -> bool:
+        return self._pressed_at is not None
+
+    @property
+    def is_held(self) -> bool:
+        return (
+            self._pressed_at is not None
+            and time.monotonic() - self._pressed_at >= self.hold_time
+        )
+
+    @property
+    def held_time(self) -> Optional[float]:
+        if self._pressed_at is None:
+            return None
+        return time.monotonic() - self._pressed_at
+
+    def press(self):
+        if self._pressed_at is not None:
+            return
+        self._pressed_at = time.monotonic()
+        if self.when_pressed is not None:
+            self.when_pressed()
+
+    def release(self):
+        if self._pressed_at is None:
+            return
+        self._pressed_at = None
+        if self.when_released is not None:
+            self.when_released()
+
+    def close(self):
+        self.when_pressed = None
+        self.when_released = None
+        self.when_held = None
+        self.closed = True
@@ -0,0 +1,116 @@
+import threading
+from typing import Optional
+
+import mfrc522_async as chip
+
+
+class FakeIRQPin:
+    """Stands in for the gpiozero input device on the MFRC522 IRQ pin."""
+
+    def __init__(self):
+        self.when_activated = None
+
+    def fire(self):
+        if self.when_activated is not None:
+            self.when_activated()
+
+    def close(self):
+        self.when_activated = None
+
+
+class FakeMFRC522:
+    """
+    Fake MFRC522 behind a spidev-like xfer2() interface.
+    - Keeps a register file and FIFO, and answers REQA / anticollision
+      for the card put on the antenna with present()
+    - Raises the IRQ pin (if given) when a transceive completes
+    - Counts SPI transfers so tests can check how chatty the driver is
+    """
+
+    def __init__(self, irq: Optional[FakeIRQPin] = None, version: int = 0x92):
+        self.irq = irq
+        self.registers = [0] * 64
+        self.registers[chip.VERSION_REG] = version
+        self.fifo: list[int] = []
+        self.uid: Optional[list[int]] = None
+        self.transfers = 0
+        self.requests = 0  # REQA commands seen
+        self._lock = threading.Lock()
+
+    def present(self, uid4: list[int]):
+        """Puts a card with a 4-byte UID on the antenna."""
+        bcc = uid4[0] ^ uid4[1] ^ uid4[2] ^ uid4[3]
+        self.uid = list(uid4) + [bcc]
+
+    def remove(self):
+        self.uid = None
+
+    def close(self):
+        pass
+
+    def xfer2(self, data: list[int]) -> list[int]:
+        with self._lock:
+            self.transfers += 1
+            first = data[0]
+            reg = (first >> 1) & 0x3F
+            if first & 0x80:
+                # Read: each byte clocks out the register addressed by the previous one
+                result = [0]
+                for byte in data[1:]:
+                    result.append(self._read_reg(reg))
+                    reg = (byte >> 1) & 0x3F
+                return result
+            for value in data[1:]:
+                self._write_reg(reg, value)
+            return [0] * len(data)
+
+    def _read_reg(self, reg: int) -> int:
+        if reg == chip.FIFO_DATA_REG:
+            return self.fifo.pop(0) if self.fifo else 0
+        if reg == chip.FIFO_LEVEL_REG:
+            return len(self.fifo)
+        return self.registers[reg]
+
+    def _write_reg(self, reg: int, value: int):
+        if reg == chip.FIFO_DATA_REG:
+            self.fifo.append(value)
+        elif reg == chip.FIFO_LEVEL_REG:
+            if value & 0x80:
+                self.fifo.clear()
+        elif reg == chip.COM_IRQ_REG:
+            if value & 0x80:
+                self.registers[reg] |= value & 0x7F
+            else:
+                self.registers[reg] &= ~value & 0x7F
+        elif reg == chip.COMMAND_REG and value == chip.PCD_RESETPHASE:
+            version = self.registers[chip.VERSION_REG]
+            self.registers = [0] * 64
+            self.registers[chip.VERSION_REG] = version
+            self.fifo.clear()
+        else:
+            self.registers[reg] = value
+            if (
+                reg == chip.BIT_FRAMING_REG
+                and value & 0x80
+                and self.registers[chip.COMMAND_REG] == chip.PCD_TRANSCEIVE
+            ):
+                self._transceive(value & 0x07)
+
+    def _transceive(self, tx_last_bits: int):
+        sent, self.fifo = self.fifo, []
+        response = None
+        if sent == [chip.PICC_REQIDL] and tx_last_bits == 7:
+            self.requests += 1
+            if self.uid is not None:
+                response = [0x04, 0x00]  # ATQA of a MIFARE Classic 1K
+        elif sent == [chip.PICC_ANTICOLL, 0x20] and self.uid is not None:
+            response = list(self.uid)
+
+        self.registers[chip.CONTROL_REG] = 0
+        if response is None:
+            self.registers[chip.COM_IRQ_REG] |= chip.IRQ_TIMER
+        else:
+            self.fifo = response
+            self.registers[chip.COM_IRQ_REG] |= chip.IRQ_RX
+        if self.irq is not None:
+            self.irq.fire()
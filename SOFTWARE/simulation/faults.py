@@ -0,0 +1,167 @@
+"""
+Latency and fault models shared by the backend and Sheets stand-ins.
+All draws come from random streams derived from the scenario seed, so a run
+can be repeated.
+"""
+
+import bisect
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Optional
+
+# Outcomes of FaultProfile.draw()
+OK = "ok"
+ERROR = "error"  # Answer with error_status
+TIMEOUT = "timeout"  # Hold the request for hang seconds (the client gives up first)
+SLOW_DRIP = "slow_drip"  # Send the body a few bytes at a time
+DISCONNECT = "disconnect"  # Drop the connection without an answer
+
+
+@dataclass
+class Latency:
+    """
+    Response latency distribution in seconds.
+    kind: fixed (mean), uniform (low..high), exponential (mean),
+    lognormal (median and p99, the usual way backend latency is quoted)
+    """
+
+    kind: str = "fixed"
+    mean: float = 0.0
+    low: float = 0.0
+    high: float = 0.0
+    median: float = 0.05
+    p99: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.mean
+        if self.kind == "uniform":
+            return rng.uniform(self.low, self.high)
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.mean) if self.mean > 0 else 0.0
+        if self.kind == "lognormal":
+            mu = math.log(self.median)
+            sigma = math.log(self.p99 / self.median) / 2.326  # z of the 99th percentile
+            return rng.lognormvariate(mu, sigma)
+        raise ValueError(f"Unknown latency kind: {self.kind}")
+
+
+@dataclass
+class FaultProfile:
+    """How one endpoint (or the Sheets API) misbehaves; rates are probabilities."""
+
+    latency: Latency = field(default_factory=Latency)
+    error_rate: float = 0.0
+    error_status: int = 503
+    timeout_rate: float = 0.0
+    hang: float = 60.0  # Seconds a timed-out request is held
+    slow_drip_rate: float = 0.0
+    drip_interval: float = 0.5  # Seconds between dripped chunks
+    drip_chunk: int = 8  # Bytes per dripped chunk
+    disconnect_rate: float = 0.0
+
+    def draw(self, rng: random.Random) -> str:
+        """Picks the outcome of one request."""
+        roll = rng.random()
+        for outcome, rate in (
+            (ERROR, self.error_rate),
+            (TIMEOUT, self.timeout_rate),
+            (SLOW_DRIP, self.slow_drip_rate),
+            (DISCONNECT, self.disconnect_rate),
+        ):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return OK
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FaultProfile":
+        data = dict(data)
+        latency = Latency(**data.pop("latency", {}))
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown fault settings: {sorted(unknown)}")
+        return cls(latency=latency, **data)
+
+
+@dataclass
+class FlapSchedule:
+    """
+    Network flaps: the stand-in is reachable for `up` seconds, then drops
+    every connection for `down` seconds, repeatedly (jittered by `jitter`).
+    """
+
+    up: float = 0.0  # 0 disables flapping
+    down: float = 0.0
+    jitter: float = 0.0  # Fraction of each period added or removed at random
+
+    def timeline(self, rng: random.Random, start: float, length: float) -> list[tuple[float, float]]:
+        """Down windows (start, end) on the monotonic clock for the next `length` seconds."""
+        windows = []
+        if self.up <= 0 or self.down <= 0:
+            return windows
+        now = start
+        while now < start + length:
+            now += self.up * (1 + rng.uniform(-self.jitter, self.jitter))
+            end = now + self.down * (1 + rng.uniform(-self.jitter, self.jitter))
+            windows.append((now, end))
+            now = end
+        return windows
+
+
+@dataclass
+class Scenario:
+    """A complete fault setup: per-endpoint profiles, flaps and Sheets behaviour."""
+
+    seed: int = 1
+    default: FaultProfile = field(default_factory=FaultProfile)
+    endpoints: dict[str, FaultProfile] = field(default_factory=dict)  # Keyed by config name
+    flap: FlapSchedule = field(default_factory=FlapSchedule)
+    sheets: FaultProfile = field(default_factory=FaultProfile)
+
+    def profile(self, endpoint: str) -> FaultProfile:
+        return self.endpoints.get(endpoint, self.default)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Scenario":
+        return cls(
+            seed=data.get("seed", 1),
+            default=FaultProfile.from_dict(data.get("default", {})),
+            endpoints={
+                name: FaultProfile.from_dict(profile)
+                for name, profile in data.get("endpoints", {}).items()
+            },
+            flap=FlapSchedule(**data.get("flap", {})),
+            sheets=FaultProfile.from_dict(data.get("sheets", {})),
+        )
+
+    @classmethod
+    def load(cls, path: Optional[Path]) -> "Scenario":
+        """Reads a scenario JSON file; no path means a well-behaved backend."""
+        if path is None:
+            return cls()
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+
+class FlapState:
+    """Answers 'is the network down right now?' for a flap schedule (thread-safe)."""
+
+    HORIZON = 24 * 60 * 60  # Seconds of schedule drawn up front
+
+    def __init__(self, schedule: FlapSchedule, rng: random.Random):
+        windows = schedule.timeline(rng, time.monotonic(), self.HORIZON)
+        self._starts = [start for start, _ in windows]
+        self._ends = [end for _, end in windows]
+        self.forced_down = False  # Set by a harness to cut the network on demand
+
+    def is_down(self, now: Optional[float] = None) -> bool:
+        if self.forced_down:
+            return True
+        now = time.monotonic() if now is None else now
+        index = bisect.bisect_right(self._ends, now)
+        return index < len(self._starts) and self._starts[index] <= now
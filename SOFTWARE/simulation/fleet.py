@@ -0,0 +1,460 @@
+"""
+Fleet simulator: N virtual BlueBoxes, each with its own AppContext and fake
+hardware, driven by random tap/session patterns against one backend and one
+shared Google account. Reports aggregate request rates, client-side backend
+latency percentiles and Sheets quota use.
+
+    cd SOFTWARE
+    python -m simulation.fleet --boxes 50 --duration 300
+    python -m simulation.fleet --boxes 400 --processes 8 --duration 600 --save fleet.json
+    python -m simulation.fleet --boxes 20 --target https://staging.example.com
+
+With --processes 1 all boxes share one event loop (and the executor pools,
+sized up with the fleet). With more processes the boxes are split between
+them; each worker runs its own loop, and Sheets demand is merged in the parent
+(quota is then reported, not enforced).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from simulation.backend import ENDPOINTS, StandInBackend
+from simulation.bench import STEP_TARGETS, STEP_TIMEOUT, card_uid, free_port, git_revision, summarize
+from simulation.environment import SimConfig, install
+from simulation.fake_gspread import READ_QUOTA, WRITE_QUOTA, FakeSheetsService
+from simulation.faults import Scenario
+
+STEPS = ("tap_to_reservation", "hold_to_extend", "hold_to_stop")
+CARDS_PER_BOX = 20  # Regular users of one instrument
+THREAD_CAP = 64  # Upper bound for the scaled executor pools of one process
+
+
+@dataclass
+class Pattern:
+    """How users behave at an instrument (all times in seconds, exponential)."""
+
+    idle: float = 60.0  # Mean time between sessions
+    session: float = 120.0  # Mean time from tap to stop
+    extend_probability: float = 0.3  # Sessions that extend once
+
+
+def scale_executors(boxes: int, cap: int = THREAD_CAP):
+    """
+    Sizes the shared executor pools for a fleet in one process: real devices
+    have a pool each, here all boxes of the process share one per subsystem.
+    Must run before the first executor is used.
+    """
+    import executors
+
+    for name, (workers, queue, stuck_after) in executors.EXECUTOR_LIMITS.items():
+        executors.EXECUTOR_LIMITS[name] = (min(workers * boxes, cap), queue * boxes, stuck_after)
+
+
+def endpoint_of(method: str, path: str) -> str:
+    """Config name of the endpoint a request went to (probe for connectivity checks)."""
+    for name, (endpoint_method, endpoint_path) in ENDPOINTS.items():
+        if method != endpoint_method:
+            continue
+        if "{" in endpoint_path:
+            prefix = endpoint_path.split("{")[0]
+            if path.startswith(prefix) and len(path) > len(prefix):
+                return name
+        elif path == endpoint_path:
+            return name
+    return "probe"
+
+
+class RequestLog:
+    """Client-side timing of every backend request, via an aiohttp TraceConfig."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+
+    def trace_config(self):
+        import aiohttp
+
+        config = aiohttp.TraceConfig()
+        config.on_request_start.append(self._start)
+        config.on_request_end.append(self._end)
+        config.on_request_exception.append(self._exception)
+        return config
+
+    async def _start(self, session, ctx, params):
+        ctx.started = time.monotonic()
+
+    async def _end(self, session, ctx, params):
+        self._record(params.method, params.url.path, str(params.response.status), ctx.started)
+
+    async def _exception(self, session, ctx, params):
+        self._record(params.method, params.url.path, type(params.exception).__name__, ctx.started)
+
+    def _record(self, method: str, path: str, status: str, started: float):
+        endpoint = endpoint_of(method, path)
+        self.samples.setdefault(endpoint, []).append(time.monotonic() - started)
+        statuses = self.statuses.setdefault(endpoint, {})
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+async def press_and_wait(box, button, target: str, source: str) -> Optional[float]:
+    """Holds a button until the state machine reacts; the latency if it was the expected step."""
+    started = time.monotonic()
+    button.press()
+    try:
+        event = await box.wait_for(STEP_TARGETS, since=started, timeout=STEP_TIMEOUT)
+    except TimeoutError:
+        return None
+    finally:
+        button.release()
+    if event.target != target or event.source != source:
+        return None
+    return event.at - started
+
+
+async def drive(box, number: int, pattern: Pattern, rng: random.Random, until: float, result: dict):
+    """Plays users at one box until the deadline: idle, tap, work (maybe extend), stop."""
+    samples, failures = result["samples"], result["failures"]
+    cards = [card_uid(number * CARDS_PER_BOX + i) for i in range(CARDS_PER_BOX)]
+    while True:
+        idle = rng.expovariate(1 / pattern.idle)
+        if time.monotonic() + idle >= until:
+            return
+        await asyncio.sleep(idle)
+
+        started = time.monotonic()
+        box.tap(rng.choice(cards))
+        try:
+            outcome = await box.wait_for(
+                ("InReservationState", "WaitingForCardState"), since=started, timeout=STEP_TIMEOUT
+            )
+        except TimeoutError:
+            failures["tap"] += 1
+            continue
+        finally:
+            box.remove_card()
+        if outcome.target != "InReservationState":
+            failures["tap"] += 1
+            continue
+        samples["tap_to_reservation"].append(outcome.at - started)
+        result["sessions"] += 1
+
+        session = rng.expovariate(1 / pattern.session)
+        if rng.random() < pattern.extend_probability:
+            await asyncio.sleep(session * rng.random())
+            latency = await press_and_wait(
+                box, box.extend_btn, "InReservationState", "ExtendReservationState"
+            )
+            if latency is None:
+                failures["extend"] += 1
+            else:
+                samples["hold_to_extend"].append(latency)
+        await asyncio.sleep(max(started + session - time.monotonic(), 0))
+
+        for _ in range(3):
+            if box.state != "InReservationState":
+                break
+            latency = await press_and_wait(
+                box, box.stop_btn, "WaitingForCardState", "UserStopReservationState"
+            )
+            if latency is None:
+                failures["stop"] += 1
+            else:
+                samples["hold_to_stop"].append(latency)
+        with contextlib.suppress(TimeoutError):
+            await box.wait_for("WaitingForCardState", since=started, timeout=STEP_TIMEOUT)
+
+
+async def run_boxes(spec: dict, sheets: FakeSheetsService) -> dict:
+    """Runs boxes spec['first'] .. spec['first'] + spec['count'] - 1 for spec['duration'] s."""
+    import aiohttp
+
+    from http_config import REQUEST_TIMEOUT
+    from simulation.harness import VirtualBox
+
+    pattern = Pattern(**spec["pattern"])
+    requests = RequestLog()
+    result = {
+        "samples": {step: [] for step in STEPS},
+        "failures": {"start": 0, "tap": 0, "extend": 0, "stop": 0},
+        "sessions": 0,
+    }
+    boxes, sessions = [], []
+    for number in range(spec["first"], spec["first"] + spec["count"]):
+        mac = "b8:27:eb:{:02x}:{:02x}:{:02x}".format(
+            (number >> 16) & 0xFF, (number >> 8) & 0xFF, number & 0xFF
+        )
+        ip = f"10.{(number >> 16) & 0xFF}.{(number >> 8) & 0xFF}.{number & 0xFF}"
+        boxes.append(VirtualBox(f"box-{number}", mac, Path(spec["workdir"]) / f"box-{number}", ip=ip))
+        sessions.append(
+            aiohttp.ClientSession(timeout=REQUEST_TIMEOUT, trace_configs=[requests.trace_config()])
+        )
+
+    async def start(index: int, box) -> bool:
+        await asyncio.sleep(spec["ramp"] * index / max(len(boxes), 1))
+        try:
+            await box.start(sessions[index])
+            return True
+        except TimeoutError:
+            result["failures"]["start"] += 1
+            return False
+
+    started_at = time.time()
+    try:
+        started = await asyncio.gather(*(start(i, box) for i, box in enumerate(boxes)))
+        until = time.monotonic() + spec["duration"]
+        print(f"[Fleet] {sum(started)}/{len(boxes)} boxes up, driving for {spec['duration']} s")
+        await asyncio.gather(
+            *(
+                drive(box, spec["first"] + i, pattern, random.Random(f"{spec['seed']}:{i + spec['first']}"), until, result)
+                for i, box in enumerate(boxes)
+                if started[i]
+            )
+        )
+    finally:
+        await asyncio.gather(*(box.stop() for box in boxes), return_exceptions=True)
+        for session in sessions:
+            await session.close()
+    result["window"] = (started_at, time.time())
+    result["requests"] = requests.samples
+    result["statuses"] = requests.statuses
+    result["sheets"] = sheets.history
+    result["sheets_throttled"] = sheets.throttled
+    return result
+
+
+def _worker(spec: dict) -> dict:
+    """Process-pool entry point: installs the simulated environment, runs its boxes."""
+    scenario = Scenario.from_dict(spec["scenario"])
+    sheets = FakeSheetsService(
+        scenario.sheets, seed=scenario.seed + spec["first"], read_quota=None, write_quota=None
+    )
+    install(SimConfig(spec["urls"], Path(spec["workdir"]) / "config"), sheets)
+    scale_executors(spec["count"])
+    return asyncio.run(run_boxes(spec, sheets))
+
+
+def peak_per_minute(times: list[float]) -> int:
+    """Most requests within any 60 s window."""
+    times = sorted(times)
+    peak, start = 0, 0
+    for end, at in enumerate(times):
+        while at - times[start] >= 60:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+def merge(results: list[dict]) -> dict:
+    merged = {
+        "samples": {step: [] for step in STEPS},
+        "failures": {},
+        "sessions": 0,
+        "requests": {},
+        "statuses": {},
+        "sheets": [],
+        "sheets_throttled": {"read": 0, "write": 0},
+    }
+    for result in results:
+        for step, values in result["samples"].items():
+            merged["samples"][step].extend(values)
+        for name, count in result["failures"].items():
+            merged["failures"][name] = merged["failures"].get(name, 0) + count
+        merged["sessions"] += result["sessions"]
+        for endpoint, values in result["requests"].items():
+            merged["requests"].setdefault(endpoint, []).extend(values)
+        for endpoint, statuses in result["statuses"].items():
+            target = merged["statuses"].setdefault(endpoint, {})
+            for status, count in statuses.items():
+                target[status] = target.get(status, 0) + count
+        merged["sheets"].extend(result["sheets"])
+        for kind, count in result["sheets_throttled"].items():
+            merged["sheets_throttled"][kind] += count
+    merged["window"] = (
+        min(result["window"][0] for result in results),
+        max(result["window"][1] for result in results),
+    )
+    return merged
+
+
+def summarize_fleet(merged: dict, args) -> dict:
+    seconds = max(merged["window"][1] - merged["window"][0], 1e-9)
+    sheets = {}
+    for kind, quota in (("read", READ_QUOTA), ("write", WRITE_QUOTA)):
+        times = [at for at, call_kind in merged["sheets"] if call_kind == kind]
+        peak = peak_per_minute(times)
+        sheets[kind] = {
+            "requests": len(times),
+            "per_minute": len(times) / seconds * 60,
+            "peak_per_minute": peak,
+            "quota_per_minute": quota,
+            "peak_quota_use": peak / quota,
+            "throttled": merged["sheets_throttled"][kind],
+        }
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "params": {
+            "boxes": args.boxes,
+            "processes": args.processes,
+            "duration": args.duration,
+            "ramp": args.ramp,
+            "target": args.target,
+            "scenario": str(args.scenario) if args.scenario else None,
+            "pattern": asdict(args.pattern),
+        },
+        "seconds": seconds,
+        "sessions": merged["sessions"],
+        "failures": merged["failures"],
+        "steps": {step: summarize(values) for step, values in merged["samples"].items()},
+        "endpoints": {
+            endpoint: {
+                "rate": len(values) / seconds,
+                "statuses": merged["statuses"].get(endpoint, {}),
+                **summarize(values),
+            }
+            for endpoint, values in sorted(merged["requests"].items())
+        },
+        "sheets": sheets,
+    }
+
+
+def report(summary: dict):
+    params = summary["params"]
+    print(
+        f"\n{params['boxes']} boxes, {summary['seconds']:.0f} s, "
+        f"{summary['sessions']} sessions, failures {summary['failures']}"
+    )
+    print(f"\n{'endpoint':<18}{'req/s':>8}{'p50':>10}{'p95':>10}{'p99':>10}  statuses")
+    for endpoint, stats in summary["endpoints"].items():
+        print(
+            f"{endpoint:<18}{stats['rate']:>8.2f}"
+            + "".join(f"{stats[q] * 1000:>8.0f}ms" for q in ("p50", "p95", "p99"))
+            + f"  {stats['statuses']}"
+        )
+    print(f"\n{'step':<20}{'p50':>10}{'p95':>10}{'p99':>10}{'count':>8}")
+    for step, stats in summary["steps"].items():
+        if not stats["count"]:
+            print(f"{step:<20}   no samples")
+            continue
+        print(
+            f"{step:<20}"
+            + "".join(f"{stats[q] * 1000:>8.0f}ms" for q in ("p50", "p95", "p99"))
+            + f"{stats['count']:>8}"
+        )
+    print("\nSheets (one shared service account):")
+    for kind, stats in summary["sheets"].items():
+        print(
+            f"  {kind:<6}{stats['per_minute']:>7.1f}/min, peak {stats['peak_per_minute']}/min "
+            f"= {stats['peak_quota_use']:.0%} of quota, throttled {stats['throttled']}"
+        )
+
+
+async def run(args) -> dict:
+    backend = None
+    if args.target is None:
+        backend = StandInBackend(
+            port=args.port, scenario=args.scenario_obj, reservation_minutes=args.reservation_minutes
+        )
+        urls = backend.urls()
+        await backend.start()
+    else:
+        urls = {
+            name: args.target.rstrip("/") + path for name, (_, path) in ENDPOINTS.items()
+        }
+
+    specs = []
+    per_process = -(-args.boxes // args.processes)
+    for first in range(0, args.boxes, per_process):
+        specs.append(
+            {
+                "first": first,
+                "count": min(per_process, args.boxes - first),
+                "urls": urls,
+                "workdir": str(args.workdir),
+                "duration": args.duration,
+                "ramp": args.ramp,
+                "seed": args.seed,
+                "pattern": asdict(args.pattern),
+                "scenario": args.scenario_data,
+            }
+        )
+
+    try:
+        if args.processes == 1:
+            sheets = FakeSheetsService(
+                args.scenario_obj.sheets,
+                seed=args.scenario_obj.seed,
+                network=backend.network if backend is not None else None,
+            )
+            install(SimConfig(urls, args.workdir / "config"), sheets)
+            scale_executors(args.boxes)
+            results = [await run_boxes(specs[0], sheets)]
+        else:
+            loop = asyncio.get_running_loop()
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(len(specs), mp_context=context) as pool:
+                results = await asyncio.gather(
+                    *(loop.run_in_executor(pool, _worker, spec) for spec in specs)
+                )
+    finally:
+        if backend is not None:
+            await backend.close()
+    return summarize_fleet(merge(results), args)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fleet simulator")
+    parser.add_argument("--boxes", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=300, help="Seconds of traffic")
+    parser.add_argument("--ramp", type=float, default=30, help="Seconds over which boxes boot")
+    parser.add_argument("--idle", type=float, default=60, help="Mean seconds between sessions")
+    parser.add_argument("--session", type=float, default=120, help="Mean session seconds")
+    parser.add_argument("--extend", type=float, default=0.3, help="Share of sessions extending")
+    parser.add_argument("--reservation-minutes", type=int, default=10)
+    parser.add_argument("--target", help="Backend base URL (default: local stand-in)")
+    parser.add_argument("--scenario", type=Path, help="Fault scenario for the stand-ins")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", type=Path, help="Write the summary as JSON")
+    parser.add_argument("--workdir", type=Path, help="Per-box files (default: temp)")
+    args = parser.parse_args(argv)
+
+    args.processes = max(1, min(args.processes, args.boxes))
+    args.port = args.port or free_port()
+    args.pattern = Pattern(idle=args.idle, session=args.session, extend_probability=args.extend)
+    args.scenario_data = json.loads(args.scenario.read_text()) if args.scenario else {}
+    args.scenario_obj = Scenario.from_dict(args.scenario_data)
+    temp = None
+    if args.workdir is None:
+        temp = tempfile.TemporaryDirectory(prefix="bluebox-fleet-")
+        args.workdir = Path(temp.name)
+
+    try:
+        summary = asyncio.run(run(args))
+    finally:
+        if temp is not None:
+            temp.cleanup()
+
+    report(summary)
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(summary, indent=2))
+        print(f"Saved summary to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
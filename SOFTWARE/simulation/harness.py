@@ -0,0 +1,237 @@
+"""
+One virtual BlueBox: the real AppContext, states and services wired to fake
+hardware. Import only after simulation.environment.install().
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+
+import states.init_state
+from api_client import APIClient
+from app_context import AppContext
+from bootstrap import WarmStartCache
+from button_service import ButtonService, HoldProgressRenderer
+from connectivity import ConnectivityService
+from event_sinks import SessionStoreSink, configured_sinks
+from events import EventBus, Sink
+from http_config import REQUEST_TIMEOUT
+from lcd_display import LCDController
+from logger import Logger
+from mfrc522_async import MFRC522Async
+from networking import network_monitor
+from rfid_reader import RFIDReader
+from screen_manager import Screens
+from simulation.fake_hardware import FakeButton
+from simulation.fake_mfrc522 import FakeIRQPin, FakeMFRC522
+from state_machine import StateMachine
+from states.init_state import InitState
+from token_handler import TokenManager
+from user_cache import UserCache
+
+HOLD_TIME = 0.1  # Same gpiozero hold_time as bb-app-main
+
+# Box whose task is running; lets the patched MAC/IP/Logger/cache/sink lookups answer per box
+_current_box: contextvars.ContextVar["VirtualBox"] = contextvars.ContextVar("box")
+
+
+async def _fetch_mac() -> str:
+    return _current_box.get().mac
+
+
+async def _fetch_ip() -> str:
+    return _current_box.get().ip
+
+
+def _box_logger(mac_address: str, instrument_name: str) -> Logger:
+    """Logger with the journal in the box's own directory."""
+    journal_dir = _current_box.get().workdir / "log_journal"
+    return Logger(mac_address, instrument_name, journal_dir=journal_dir)
+
+
+def _box_boot_cache() -> WarmStartCache:
+    return WarmStartCache(_current_box.get().workdir / "boot_cache.json")
+
+
+def _box_sinks(logger: Logger, session: aiohttp.ClientSession, instrument) -> list[Sink]:
+    """Sinks enabled in config, with the session store in the box's own directory."""
+    path = _current_box.get().workdir / "sessions.db"
+    return [
+        SessionStoreSink(path) if isinstance(sink, SessionStoreSink) else sink
+        for sink in configured_sinks(logger, session, instrument)
+    ]
+
+
+states.init_state.fetch_mac = _fetch_mac
+states.init_state.fetch_ip = _fetch_ip
+states.init_state.Logger = _box_logger
+states.init_state.WarmStartCache = _box_boot_cache
+states.init_state.configured_sinks = _box_sinks
+
+
+@dataclass
+class Event:
+    """A finished state run, as seen by the harness."""
+
+    source: str
+    target: str
+    outcome: str
+    at: float  # time.monotonic() when the source state returned
+
+
+class TracingStateMachine(StateMachine):
+    """StateMachine that also reports every transition to its box."""
+
+    def __init__(self, box: "VirtualBox", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.box = box
+
+    def _record(self, source, target, started, duration, outcome):
+        super()._record(source, target, started, duration, outcome)
+        self.box._on_transition(Event(source, target, outcome, time.monotonic()))
+
+
+class VirtualBox:
+    """
+    The application as bb-app-main wires it, with a fake MFRC522 (IRQ wired),
+    fake LCD (via the installed RPLCD module) and fake buttons.
+    The harness taps cards and holds buttons, and waits for transitions.
+    """
+
+    def __init__(self, name: str, mac: str, workdir: Path, ip: str = "127.0.0.1"):
+        self.name = name
+        self.mac = mac
+        self.ip = ip
+        self.workdir = Path(workdir)
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.irq = FakeIRQPin()
+        self.chip = FakeMFRC522(irq=self.irq)
+        self.stop_btn = FakeButton(21, hold_time=HOLD_TIME, bounce_time=0.05)
+        self.extend_btn = FakeButton(13, hold_time=HOLD_TIME, bounce_time=0.05)
+        self.context: Optional[AppContext] = None
+        self.machine: Optional[TracingStateMachine] = None
+        self.events: list[Event] = []
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def state(self) -> Optional[str]:
+        if self.context is None or self.context.state is None:
+            return None
+        return type(self.context.state).__name__
+
+    def screen(self) -> list[str]:
+        """Text currently on the fake LCD."""
+        return self.context.screens.lcd.lcd.text()
+
+    async def start(self, session: Optional[aiohttp.ClientSession] = None):
+        """Starts the box in its own task and waits until it waits for a card."""
+        _current_box.set(self)
+        self._task = asyncio.create_task(self._run(session))
+        await self.wait_for("WaitingForCardState", timeout=60)
+
+    async def stop(self):
+        if self.machine is not None:
+            self.machine.stop()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def tap(self, uid: list[int]):
+        """Puts a card on the reader; remove_card() takes it away."""
+        self.chip.present(uid)
+
+    def remove_card(self):
+        self.chip.remove()
+
+    def find(
+        self, target: str | tuple[str, ...], source: Optional[str] = None, since: float = float("-inf")
+    ) -> Optional[Event]:
+        """Latest transition into target (optionally from source) at or after since."""
+        targets = (target,) if isinstance(target, str) else target
+        for event in reversed(self.events):
+            if event.at < since:
+                break
+            if event.target in targets and source in (None, event.source):
+                return event
+        return None
+
+    async def wait_for(
+        self,
+        target: str | tuple[str, ...],
+        source: Optional[str] = None,
+        since: float = float("-inf"),
+        timeout: float = 30,
+    ) -> Event:
+        """Waits for a transition into target (optionally from source) after since."""
+        async with asyncio.timeout(timeout):
+            while True:
+                event = self.find(target, source, since)
+                if event is not None:
+                    return event
+                if self._task is not None and self._task.done():
+                    self._task.result()  # Surface the crash
+                    raise RuntimeError(f"{self.name} stopped")
+                self._changed.clear()
+                await self._changed.wait()
+
+    def _on_transition(self, event: Event):
+        self.events.append(event)
+        self._changed.set()
+
+    async def _run(self, session: Optional[aiohttp.ClientSession]):
+        context = self.context = AppContext()
+        self.machine = TracingStateMachine(self, context, InitState())
+        context.screens = Screens(LCDController())
+        context.events = EventBus()
+        context.stop_btn = self.stop_btn
+        context.extend_btn = self.extend_btn
+        context.buttons = ButtonService({"stop": self.stop_btn, "extend": self.extend_btn})
+        context.hold_progress = HoldProgressRenderer(context.buttons, context.screens)
+        context.rfid_reader = RFIDReader(MFRC522Async(self.chip, irq=self.irq))
+        context.connectivity = ConnectivityService()
+        context.lock = asyncio.Lock()
+
+        own_session = session is None
+        if own_session:
+            session = aiohttp.ClientSession(timeout=REQUEST_TIMEOUT)
+        network_task = None
+        try:
+            context.api = APIClient(session=session)
+            context.token_manager = TokenManager(
+                context.api, token_file=self.workdir / "token.json"
+            )
+            await context.token_manager.start()
+            context.user_cache = UserCache(context.api, path=self.workdir / "user_cache.json")
+            await context.user_cache.start()
+            context.buttons.start()
+            context.hold_progress.start()
+            await context.connectivity.start()
+            network_task = asyncio.create_task(network_monitor(context.screens, context))
+            await self.machine.run()
+        finally:
+            if network_task is not None:
+                network_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await network_task
+            await context.events.close()
+            if context.logger is not None:
+                await context.logger.close()
+            if context.bootstrap is not None:
+                await context.bootstrap.close()
+            await context.connectivity.close()
+            await context.token_manager.close()
+            await context.user_cache.close()
+            await context.hold_progress.close()
+            context.buttons.close()
+            await context.screens.scheduler.close()
+            context.rfid_reader.close()
+            if own_session:
+                await session.close()
+            self._changed.set()
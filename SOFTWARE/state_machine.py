@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from app_context import AppContext
+from metrics import counter, histogram
+from states.base_state import State
+
+TIMELINE_SIZE = 200  # Transitions kept in memory
+CANCEL_RETRY = 0.5  # Seconds before a shutdown cancellation is repeated
+
+STATE_SECONDS = histogram(
+    "bluebox_state_seconds",
+    "Time spent in one run of a state",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+STATE_TRANSITIONS = counter("bluebox_state_transitions", "State transitions by source and target")
+
+
+@dataclass
+class Transition:
+    """One entry of the transition timeline."""
+
+    source: str
+    target: str
+    started: datetime  # Wall clock when the source state started running
+    duration: float  # Seconds the source state ran (last repeat)
+    outcome: str = "ok"  # ok, timeout, error, cancelled
+    repeats: int = 1  # Consecutive identical transitions collapsed into this entry
+
+    def __str__(self) -> str:
+        repeats = f" x{self.repeats}" if self.repeats > 1 else ""
+        return (
+            f"{self.started:%H:%M:%S.%f}"[:-3]
+            + f" {self.source} -> {self.target} ({self.duration:.3f} s, {self.outcome}){repeats}"
+        )
+
+
+class StateMachine:
+    """
+    Runs states one after another inside a single task.
+    - stop() cancels that task from the one shutdown watcher; no per-state tasks
+    - A state may set `timeout`; when it runs out, `on_timeout` picks the next state
+    - Keeps a bounded timeline of transitions (identical repeats are collapsed)
+    """
+
+    def __init__(self, context: AppContext, initial: State, timeline_size: int = TIMELINE_SIZE):
+        self.context = context
+        self.context.state = initial
+        self.timeline: deque[Transition] = deque(maxlen=timeline_size)
+        self._stop = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._in_state = False  # Only a running state is interrupted by shutdown
+
+    def stop(self):
+        """Requests shutdown; safe to call from a signal handler."""
+        self._stop.set()
+
+    async def run(self):
+        """Runs states until stop() is called."""
+        self._runner = asyncio.current_task()
+        watcher = asyncio.create_task(self._watch_shutdown())
+        try:
+            while not self._stop.is_set():
+                await self._step()
+        except asyncio.CancelledError:
+            if not self._stop.is_set():
+                raise  # Cancelled from outside, not a shutdown
+            while self._runner.cancelling():
+                self._runner.uncancel()
+        finally:
+            watcher.cancel()
+
+    async def _watch_shutdown(self):
+        await self._stop.wait()
+        # A cancellation can be swallowed (asyncio.wait_for in Python 3.11 drops
+        # it when the awaited call finishes at the same moment), so repeat it
+        while self._in_state:
+            self._runner.cancel()
+            await asyncio.sleep(CANCEL_RETRY)
+
+    async def _step(self):
+        state = self.context.state
+        source = type(state).__name__
+        started_wall = datetime.now()
+        started = time.monotonic()
+        outcome = "ok"
+        next_state = state
+        self._in_state = True
+        try:
+            timeout = getattr(state, "timeout", None)
+            if timeout is None:
+                next_state = await state.run(self.context)
+            else:
+                try:
+                    async with asyncio.timeout(timeout) as deadline:
+                        next_state = await state.run(self.context)
+                except TimeoutError:
+                    if not deadline.expired():
+                        raise  # Raised inside the state, not our deadline
+                    outcome = "timeout"
+                    print(f"[StateMachine] {source} timed out after {timeout} s")
+                    next_state = await state.on_timeout(self.context)
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            self._in_state = False
+            duration = time.monotonic() - started
+            target = type(next_state).__name__ if outcome != "cancelled" else "-"
+            self._record(source, target, started_wall, duration, outcome)
+        self.context.state = next_state
+
+    def _record(self, source: str, target: str, started: datetime, duration: float, outcome: str):
+        STATE_SECONDS.observe(duration, state=source)
+        STATE_TRANSITIONS.inc(source=source, target=target)
+        last = self.timeline[-1] if self.timeline else None
+        if (
+            last is not None
+            and last.source == source
+            and last.target == target
+            and last.outcome == outcome
+            and source == target
+        ):
+            last.repeats += 1
+            last.duration = duration
+            return
+        self.timeline.append(Transition(source, target, started, duration, outcome))
+
+    def print_timeline(self, last: Optional[int] = None):
+        """Prints the most recent transitions (all kept ones by default)."""
+        entries = list(self.timeline)[-last:] if last else list(self.timeline)
+        print(f"[StateMachine] Last {len(entries)} transitions:")
+        for entry in entries:
+            print(f"  {entry}")
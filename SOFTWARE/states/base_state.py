@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 from app_context import AppContext
 
 
@@ -7,6 +8,13 @@ class State(ABC):
     Base state. Teplate for other states.
     """
 
+    # Seconds a single run may take before the state machine calls on_timeout
+    timeout: Optional[float] = None
+
     @abstractmethod
     async def run(self, context: AppContext) -> "State":
         pass
+
+    async def on_timeout(self, context: AppContext) -> "State":
+        """Next state after a run exceeded `timeout`. Runs the state again by default."""
+        return self
@@ -1,6 +1,6 @@
 from states.base_state import State
 from app_context import AppContext
-from datetime import datetime
+from events import SessionExtended
 
 from networking import safe_api_call
 
@@ -21,7 +21,7 @@ class ExtendReservationState(State):
                 return InReservationState()
 
             # Attempt to extend the reservation
-            await safe_api_call(
+            extended = await safe_api_call(
                 context.api.start_extend_reservation,
                 context=context,
                 api_screens=context.screens,
@@ -30,14 +30,20 @@ class ExtendReservationState(State):
                 instrument=context.instrument,
                 token=context.token,
             )
+            if extended is None:
+                # Not extended: nothing to confirm or log, keep counting down
+                await context.screens.error_message(
+                    "Extension failed", source_function="extend reservation"
+                )
+                return InReservationState()
+            # Adopt the new remaining time from the server (no drift on the next sync)
+            context.reservation.sync(extended.remaining_time)
 
         # Notify the user that reservation was successfully extended
         await context.screens.reservation_extended()
 
         # Log the extension event
-        await context.logger.make_log.recording_extended(
-            datetime.now(), "Extended by user"
-        )
+        context.events.publish(SessionExtended(reason="Extended by user"))
         # Reset warning flag so user can be warned again near the new end time
         context.reservation.warning_sent = False
 
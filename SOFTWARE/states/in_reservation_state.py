@@ -1,13 +1,30 @@
 import asyncio
+import time
 from states.base_state import State
 from app_context import AppContext
-from button_watcher import button_watcher
-import contextlib
+from button_service import LONG_PRESS
+from timer_service import get_timers
 from networking import safe_api_call
 from states.time_out_state import TimeOutState
 from states.extend_reservation_state import ExtendReservationState
 from states.user_stop_reservation_state import UserStopReservationState
 
+MIN_SYNC_INTERVAL = 30  # Seconds, server check-ins near the warning and the end
+MAX_SYNC_INTERVAL = 10 * 60  # Seconds, server check-ins mid-session
+DRIFT_TOLERANCE = 1  # Minutes the server may differ from the countdown (rounding)
+
+
+def sync_delay(remaining_time: int, warning_time: int) -> float:
+    """
+    Seconds until the next server check-in: half the time to the next
+    milestone (warning, then end), so check-ins get denser as it approaches.
+    """
+    if remaining_time > warning_time:
+        minutes_to_milestone = remaining_time - warning_time
+    else:
+        minutes_to_milestone = remaining_time
+    return min(max(minutes_to_milestone * 60 / 2, MIN_SYNC_INTERVAL), MAX_SYNC_INTERVAL)
+
 
 class InReservationState(State):
     """
@@ -17,64 +34,98 @@ class InReservationState(State):
 
     async def run(self, context: AppContext) -> State:
         warning_time = 5  # Time in minutes before end to trigger warning
-        state_queue = asyncio.Queue()  # Queue for button-triggered state transitions
+        refresh_interval = 5  # Seconds between remaining-time updates
+        reservation = context.reservation
 
-        # Launch button watcher as background task
-        watcher_task = asyncio.create_task(button_watcher(context, state_queue))
+        # Remaining time is counted down locally, the server is asked on a schedule
+        next_sync = reservation.synced_at + sync_delay(
+            reservation.remaining_time, warning_time
+        )
+
+        # Gestures from the button service; long presses request a state change
+        button_events = context.buttons.subscribe()
+        context.hold_progress.labels = {"stop": "Stopping...", "extend": "Extending..."}
+        context.hold_progress.enabled = lambda: context.network_status
 
         try:
             # Main loop: runs as long as reservation is valid and not manually ended
-            while (
-                context.reservation.remaining_time > 0
-                and not context.reservation.ended_by_user
-            ):
-                try:
-                    # Wait (up to 0.5s - to eliminate false presses) for button press that requests a state change
-                    new_state = await asyncio.wait_for(state_queue.get(), timeout=0.5)
+            while not reservation.ended_by_user:
+                # Only update screen if no button is being held
+                if not context.buttons.holding:
+                    reservation.tick()
+                    if reservation.remaining_time <= 0:
+                        # Countdown ran out: confirm with the server before ending
+                        reservation.sync_requested = True
 
-                    if new_state == "stop":
-                        return UserStopReservationState()
-                    elif new_state == "extend":
-                        return ExtendReservationState()
-                except asyncio.TimeoutError:
-                    # No button press — continue with status update
-                    pass
+                    if reservation.sync_requested or time.monotonic() >= next_sync:
+                        next_sync = await self._sync(context, warning_time)
+
+                    if reservation.remaining_time <= 0:
+                        break
 
-                # Only update screen if no button is being handled
-                if not context.button_lock.locked():
                     async with context.lock:
                         # Show current reservation time
-                        await context.screens.in_reservation(
-                            context.reservation.remaining_time
-                        )
-
-                    # Update remaining time of reservation
-                    await safe_api_call(
-                        context.api.fetch_recording_info,
-                        context=context,
-                        api_screens=context.screens,
-                        # api parameters:
-                        token=context.token,
-                        reservation=context.reservation,
-                    )
-                    await asyncio.sleep(0.5)
+                        await context.screens.in_reservation(reservation.remaining_time)
 
                     # Show warning, that reservation in comming to the end, pass if already warned
                     if (
-                        context.reservation.remaining_time <= warning_time
-                        and not context.reservation.warning_sent
-                        and not context.reservation.ended_by_user
+                        reservation.remaining_time <= warning_time
+                        and not reservation.warning_sent
+                        and not reservation.ended_by_user
                     ):
                         async with context.lock:
                             await context.screens.reservation_end_warning(
-                                context.reservation.remaining_time
+                                reservation.remaining_time
                             )
-                            context.reservation.warning_sent = True
+                            reservation.warning_sent = True
+
+                try:
+                    # Wait for a button gesture (screens never block this)
+                    event = await get_timers().wait_for(
+                        button_events.get(), refresh_interval
+                    )
+                except asyncio.TimeoutError:
+                    # No button press — continue with status update
+                    continue
+
+                if event.gesture != LONG_PRESS:
+                    continue
+                if not context.network_status:
+                    print(f"[InReservation] {event.button} ignored — offline")
+                    continue
+                if event.button == "stop":
+                    return UserStopReservationState()
+                elif event.button == "extend":
+                    return ExtendReservationState()
 
         finally:
-            # Ensure button watcher is cancelled properly on exit
-            watcher_task.cancel()
-            with contextlib.suppress(asyncio.CancelledError):
-                await watcher_task
+            context.buttons.unsubscribe(button_events)
+            context.hold_progress.labels = {}
         # Reservation timed out — transition to end state
         return TimeOutState()
+
+    async def _sync(self, context: AppContext, warning_time: int) -> float:
+        """Reconciles the countdown with the server; returns the next check-in time."""
+        reservation = context.reservation
+        estimate = reservation.estimate()
+        updated = await safe_api_call(
+            context.api.fetch_recording_info,
+            context=context,
+            api_screens=context.screens,
+            # api parameters:
+            token=context.token,
+            reservation=reservation,
+        )
+        if updated is None:
+            # Server unreachable: keep counting down locally, retry soon
+            reservation.sync_requested = False
+            return time.monotonic() + MIN_SYNC_INTERVAL
+
+        drift = reservation.remaining_time - estimate
+        if abs(drift) > DRIFT_TOLERANCE:
+            # Changed on the server side (e.g. extended or shortened elsewhere)
+            print(f"[InReservation] Remaining time changed on server by {drift} min")
+            if reservation.remaining_time > warning_time:
+                reservation.warning_sent = False
+            return time.monotonic() + MIN_SYNC_INTERVAL
+        return time.monotonic() + sync_delay(reservation.remaining_time, warning_time)
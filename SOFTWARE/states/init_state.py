@@ -3,83 +3,152 @@ from app_context import AppContext
 from states.waiting_for_card_state import WaitingForCardState
 from networking import fetch_ip, fetch_mac
 from model_classes import Instrument, Token
-from networking import safe_api_call, check_internet_connection
+from networking import safe_api_call, wait_until_online
 from token_handler import verify_token
 from logger import Logger
+from bootstrap import READY_SECONDS, Bootstrap, WarmStartCache
+from event_sinks import configured_sinks
+from events import BoxStarted
+from dataclasses import replace
 from datetime import datetime
+import time
+from typing import Optional
 
 
 class InitState(State):
     """
-    Initial application state.
-    - Shows starting screen
-    - Verifies or fetches a new token
-    - Fetches instrument metadata (MAC/IP)
-    - Initializes logger
-    - Transitions to WaitingForCardState on success
+    Initial application state. Startup runs as a dependency graph (bootstrap.py):
+    - Boot cache, MAC, IP, connectivity and token are fetched at the same time
+    - Warm boot (instrument cached for this MAC): ready as soon as MAC and IP are
+      known; the instrument is revalidated in the background
+    - Cold boot: ready once the instrument is fetched
+    - The log sheet is opened in the background (log rows are journaled until then)
+    - Failed steps are retried with backoff
+    - Transitions to WaitingForCardState when ready
     """
 
     async def run(self, context: AppContext) -> State:
+        started = time.monotonic()
         # Show splash/loading screen while initializing
         await context.screens.starting_screen()
 
-        # Check if device has internet access
-        context.network_status = await check_internet_connection()
+        if context.bootstrap is not None:
+            await context.bootstrap.close()
+        cache = WarmStartCache()
+        boot = context.bootstrap = Bootstrap(hold_off=context.api.breaker.retry_after)
+        boot.add("cache", cache.load)
+        boot.add("mac", fetch_mac)
+        boot.add("ip", fetch_ip)
+        boot.add("online", lambda: self._check_online(context))
+        boot.start()
 
-        # Validate current token or fetch a new one
-        token: Token = await safe_api_call(
-            lambda: verify_token(context),
-            context=context,
-            api_screens=context.screens,
-            logger=context.logger,
-        )
+        mac, ip, _ = await boot.wait("mac", "ip", "cache")
+        cached = cache.instrument_for(mac)
+        warm = cached is not None
 
-        if token:
-            context.token = token  # Store valid token in context
+        if warm:
+            # Backend checks in the background, without screens: the box is usable
+            boot.add("token", lambda online: verify_token(context), after=("online",))
+            boot.add(
+                "instrument",
+                lambda online: context.api.fetch_instrument_data(mac=mac, ip=ip),
+                after=("online",),
+            )
+            boot.add(
+                "revalidate",
+                lambda instrument: self._revalidate(context, cache, instrument),
+                after=("instrument",),
+            )
+            instrument = replace(cached, ip=ip)
         else:
-            return self  # Stay in InitState (retry later)
-
-        # Get device IP and MAC address
-        ip = await fetch_ip()
-        mac = await fetch_mac()
-
-        instrument: Instrument = await safe_api_call(
-            context.api.fetch_instrument_data,
-            context=context,
-            api_screens=context.screens,
-            # api parameters:
-            mac=mac,
-            ip=ip,
-        )
+            # Validate current token or fetch a new one
+            boot.add("token", lambda online: self._fetch_token(context), after=("online",))
+            boot.add(
+                "instrument",
+                lambda token: safe_api_call(
+                    context.api.fetch_instrument_data,
+                    context=context,
+                    api_screens=context.screens,
+                    # api parameters:
+                    mac=mac,
+                    ip=ip,
+                ),
+                after=("token",),
+            )
+            (instrument,) = await boot.wait("instrument")
+            await cache.save(instrument=instrument)
 
-        # Fetch instrument information using MAC address, store IP
-        if instrument:
-            # Store instrument metadata in context
-            context.instrument = instrument
+        # Store instrument metadata in context
+        context.instrument = instrument
+        # Initialize logging with MAC and instrument name; rows are journaled
+        # until the sheet is open
+        context.logger = Logger(context.instrument.mac_address, context.instrument.name)
+        boot.add("logger", lambda: self._open_log_sheet(context, cache))
+        boot.start()
+        # Business events go to the sheet and to the sinks enabled in config
+        for sink in configured_sinks(context.logger, context.api.session, context.instrument):
+            context.events.add_sink(sink)
 
-            # Initialize logging with MAC and instrument name
-            context.logger = Logger(
-                context.instrument.mac_address, context.instrument.name
-            )
+        if not warm:
             # Display diagnostic/logging info on screen
             await context.screens.initial_logs(
                 time=datetime.now(),
                 ip=context.instrument.ip,
                 instrument=context.instrument.name,
             )
-            # Initialize and prepare logging sheet
-            await context.logger.initialize()
-            await context.logger.check_headers()
-            await context.logger.insert_new_row()
+        # Initial log (date+time, ip to remote connection, insturment name)
+        context.events.publish(
+            BoxStarted(ip=context.instrument.ip, instrument=context.instrument.name)
+        )
 
-            # Initial log (date+time, ip to remote connection, insturment name)
-            await context.logger.make_log.log_entry(datetime.now())
-            await context.logger.make_log.ip(context.instrument.ip)
-            await context.logger.make_log.instrument(context.instrument.name)
+        ready = time.monotonic() - started
+        READY_SECONDS.set(ready)
+        print(f"[Bootstrap] Ready in {ready:.3f} s ({'warm' if warm else 'cold'} boot)")
+        # Initialization complete, go to card scanning state
+        return WaitingForCardState()
 
+    @staticmethod
+    async def _check_online(context: AppContext) -> bool:
+        """
+        Succeeds (True) once the device has internet access. A failed check is
+        not a result: the step waits (offline screen) until the connectivity
+        service reports online, so the token step never starts offline.
+        """
+        context.network_status = await context.connectivity.check()
+        if not context.network_status:
+            await wait_until_online(context, context.screens)
+        return True
+
+    @staticmethod
+    async def _fetch_token(context: AppContext) -> Token:
+        return await safe_api_call(
+            lambda: verify_token(context),
+            context=context,
+            api_screens=context.screens,
+            logger=context.logger,
+        )
+
+    @staticmethod
+    async def _revalidate(
+        context: AppContext, cache: WarmStartCache, instrument: Instrument
+    ) -> Instrument:
+        """Adopts backend changes of the cached instrument (fully used on the next boot)."""
+        current = context.instrument
+        if (instrument.id, instrument.name) != (current.id, current.name):
+            print(f"[Bootstrap] Instrument changed: {current.name} -> {instrument.name}")
+            context.instrument = replace(instrument, ip=current.ip)
+            # The log sheet is named after the instrument, find it again next boot
+            await cache.save(instrument=instrument, sheet_key=None)
         else:
-            # Retry if instrument fetch failed
-            return self
+            await cache.save(instrument=instrument)
+        return instrument
 
-        # Initialization complete, go to card scanning state
-        return WaitingForCardState()
+    @staticmethod
+    async def _open_log_sheet(context: AppContext, cache: WarmStartCache) -> Optional[bool]:
+        """Opens (or creates) the log sheet; the cached key skips the Drive search."""
+        logger = context.logger
+        if not await logger.initialize(sheet_key=cache.data.sheet_key):
+            return None
+        if logger.sheet_key != cache.data.sheet_key:
+            await cache.save(sheet_key=logger.sheet_key)
+        return True
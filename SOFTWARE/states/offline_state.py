@@ -1,13 +1,11 @@
-import asyncio
 from states.base_state import State
 from app_context import AppContext
-from networking import check_internet_connection
 
 
 class OfflineState(State):
     """
     State shown when the device is offline.
-    Displays a "no connection" message and repeatedly checks for reconnection.
+    Displays a "no connection" message and waits for the connectivity service to report reconnection.
     Once online again, it transitions back to WaitingForCardState.
     """
 
@@ -18,12 +16,9 @@ class OfflineState(State):
         # Show "no connection" screen to the user
         await context.screens.no_connection()
 
-        # Loop forever, checking if connection has been restored
-        while True:
-            # Wait 1 second before retrying
-            await asyncio.sleep(1)
-            if await check_internet_connection():
-                # If reconnected, show a confirmation screen
-                await context.screens.connection_restored()
-                # Transition back to normal waiting state
-                return WaitingForCardState()
+        # Wait until the connectivity service reports the device online again
+        await context.connectivity.wait_online()
+        # If reconnected, show a confirmation screen
+        await context.screens.connection_restored()
+        # Transition back to normal waiting state
+        return WaitingForCardState()
@@ -1,6 +1,6 @@
 from states.base_state import State
 from app_context import AppContext
-from datetime import datetime
+from events import SessionEnded
 
 
 class TimeOutState(State):
@@ -17,8 +17,6 @@ class TimeOutState(State):
             # Notify user that the session has ended due to timeout
             await context.screens.session_ended_by_timeout()
             # Log the timeout event with a timestamp and reason
-            await context.logger.make_log.recording_end(
-                datetime.now(), "Ended by timeout"
-            )
+            context.events.publish(SessionEnded(reason="Ended by timeout"))
         # Transition back to the beginning, waiting for a new user/card
         return WaitingForCardState()
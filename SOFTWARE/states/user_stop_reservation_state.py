@@ -2,7 +2,7 @@ from states.base_state import State
 from app_context import AppContext
 from states.waiting_for_card_state import WaitingForCardState
 from networking import safe_api_call
-from datetime import datetime
+from events import SessionEnded
 
 
 class UserStopReservationState(State):
@@ -29,7 +29,7 @@ class UserStopReservationState(State):
         await context.screens.user_stop_reservation()
 
         # Log the end of the reservation as user-initiated
-        await context.logger.make_log.recording_end(datetime.now(), "Ended by user")
+        context.events.publish(SessionEnded(reason="Ended by user"))
 
         # Return to the idle state, waiting for the next card scan
         return WaitingForCardState()
@@ -1,17 +1,40 @@
 # 5. states/starting_session.py
 from states.base_state import State
 from app_context import AppContext
-from datetime import datetime
+from events import SessionStarted
+from typing import Optional
+import asyncio
 from model_classes import Reservation
 from networking import safe_api_call
 
 
+def start_reservation_request(context: AppContext) -> asyncio.Task:
+    """Starts the start/extend reservation call for context.user in the background."""
+    return asyncio.create_task(
+        safe_api_call(
+            context.api.start_extend_reservation,
+            context=context,
+            api_screens=context.screens,
+            # api parameters:
+            user=context.user,
+            instrument=context.instrument,
+            token=context.token,
+        )
+    )
+
+
 class VerifyReservationState(State):
     """
     State responsible for verifying if a reservation exists and is valid.
     Based on the result, it transitions to either InReservationState or WaitingForCardState.
+    The reservation call may already be running (started by VerifyUserState).
     """
 
+    timeout = 30  # Seconds before giving up on the reservation and going back to idle
+
+    def __init__(self, reservation_task: Optional[asyncio.Task] = None):
+        self.reservation_task = reservation_task
+
     async def run(self, context: AppContext) -> State:
         # Import possible next states to transition to
         from states.waiting_for_card_state import WaitingForCardState
@@ -20,16 +43,14 @@ class VerifyReservationState(State):
         # Display a "checking reservation" screen
         await context.screens.checking_reservation()
 
-        # Call the API to verify and run or extend the reservation
-        reservation: Reservation = await safe_api_call(
-            context.api.start_extend_reservation,
-            context=context,
-            api_screens=context.screens,
-            # api parameters:
-            user=context.user,
-            instrument=context.instrument,
-            token=context.token,
-        )
+        # Call the API to verify and run or extend the reservation (unless already running)
+        if self.reservation_task is None:
+            self.reservation_task = start_reservation_request(context)
+        try:
+            reservation: Reservation = await self.reservation_task
+        except asyncio.CancelledError:
+            self.reservation_task.cancel()
+            raise
 
         if reservation:
             # If a reservation was returned successfully
@@ -39,8 +60,11 @@ class VerifyReservationState(State):
             # Notify user that reservation is OK
             await context.screens.reservation_ok()
             # Log the reservation start
-            await context.logger.make_log.recording_start(
-                datetime.now(), context.reservation.reservation_id
+            context.events.publish(
+                SessionStarted(
+                    reservation_id=context.reservation.reservation_id,
+                    user_id=context.user.id,
+                )
             )
             # Transition to the InReservationState
             return InReservationState()
@@ -49,3 +73,13 @@ class VerifyReservationState(State):
             await context.screens.reservation_nok()
             # Transition back to waiting for card input
             return WaitingForCardState()
+
+    async def on_timeout(self, context: AppContext) -> State:
+        from states.waiting_for_card_state import WaitingForCardState
+
+        if self.reservation_task is not None:
+            self.reservation_task.cancel()
+        await context.screens.error_message(
+            "Timed out", source_function="verify reservation"
+        )
+        return WaitingForCardState()
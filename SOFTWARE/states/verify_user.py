@@ -2,7 +2,8 @@ from states.base_state import State
 from app_context import AppContext
 from model_classes import User
 from networking import safe_api_call
-from datetime import datetime
+from events import CardTapped, UnknownCard, UserVerified
+import asyncio
 
 
 class VerifyUserState(State):
@@ -12,41 +13,76 @@ class VerifyUserState(State):
     If not, displays an error and returns to waiting for card.
     """
 
+    timeout = 30  # Seconds before giving up on the lookup and going back to idle
+
     async def run(self, context: AppContext) -> State:
         # Import next possible states
-        from states.verify_reservation_state import VerifyReservationState
+        from states.verify_reservation_state import (
+            VerifyReservationState,
+            start_reservation_request,
+        )
         from states.waiting_for_card_state import WaitingForCardState
 
+        # A cached card is answered without the network, so known users get in
+        # also offline or while the backend is down; only misses ask the backend
+        hit, cached_user = context.user_cache.cached(context.card_id)
+        user_task = None
+        if not hit:
+            # Start the user lookup first, screens and logs are queued while it runs
+            user_task = asyncio.create_task(
+                safe_api_call(
+                    context.user_cache.fetch_user_data,
+                    context=context,
+                    api_screens=context.screens,
+                    # api parameters:
+                    card_id=context.card_id,
+                )
+            )
         # Show "checking user" feedback on screen
         await context.screens.checking_user()
+        # Start a new session entry: time of the scan and current IP (kept up
+        # to date by the address monitor)
+        context.events.publish(CardTapped(card_id=context.card_id, ip=context.instrument.ip))
 
-        # Attempt to fetch user data based on the card ID
-        user: User = await safe_api_call(
-            context.api.fetch_user_data,
-            context=context,
-            api_screens=context.screens,
-            # api parameters:
-            card_id=context.card_id,
-        )
-        # Insert a new row into the log (e.g. to start a new session entry)
-        await context.logger.insert_new_row()
-        # Log the time of entry (user scan time)
-        await context.logger.make_log.log_entry(datetime.now())
-        # Log token expiration time for debugging or tracking
-        await context.logger.make_log.token(context.token.expiration)
+        if user_task is None:
+            user: User = cached_user
+        else:
+            try:
+                user = await user_task
+            except asyncio.CancelledError:
+                user_task.cancel()
+                raise
+
+        # Token expiration time is logged for debugging or tracking
+        token_expiration = context.token.expiration if context.token is not None else None
 
         if user:
             # If a user was found for the scanned card
             # Store user info in the context
             context.user = user
-            # Log user full name
-            await context.logger.make_log.user_info(context.user.full_name)
+            # Start the reservation call right away, log while it runs
+            reservation_task = start_reservation_request(context)
+            context.events.publish(
+                UserVerified(
+                    card_id=context.card_id,
+                    user_id=user.id,
+                    full_name=user.full_name,
+                    token_expiration=token_expiration,
+                )
+            )
             # Proceed to verify the reservation
-            return VerifyReservationState()
+            return VerifyReservationState(reservation_task=reservation_task)
         else:
             # If no user found for the card ID
             await context.screens.user_not_in_database()
-            # Log the unknown card ID instead of user name
-            await context.logger.make_log.user_info(context.card_id)
+            context.events.publish(
+                UnknownCard(card_id=context.card_id, token_expiration=token_expiration)
+            )
             # Return to waiting for the next card scan
             return WaitingForCardState()
+
+    async def on_timeout(self, context: AppContext) -> State:
+        from states.waiting_for_card_state import WaitingForCardState
+
+        await context.screens.error_message("Timed out", source_function="verify user")
+        return WaitingForCardState()
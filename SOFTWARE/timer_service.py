@@ -0,0 +1,282 @@
+import asyncio
+import collections
+import time
+import weakref
+from pathlib import Path
+from typing import Callable, Optional
+
+from config import config
+from executors import SYSTEM, run_in
+from metrics import counter, gauge
+
+# Default slack: a deadline may fire up to this fraction of its delay late, so
+# timers of unrelated subsystems share one wakeup (like Linux timer slack)
+SLACK_RATIO = getattr(config, "TIMER_SLACK_RATIO", 0.1)
+MAX_SLACK = getattr(config, "TIMER_MAX_SLACK", 5.0)  # Seconds
+RATE_WINDOW = 60.0  # Seconds over which wakeups per second are reported
+REPORT_INTERVAL = 10 * 60  # Seconds between "[Timers]" log lines
+
+PROC_TASKS = Path("/proc/self/task")
+
+WAKEUPS = counter("bluebox_timer_wakeups", "Event loop wakeups caused by the timer service")
+CALLBACKS = counter("bluebox_timer_callbacks", "Timer callbacks run")
+COALESCED = counter(
+    "bluebox_timer_coalesced", "Timer callbacks run on a wakeup shared with another timer"
+)
+TIMERS = gauge("bluebox_timers", "Pending timers")
+WAKEUP_RATE = gauge(
+    "bluebox_timer_wakeups_per_second", "Timer service wakeups per second (last minute)"
+)
+PROCESS_WAKEUP_RATE = gauge(
+    "bluebox_process_wakeups_per_second",
+    "Voluntary context switches of all threads per second (last minute)",
+)
+
+
+def default_slack(delay: float) -> float:
+    return min(max(delay, 0.0) * SLACK_RATIO, MAX_SLACK)
+
+
+class Timer:
+    """A scheduled callback; it runs somewhere in [when, when + slack]."""
+
+    __slots__ = ("when", "latest", "callback", "args", "cancelled", "_service")
+
+    def __init__(self, service: "TimerService", when: float, slack: float, callback, args):
+        self.when = when
+        self.latest = when + max(slack, 0.0)
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._service = service
+
+    def cancel(self):
+        """Safe to call at any time, also after the timer fired."""
+        if not self.cancelled:
+            self.cancelled = True
+            self._service._remove(self)
+
+
+class TimerService:
+    """
+    One event loop timer for all deadlines of the app.
+    - Every deadline has a slack window; one wakeup at the earliest window end
+      runs every timer that is due by then, so close deadlines fire together
+    - sleep(), timeout() and wait_for() replace the asyncio ones in periodic loops
+    - Counts its wakeups, for the wakeups per second report
+    Only a handful of timers are pending at a time, a linear scan beats a heap.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._timers: set[Timer] = set()
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._wakeup_at: Optional[float] = None
+        self._recent: collections.deque[float] = collections.deque()  # Recent wakeup times
+        self._started = loop.time()
+        self.wakeups = 0
+        self.callbacks = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def call_at(self, when: float, callback: Callable, *args, slack: Optional[float] = None) -> Timer:
+        """Runs callback(*args) at loop time `when`, or up to `slack` seconds later."""
+        if slack is None:
+            slack = default_slack(when - self._loop.time())
+        timer = Timer(self, when, slack, callback, args)
+        self._timers.add(timer)
+        TIMERS.set(len(self._timers))
+        if self._wakeup_at is None or timer.latest < self._wakeup_at:
+            self._arm(timer.latest)
+        return timer
+
+    def call_later(self, delay: float, callback: Callable, *args, slack: Optional[float] = None) -> Timer:
+        if slack is None:
+            slack = default_slack(delay)
+        return self.call_at(self._loop.time() + delay, callback, *args, slack=slack)
+
+    async def sleep(self, delay: float, *, slack: Optional[float] = None):
+        future = self._loop.create_future()
+        timer = self.call_later(delay, _resolve, future, slack=slack)
+        try:
+            await future
+        finally:
+            timer.cancel()
+
+    def timeout(self, delay: Optional[float], *, slack: Optional[float] = None) -> "Timeout":
+        """Like asyncio.timeout(), with a coalesced deadline (None: no timeout)."""
+        return Timeout(self, delay, slack)
+
+    async def wait_for(self, aw, timeout: Optional[float], *, slack: Optional[float] = None):
+        """Like asyncio.wait_for(), with a coalesced deadline; raises TimeoutError."""
+        async with self.timeout(timeout, slack=slack):
+            return await aw
+
+    def rate(self) -> float:
+        """Wakeups per second over the last RATE_WINDOW."""
+        now = self._loop.time()
+        self._prune(now)
+        return len(self._recent) / max(min(now - self._started, RATE_WINDOW), 1.0)
+
+    def _prune(self, now: float):
+        while self._recent and self._recent[0] < now - RATE_WINDOW:
+            self._recent.popleft()
+
+    def _arm(self, at: float):
+        if self._handle is not None:
+            self._handle.cancel()
+        self._wakeup_at = at
+        self._handle = self._loop.call_at(at, self._wake)
+
+    def _rearm(self):
+        TIMERS.set(len(self._timers))
+        if not self._timers:
+            if self._handle is not None:
+                self._handle.cancel()
+            self._handle = None
+            self._wakeup_at = None
+            return
+        latest = min(timer.latest for timer in self._timers)
+        if latest != self._wakeup_at:
+            self._arm(latest)
+
+    def _remove(self, timer: Timer):
+        if timer in self._timers:
+            self._timers.discard(timer)
+            if timer.latest == self._wakeup_at:
+                self._rearm()  # Do not wake up for nothing
+            else:
+                TIMERS.set(len(self._timers))
+
+    def _wake(self):
+        # The loop may run a handle up to its clock resolution early
+        horizon = max(self._loop.time(), self._wakeup_at)
+        self._handle = None
+        self._wakeup_at = None
+        self.wakeups += 1
+        WAKEUPS.inc()
+        self._recent.append(horizon)
+        self._prune(horizon)
+
+        due = sorted((t for t in self._timers if t.when <= horizon), key=lambda t: t.when)
+        self._timers.difference_update(due)
+        if len(due) > 1:
+            self.coalesced += len(due) - 1
+            COALESCED.inc(len(due) - 1)
+        for timer in due:
+            if timer.cancelled:
+                continue  # Cancelled by an earlier callback of this wakeup
+            timer.cancelled = True
+            self.callbacks += 1
+            CALLBACKS.inc()
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                self._loop.call_exception_handler(
+                    {"message": f"Timer callback {timer.callback!r} failed", "exception": e}
+                )
+        self._rearm()
+
+
+class Timeout:
+    """Async context manager behind TimerService.timeout()."""
+
+    def __init__(self, service: TimerService, delay: Optional[float], slack: Optional[float]):
+        self._service = service
+        self._delay = delay
+        self._slack = slack
+        self._timer: Optional[Timer] = None
+        self._task: Optional[asyncio.Task] = None
+        self._cancelling = 0
+        self.expired = False
+
+    async def __aenter__(self) -> "Timeout":
+        self._task = asyncio.current_task()
+        self._cancelling = self._task.cancelling()
+        if self._delay is not None:
+            self._timer = self._service.call_later(
+                max(self._delay, 0.0), self._expire, slack=self._slack
+            )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._timer is not None:
+            self._timer.cancel()
+        if (
+            self.expired
+            and exc_type is asyncio.CancelledError
+            and self._task.uncancel() <= self._cancelling
+        ):
+            raise TimeoutError from exc
+        return None
+
+    def _expire(self):
+        self.expired = True
+        self._task.cancel()
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+_services: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TimerService]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_timers() -> TimerService:
+    """Returns the timer service of the running loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    service = _services.get(loop)
+    if service is None:
+        service = _services[loop] = TimerService(loop)
+    return service
+
+
+def context_switches() -> Optional[int]:
+    """Voluntary context switches of all threads of this process (Linux), blocking."""
+    total = 0
+    try:
+        for task in PROC_TASKS.iterdir():
+            try:
+                status = (task / "status").read_text()
+            except OSError:
+                continue  # Thread exited meanwhile
+            for line in status.splitlines():
+                if line.startswith("voluntary_ctxt_switches:"):
+                    total += int(line.split(":")[1])
+    except OSError:
+        return None
+    return total
+
+
+async def wakeup_reporter(interval: float = RATE_WINDOW):
+    """
+    Reports how often the app wakes up: timer service wakeups and, as the
+    whole-process figure, voluntary context switches of all threads.
+    """
+    timers = get_timers()
+    previous = await run_in(SYSTEM, context_switches)
+    previous_at = time.monotonic()
+    last_report = previous_at
+    while True:
+        await timers.sleep(interval, slack=interval / 2)
+        switches = await run_in(SYSTEM, context_switches)
+        now = time.monotonic()
+        timer_rate = timers.rate()
+        WAKEUP_RATE.set(timer_rate)
+        process_rate = None
+        if switches is not None and previous is not None:
+            process_rate = (switches - previous) / (now - previous_at)
+            PROCESS_WAKEUP_RATE.set(process_rate)
+        previous, previous_at = switches, now
+        if now - last_report >= REPORT_INTERVAL:
+            last_report = now
+            print(
+                f"[Timers] {timer_rate:.2f} timer wakeups/s, {len(timers)} pending, "
+                f"{timers.coalesced} coalesced; process "
+                + (f"{process_rate:.1f} wakeups/s" if process_rate is not None else "n/a")
+            )
@@ -1,75 +1,197 @@
 from model_classes import Token
 from app_context import AppContext
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
+import asyncio
 import json
+import os
+import time
 
 # from typing import Optional
 from config import config
+from executors import DISK, run_in
+from api_policy import CircuitOpenError
+from timer_service import get_timers
+
+if TYPE_CHECKING:
+    from api_client import APIClient
 
 TOKEN_FILE = config.TOKEN_FILE  # Path to JSON file that stores the token
 
+REFRESH_MARGIN = 5 * 60  # Refresh this many seconds before expiration
+SAFETY_MARGIN = 30  # Token is still handed out until this close to expiration
+RETRY_MIN_DELAY = 5  # Backoff bounds (seconds) for failed background refreshes
+RETRY_MAX_DELAY = 60
+
 
 async def load_token(TOKEN_FILE: Path) -> Token | None:
     """
     Load a saved token from disk. Returns a Token object if successful, otherwise None.
     """
-
-    if TOKEN_FILE.exists():
-        try:
-            data = json.loads(TOKEN_FILE.read_text())
-            return Token(string=data["string"], expiration=data["expiration"])
-        except Exception as e:
-            print(f"[TokenHandler] Error loading token: {e}")
-    return None
+    return await run_in(DISK, _read_token_file, TOKEN_FILE)
 
 
 async def save_token(token: Token, TOKEN_FILE: Path):
     """
-    Save a token object as a JSON file on disk.
+    Atomically save a token object as a JSON file on disk.
     """
     try:
-        TOKEN_FILE.write_text(json.dumps(token.to_dict()))
+        await run_in(DISK, _write_token_file, token, TOKEN_FILE)
         print("[TokenHandler] New token saved.")
-    # print("Saving token...")
     except Exception as e:
         print(f"[TokenHandler] Failed to save token: {e}")
 
 
-async def verify_token(context: AppContext) -> Token | None:
+def _read_token_file(path: Path) -> Token | None:
+    if path.exists():
+        try:
+            data = json.loads(path.read_text())
+            return Token(string=data["string"], expiration=data["expiration"])
+        except Exception as e:
+            print(f"[TokenHandler] Error loading token: {e}")
+    return None
+
+
+def _write_token_file(token: Token, path: Path):
+    # Write to a temp file and rename, so a power cut never leaves half a token
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        handle.write(json.dumps(token.to_dict()))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+class TokenManager:
     """
-    Verifies whether the current token is valid and updates it in the application context.
-    If no valid token is found, fetches a new one.
+    Keeps the API token in memory.
+    - Concurrent refreshes are collapsed into a single fetch_token request
+    - A background task refreshes the token ahead of its expiration
+    - The token file is written atomically, and only when the token changes
+    - Server/local clock offset (from the HTTP Date header) corrects expiration
     """
-    token = await load_token(TOKEN_FILE)
-
-    needs_refresh = token is None or not await check_expiration(token)
 
-    if needs_refresh:
+    def __init__(self, api: "APIClient", token_file: Path = TOKEN_FILE):
+        self.api = api
+        self.token_file = token_file
+        self.token: Token | None = None
+        self.clock_offset: float = 0.0  # Server clock minus local clock (seconds)
+        self._deadline: float = 0.0  # Expiration on the monotonic clock
+        self._saved_string: str | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._timer_task: asyncio.Task | None = None
+        self._token_changed = asyncio.Event()
+
+    async def start(self):
+        """Loads the token from disk once and starts the background refresh."""
+        token = await load_token(self.token_file)
+        if token is not None:
+            self._adopt(token)
+            self._saved_string = token.string
+        if self._timer_task is None:
+            self._timer_task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        for task in (self._timer_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._timer_task = None
+        self._refresh_task = None
+
+    def seconds_left(self) -> float:
+        return self._deadline - time.monotonic()
+
+    def is_valid(self) -> bool:
+        return self.token is not None and self.seconds_left() > SAFETY_MARGIN
+
+    async def get(self) -> Token | None:
+        """Returns a valid token, fetching a new one only if none is usable."""
+        if self.is_valid():
+            return self.token
         print("[TokenHandler] Token missing or expired — fetching new one.")
-        token = await context.api.fetch_token()
+        return await self.refresh()
+
+    async def refresh(self) -> Token | None:
+        """Fetches a new token. Concurrent callers share one in-flight request."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+        # Shield, so a cancelled caller does not abort the refresh for the others
+        return await asyncio.shield(self._refresh_task)
+
+    async def _fetch(self) -> Token | None:
+        try:
+            token = await self.api.fetch_token()
+        except CircuitOpenError:
+            return None  # Backend known to be down, the refresh loop retries later
         if token is None:
             return None
-        await save_token(token, TOKEN_FILE)
-
-    context.token = token
-    return token
+        self._adopt(token)
+        if token.string != self._saved_string:
+            await save_token(token, self.token_file)
+            self._saved_string = token.string
+        return token
+
+    def _adopt(self, token: Token):
+        """Stores the token and converts its expiration to the monotonic clock."""
+        try:
+            expiration = datetime.fromisoformat(token.expiration).timestamp()
+        except Exception as e:
+            print("Error in checking_token: " + str(e))
+            expiration = 0.0
+
+        if token.server_date is not None:
+            self.clock_offset = token.server_date.timestamp() - time.time()
+
+        # Expiration is given in server time, translate it to local time
+        local_expiration = expiration - self.clock_offset
+        self._deadline = time.monotonic() + (local_expiration - time.time())
+        self.token = token
+        self._token_changed.set()
+
+    async def _refresh_loop(self):
+        retry_delay = RETRY_MIN_DELAY
+        while True:
+            if self.token is None:
+                delay = 0
+            else:
+                delay = max(self.seconds_left() - REFRESH_MARGIN, 0)
+
+            self._token_changed.clear()
+            if delay > 0:
+                try:
+                    # Wake up early if the token was replaced in the meantime
+                    await get_timers().wait_for(self._token_changed.wait(), delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            try:
+                token = await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # e.g. a malformed token response: keep the loop alive, retry with backoff
+                print(f"[TokenHandler] Refresh failed: {e!r}")
+                token = None
+            if token is None or self.seconds_left() <= REFRESH_MARGIN:
+                await get_timers().sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, RETRY_MAX_DELAY)
+            else:
+                retry_delay = RETRY_MIN_DELAY
 
 
-async def check_expiration(token: Token) -> bool:
+async def verify_token(context: AppContext) -> Token | None:
     """
-    Checks if a token is expired or close to expiration (5 min buffer).
+    Returns a valid token from the in-memory token manager and updates it in the application context.
     """
-    try:
-        time_now_with_buffer = datetime.now() + timedelta(minutes=5)
-        token_expiration_formated = datetime.fromisoformat(token.expiration)
+    token = await context.token_manager.get()
+    if token is None:
+        return None
 
-        if token_expiration_formated < time_now_with_buffer:
-            print("Token Expired")
-            return False
-        else:
-            return True
-
-    except Exception as e:
-        print("Error in checking_token: " + str(e))
-        return False
+    context.token = token
+    return token
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from config import config
+from executors import DISK, run_in
+from model_classes import User
+from timer_service import Timer, get_timers
+
+if TYPE_CHECKING:
+    from api_client import APIClient
+
+USER_CACHE_FILE = getattr(
+    config, "USER_CACHE_FILE", Path("/home/bluebox/user_cache.json")
+)
+
+MAX_ENTRIES = 500  # Cards remembered, least recently used ones are evicted
+USER_TTL = 24 * 60 * 60  # Seconds a known user is served from the cache
+REVALIDATE_AFTER = 10 * 60  # Older hits are served, then refreshed in the background
+NEGATIVE_TTL = 60  # Seconds an unknown card is answered without asking the backend
+SAVE_DELAY = 2.0  # Seconds to collect changes before the cache file is rewritten
+
+
+@dataclass
+class _Entry:
+    user: Optional[User]  # None = card is not registered
+    fetched_at: float  # Wall clock, so entries survive restarts
+
+    def age(self, now: float) -> float:
+        return now - self.fetched_at
+
+    def expired(self, now: float) -> bool:
+        ttl = USER_TTL if self.user is not None else NEGATIVE_TTL
+        return not 0 <= self.age(now) < ttl
+
+
+class UserCache:
+    """
+    LRU/TTL cache of card ID -> User in front of APIClient.lookup_user.
+    - Known users are served instantly (also offline, see cached()) and
+      revalidated in the background
+    - Unknown cards are remembered for a short time (negative caching)
+    - Concurrent lookups of the same card share one backend request
+    - Entries are persisted (atomically) and reloaded on start
+    """
+
+    def __init__(self, api: "APIClient", path: Path = USER_CACHE_FILE):
+        self.api = api
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._save_handle: Optional[Timer] = None
+        self._save_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Loads persisted entries from disk."""
+        entries = await run_in(DISK, self._read_file)
+        now = time.time()
+        for card_id, entry in entries:
+            if not entry.expired(now):
+                self._entries[card_id] = entry
+        print(f"[UserCache] Loaded {len(self._entries)} cards")
+
+    async def close(self):
+        """Writes pending changes and stops background revalidation."""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+            await self._save()
+        elif self._save_task is not None:
+            await self._save_task
+
+    def cached(self, card_id: str) -> tuple[bool, Optional[User]]:
+        """
+        Answers from the cache alone, without the network (so also offline or
+        while the backend is down): (True, user or None if not registered) on a
+        hit, (False, None) on a miss. Older hits are revalidated in the background.
+        """
+        now = time.time()
+        entry = self._entries.get(card_id)
+        if entry is None or entry.expired(now):
+            return False, None
+        self._entries.move_to_end(card_id)
+        self.hits += 1
+        if entry.user is not None and entry.age(now) > REVALIDATE_AFTER:
+            self._lookup(card_id)  # Refresh in the background, answer now
+        return True, entry.user
+
+    async def fetch_user_data(self, card_id: str) -> Optional[User]:
+        """Drop-in for APIClient.fetch_user_data, answered from the cache if possible."""
+        hit, user = self.cached(card_id)
+        if hit:
+            return user
+        self.misses += 1
+        return await asyncio.shield(self._lookup(card_id))
+
+    def invalidate(self, card_id: str):
+        if self._entries.pop(card_id, None) is not None:
+            self._save_soon()
+
+    def _lookup(self, card_id: str) -> asyncio.Task:
+        """Starts (or joins) the backend request for a card."""
+        task = self._inflight.get(card_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(card_id))
+            self._inflight[card_id] = task
+            task.add_done_callback(lambda t: self._done(card_id, t))
+        return task
+
+    def _done(self, card_id: str, task: asyncio.Task):
+        self._inflight.pop(card_id, None)
+        if not task.cancelled():
+            task.exception()  # Background revalidations are never awaited
+
+    async def _fetch(self, card_id: str) -> Optional[User]:
+        # CircuitOpenError propagates: a miss lets the caller report the outage,
+        # a failed revalidation keeps the entry
+        user, definitive = await self.api.lookup_user(card_id)
+        if definitive:
+            self._store(card_id, _Entry(user=user, fetched_at=time.time()))
+        return user
+
+    def _store(self, card_id: str, entry: _Entry):
+        self._entries[card_id] = entry
+        self._entries.move_to_end(card_id)
+        while len(self._entries) > MAX_ENTRIES:
+            self._entries.popitem(last=False)
+        self._save_soon()
+
+    def _save_soon(self):
+        if self._save_handle is None:
+            self._save_handle = get_timers().call_later(SAVE_DELAY, self._start_save)
+
+    def _start_save(self):
+        self._save_handle = None
+        self._save_task = asyncio.create_task(self._save())
+
+    async def _save(self):
+        data = {
+            card_id: {
+                "user": asdict(entry.user) if entry.user is not None else None,
+                "fetched_at": entry.fetched_at,
+            }
+            for card_id, entry in self._entries.items()
+        }
+        try:
+            await run_in(DISK, self._write_file, data)
+        except Exception as e:
+            print(f"[UserCache] Failed to save cache: {e}")
+
+    def _read_file(self) -> list[tuple[str, _Entry]]:
+        if not self.path.exists():
+            return []
+        try:
+            data = json.loads(self.path.read_text())
+            return [
+                (
+                    card_id,
+                    _Entry(
+                        user=User(**item["user"]) if item["user"] is not None else None,
+                        fetched_at=float(item["fetched_at"]),
+                    ),
+                )
+                for card_id, item in data.items()
+            ]
+        except Exception as e:
+            print(f"[UserCache] Error loading cache: {e}")
+            return []
+
+    def _write_file(self, data: dict):
+        # Write to a temp file and rename, so a power cut never leaves half a file
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            handle.write(json.dumps(data))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.path)